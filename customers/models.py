@@ -10,6 +10,13 @@ class Customer(models.Model):
     loyalty_points = models.IntegerField(default=0)
     debt = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Delta sync (sync.changes)
+            models.Index(fields=['shop', 'updated_at'], name='cust_customer_shop_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -0,0 +1,58 @@
+"""
+Background job handlers for the customers app (see jobs.queue.HANDLERS).
+"""
+import csv
+import io
+from django.db import transaction
+from .models import Customer
+
+PROGRESS_EVERY = 50
+
+
+def import_clients(job):
+    shop = job.shop
+    with job.input_file.open('rb') as f:
+        rows = list(csv.DictReader(io.StringIO(f.read().decode('utf-8-sig'))))
+    job.set_progress(0, len(rows))
+
+    created_count = 0
+    updated_count = 0
+    errors = []
+
+    with transaction.atomic():
+        for index, row in enumerate(rows, start=1):
+            if index % PROGRESS_EVERY == 0:
+                job.set_progress(index)
+            name = ''
+            try:
+                name = row.get('Name (Jina)', '').strip()
+                if not name: continue
+                
+                phone = row.get('Phone (Simu)', '').strip()
+                email = row.get('Email', '').strip()
+                address = row.get('Address (Makazi)', '').strip()
+
+                customer, created = Customer.objects.get_or_create(
+                    shop=shop, 
+                    name=name,
+                    defaults={'phone': phone, 'email': email, 'address': address}
+                )
+                
+                if not created:
+                    # Update if found (to allow corrections)
+                    customer.phone = phone
+                    customer.email = email
+                    customer.address = address
+                    customer.save()
+                    updated_count += 1
+                else:
+                    created_count += 1
+
+            except Exception as e:
+                errors.append(f"Row {index} ({name}): {str(e)}")
+
+    job.progress = len(rows)
+    job.errors = errors
+    if errors:
+        return f"Import finished. Created: {created_count}, Updated: {updated_count}. Some errors occurred."
+    return f"Successfully imported {created_count} new clients and updated {updated_count}."
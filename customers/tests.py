@@ -1,3 +1,15 @@
-from django.test import TestCase
+from shops.tests import TenantAPITestCase
+from .models import Customer
+from .views import CustomerViewSet
 
-# Create your tests here.
+
+class CustomerQueryBudgetTests(TenantAPITestCase):
+    def add_customers(self, count=12):
+        Customer.objects.bulk_create(Customer(shop=self.shop, name=f'Customer {i}') for i in range(count))
+
+    def test_customers(self):
+        self.add_customers(3)
+        customer = Customer.objects.filter(shop=self.shop).first()
+        self.assertWithinBudget(CustomerViewSet, 'list', '/api/customers/customers/', **self.auth())
+        self.assertWithinBudget(CustomerViewSet, 'retrieve', f'/api/customers/customers/{customer.pk}/', **self.auth())
+        self.assertConstantQueries('/api/customers/customers/', self.add_customers, **self.auth())
@@ -1,9 +1,13 @@
 from rest_framework import viewsets, permissions
 from .models import Customer
 from .serializers import CustomerSerializer
+from users.role_permissions import HasModulePermission
+from shops.query_budget import QueryBudgetMixin
 
-class CustomerViewSet(viewsets.ModelViewSet):
-    permission_classes = [permissions.IsAuthenticated]
+class CustomerViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    permission_module = 'clients'
+    query_budget = {'list': 4, 'retrieve': 3}
     serializer_class = CustomerSerializer
 
     def get_queryset(self):
@@ -15,22 +19,14 @@ class CustomerViewSet(viewsets.ModelViewSet):
             return Customer.objects.all()
             
         # Determine Shop
-        if hasattr(user, 'shops') and user.shops.exists():
-            return Customer.objects.filter(shop=user.shops.first())
-        elif hasattr(user, 'shop') and user.shop:
-            return Customer.objects.filter(shop=user.shop)
+        shop = self.request.tenant.shop
+        if shop:
+            return Customer.objects.filter(shop=shop)
             
         return Customer.objects.none()
 
     def perform_create(self, serializer):
-        user = self.request.user
-        shop = None
-        
-        if hasattr(user, 'shops') and user.shops.exists():
-            shop = user.shops.first()
-        elif hasattr(user, 'shop') and user.shop:
-            shop = user.shop
-            
+        shop = self.request.tenant.shop
         if not shop:
             from rest_framework.exceptions import ValidationError
             raise ValidationError({"shop": "No shop associated with this user."})
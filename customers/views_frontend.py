@@ -10,24 +10,11 @@ import io
 from django.http import HttpResponse
 from django.db import transaction
 from django.shortcuts import redirect, render
+from jobs.models import Job
+from jobs.queue import enqueue
+from shops.mixins import BaseShopView
 
 
-class BaseShopView(LoginRequiredMixin):
-    def get_shop(self):
-        # 1. Direct check for Employee's assigned shop
-        if getattr(self.request.user, 'shop', None):
-            return self.request.user.shop
-            
-        # 2. Check for Owner's shops
-        if hasattr(self.request.user, 'shops') and self.request.user.shops.exists():
-            return self.request.user.shops.first()
-            
-        # 3. Legacy fallback
-        if hasattr(self.request.user, 'employee_profile'):
-             return self.request.user.employee_profile.shop
-             
-        return None
-
 class ClientListView(BaseShopView, ListView):
     model = Customer
     template_name = 'customers/client_list.html'
@@ -95,58 +82,18 @@ class ClientImportView(BaseShopView, TemplateView):
              return redirect('dashboard')
 
         try:
-            decoded_file = file.read().decode('utf-8-sig')
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string)
-            
-            field_names = reader.fieldnames
-            if not field_names or 'Name (Jina)' not in field_names:
-                 messages.error(request, "Invalid CSV format. Please use the provided template.")
-                 return redirect('client_import')
-
-            created_count = 0
-            updated_count = 0
-            errors = []
-
-            with transaction.atomic():
-                for index, row in enumerate(reader, start=1):
-                    try:
-                        name = row.get('Name (Jina)', '').strip()
-                        if not name: continue
-                        
-                        phone = row.get('Phone (Simu)', '').strip()
-                        email = row.get('Email', '').strip()
-                        address = row.get('Address (Makazi)', '').strip()
-
-                        customer, created = Customer.objects.get_or_create(
-                            shop=shop, 
-                            name=name,
-                            defaults={'phone': phone, 'email': email, 'address': address}
-                        )
-                        
-                        if not created:
-                            # Update existing? Let's say yes for now, only if fields are empty or just update all?
-                            # Standard behavior: Update if found (to allow corrections)
-                            customer.phone = phone
-                            customer.email = email
-                            customer.address = address
-                            customer.save()
-                            updated_count += 1
-                        else:
-                            created_count += 1
-
-                    except Exception as e:
-                        errors.append(f"Row {index} ({name}): {str(e)}")
-
-            if errors:
-                messages.warning(request, f"Import finished. Created: {created_count}, Updated: {updated_count}. Some errors occurred.")
-            else:
-                messages.success(request, f"Successfully imported {created_count} new clients and updated {updated_count}.")
-
-        except Exception as e:
-            messages.error(request, f"Error processing file: {str(e)}")
-        
-        return redirect('client_list')
+            header = next(csv.reader([file.readline().decode('utf-8-sig')]), [])
+        except UnicodeDecodeError:
+            header = []
+        file.seek(0)
+        if 'Name (Jina)' not in header:
+             messages.error(request, "Invalid CSV format. Please use the provided template.")
+             return redirect('client_import')
+
+        # The import itself runs in the background (customers.tasks.import_clients)
+        job = enqueue(Job.Kind.CLIENT_IMPORT, shop, user=request.user, input_file=file)
+        messages.info(request, "Import started. You will be notified when it is done.")
+        return redirect('job_detail', pk=job.pk)
 
 class ClientTemplateDownloadView(LoginRequiredMixin, View):
     def get(self, request):
@@ -0,0 +1,111 @@
+"""
+Tenant directory for the superuser CRM and shop list pages.
+
+Everything is computed by the database: the health flag is a CASE on the
+subscription status, the pipeline counts are one conditional aggregate and each
+row's last sale and 30-day sales volume are correlated subqueries on the
+(shop, created_at) sales index. Pages are keyset paginated (shops.pagination),
+so a page costs the same with ten tenants or ten thousand.
+"""
+import string
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Case, CharField, Count, DecimalField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Upper
+from django.db.models.lookups import GreaterThanOrEqual, LessThan
+from django.utils import timezone
+from shops.models import Shop
+from sales.models import Sale
+
+# health key -> (label, css class, condition)
+HEALTH = {
+    'healthy': ('Healthy', 'success', Q(subscription__status='ACTIVE')),
+    'trial': ('In Trial', 'primary', Q(subscription__status='TRIAL')),
+    'none': ('No Plan', 'warning', Q(subscription__isnull=True)),
+}
+EXPIRED = ('Expired', 'danger')
+HEALTH_CHOICES = [(key, label) for key, (label, _, _) in HEALTH.items()] + [('expired', EXPIRED[0])]
+ACTIVITY_DAYS = 30
+ASCII_UPPER = str.maketrans(string.ascii_lowercase, string.ascii_uppercase)
+
+
+def health_filter(health):
+    if health in HEALTH:
+        return HEALTH[health][2]
+    if health == 'expired':
+        return ~Q(subscription__status__in=['ACTIVE', 'TRIAL']) & Q(subscription__isnull=False)
+    return Q()
+
+
+def prefix_filter(field, query):
+    """
+    Case-insensitive prefix match that the UPPER(field) indexes serve: LIKE on
+    PostgreSQL (text_pattern_ops), a range elsewhere, as SQLite only uses an
+    index for LIKE on a plain NOCASE column. SQLite's UPPER() folds ASCII only,
+    so the range does too.
+    """
+    if connection.vendor == 'postgresql':
+        return Q(**{f'{field}__istartswith': query})
+    prefix = query.translate(ASCII_UPPER)
+    return Q(GreaterThanOrEqual(Upper(field), prefix), LessThan(Upper(field), prefix + '\U0010ffff'))
+
+
+def search_filter(query):
+    """
+    Shops whose name, or whose owner's username or email, starts with the query,
+    or whose owner's phone is the query. Prefixes, not substrings: each side of
+    the union is an index search (shops migration 0005, users migration 0009).
+    """
+    query = query.strip()
+    if not query:
+        return Q()
+    owners = get_user_model().objects.filter(
+        prefix_filter('username', query) | prefix_filter('email', query) | Q(phone=query)
+    )
+    matches = Shop.objects.filter(prefix_filter('name', query)).values('pk').union(
+        Shop.objects.filter(owner__in=owners.values('pk')).values('pk')
+    )
+    return Q(pk__in=matches)
+
+
+def directory(query='', health=''):
+    """Shops with owner, plan, health_status/health_class, last_activity and sales_30d."""
+    since = timezone.now() - timedelta(days=ACTIVITY_DAYS)
+    shop_sales = Sale.objects.filter(shop=OuterRef('pk'))
+    return (
+        Shop.objects.select_related('owner', 'subscription__plan')
+        .filter(search_filter(query), health_filter(health))
+        .annotate(
+            health_status=Case(
+                *[When(condition, then=Value(label)) for label, _, condition in HEALTH.values()],
+                default=Value(EXPIRED[0]), output_field=CharField()
+            ),
+            health_class=Case(
+                *[When(condition, then=Value(css)) for _, css, condition in HEALTH.values()],
+                default=Value(EXPIRED[1]), output_field=CharField()
+            ),
+            last_activity=Subquery(shop_sales.order_by('-created_at').values('created_at')[:1]),
+            sales_30d=Coalesce(
+                Subquery(
+                    shop_sales.filter(created_at__gte=since).order_by()
+                    .values('shop').annotate(total=Sum('total_amount')).values('total')
+                ),
+                Value(0), output_field=DecimalField(max_digits=14, decimal_places=2)
+            ),
+        )
+    )
+
+
+def pipeline():
+    """Shop and subscription counts from a single aggregate query."""
+    counts = Shop.objects.aggregate(
+        total_shops=Count('pk'),
+        active_paid=Count('pk', filter=Q(subscription__status='ACTIVE')),
+        active_trials=Count('pk', filter=Q(subscription__status='TRIAL')),
+        expired=Count('pk', filter=Q(subscription__status='EXPIRED')),
+        total_ever_trial=Count('pk', filter=Q(subscription__status__in=['ACTIVE', 'TRIAL', 'EXPIRED'])),
+    )
+    total = counts.pop('total_ever_trial')
+    counts['conversion_rate'] = round(counts['active_paid'] / total * 100, 1) if total else 0
+    return counts
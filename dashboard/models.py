@@ -11,6 +11,11 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Notification dropdown (latest first) and the unread badge / mark-all-read
+            models.Index(fields=['recipient', 'created_at'], name='dash_notif_recipient_idx'),
+            models.Index(fields=['recipient', 'created_at'], name='dash_notif_unread_idx', condition=models.Q(is_read=False)),
+        ]
 
     def __str__(self):
         return f"{self.verb} - {self.recipient.username}"
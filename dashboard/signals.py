@@ -0,0 +1,62 @@
+"""
+Bumps the dashboard version of a shop on sale, purchase and stock writes,
+so its cached dashboard metrics (dashboard.stats) are recomputed.
+Stock rows get no post_delete receiver: it would stop Django from fast-deleting
+them when a product or branch goes (and those writes are rare).
+"""
+import threading
+from collections import OrderedDict
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from sales.models import Sale
+from purchase.models import PurchaseOrder
+from inventory.models import Stock, StockMovement
+from shops.models import Branch
+from .stats import bump_version
+
+BRANCH_SHOPS_SIZE = 4096
+
+# branch_id -> shop_id; a branch never moves to another shop, so entries never go stale
+_branch_shops = OrderedDict()
+_lock = threading.Lock()
+
+
+def branch_shop_id(branch_id):
+    with _lock:
+        shop_id = _branch_shops.get(branch_id)
+        if shop_id is not None:
+            _branch_shops.move_to_end(branch_id)
+            return shop_id
+    shop_id = Branch.objects.filter(pk=branch_id).values_list('shop_id', flat=True).first()
+    if shop_id is not None:
+        with _lock:
+            _branch_shops[branch_id] = shop_id
+            while len(_branch_shops) > BRANCH_SHOPS_SIZE:
+                _branch_shops.popitem(last=False)
+    return shop_id
+
+
+def get_shop_id(instance):
+    if isinstance(instance, (Sale, PurchaseOrder)):
+        return instance.shop_id
+    # Stock rows and movements only know their branch: use it if it is loaded, else the branch -> shop map
+    field = type(instance)._meta.get_field('branch')
+    if field.is_cached(instance):
+        return instance.branch.shop_id
+    return branch_shop_id(instance.branch_id)
+
+@receiver(post_save, sender=Sale)
+@receiver(post_save, sender=PurchaseOrder)
+@receiver(post_save, sender=Stock)
+@receiver(post_save, sender=StockMovement)
+@receiver(post_delete, sender=Sale)
+@receiver(post_delete, sender=PurchaseOrder)
+def bump_dashboard_version(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    shop_id = get_shop_id(instance)
+    if shop_id:
+        # Again after commit: a dashboard load in between may have cached the old numbers
+        bump_version(shop_id)
+        transaction.on_commit(lambda: bump_version(shop_id))
@@ -0,0 +1,154 @@
+"""
+Cached dashboard metrics, shared by the dashboard page (DashboardTemplateView)
+and the mobile app (DashboardSummaryView).
+
+A payload is cached per (shops, role scope, date range) under each shop's
+version number. Sale, purchase and stock writes bump the shop's version
+(dashboard.signals; the bulk stock paths call bump_version themselves), so a
+write is visible on the next load, and the window's start day is part of the
+key. The TTL bounds the lag of writes that bypass the signals: short for
+"today", longer for the week/month/year views.
+"""
+import time
+from django.core.cache import cache
+from django.db.models import Sum
+from shops.models import Shop, Branch
+from sales.models import Sale
+from inventory.models import Stock
+from purchase.models import PurchaseOrder
+from reports.aggregation import aggregate_windows, filter_window, summary_windows
+
+VERSION_PREFIX = 'dashboard:version:'
+STATS_PREFIX = 'dashboard:stats:'
+TTL = {'today': 60}
+DEFAULT_TTL = 10 * 60
+LOW_STOCK_LEVEL = 5
+
+
+def new_version():
+    # Never reuses a number, even if a version key was evicted from the cache
+    return time.time_ns() // 1000
+
+
+def bump_version(shop_id):
+    key = VERSION_PREFIX + str(shop_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, new_version(), None)
+
+
+def get_versions(shop_ids):
+    keys = [VERSION_PREFIX + str(shop_id) for shop_id in shop_ids]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, new_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def cached(key, ttl, compute):
+    payload = cache.get(key)
+    if payload is None:
+        payload = compute()
+        cache.set(key, payload, ttl)
+    return payload
+
+
+def recent(sales):
+    return list(sales.order_by('-created_at')[:5].values('id', 'total_amount', 'created_at'))
+
+
+def tenant_stats(user, shop_ids, date_range='today'):
+    """
+    Metrics of the user's shops for the date range (a summary_windows() key).
+    Employees only see their own sales and no purchases.
+    """
+    shop_ids = sorted(shop_ids)
+    is_employee = getattr(user, 'role', None) == 'EMPLOYEE'
+    scope = f'cashier-{user.pk}' if is_employee else 'shop'
+    start_date = summary_windows()[date_range][0]
+    versions = get_versions(shop_ids)
+    key = STATS_PREFIX + '{}:{}:{}:{}'.format(
+        ','.join(f'{shop_id}.{version}' for shop_id, version in zip(shop_ids, versions)) or 'none',
+        scope, date_range, start_date.isoformat()
+    )
+
+    def compute():
+        # All-time volume and the selected period come back from one query per table
+        windows = {'all': (None, None), 'period': (start_date, None)}
+
+        sales = Sale.objects.filter(shop_id__in=shop_ids)
+        if is_employee:
+            sales = sales.filter(cashier=user)
+            purchases = PurchaseOrder.objects.none()
+        else:
+            purchases = PurchaseOrder.objects.filter(shop_id__in=shop_ids).exclude(status=PurchaseOrder.Status.DRAFT)
+
+        sales_stats = aggregate_windows(sales, windows, sums={'total': 'total_amount'}, count_field=None)
+        purchases_stats = aggregate_windows(purchases, windows, sums={'total': 'total_cost'}, count_field=None)
+
+        top_cashier = None
+        top = filter_window(sales, 'created_at', start_date).values(
+            'cashier__username', 'cashier__first_name', 'cashier__last_name'
+        ).annotate(total=Sum('total_amount')).order_by('-total').first()
+        if top:
+            name = f"{top['cashier__first_name']} {top['cashier__last_name']}".strip()
+            top_cashier = {'name': name if name else top['cashier__username'], 'amount': top['total']}
+
+        return {
+            'type': 'Tenant',
+            'total_shops': len(shop_ids),
+            'total_sales_volume': sales_stats['all']['total'],
+            'sales_period': sales_stats['period']['total'],
+            'total_purchases_volume': purchases_stats['all']['total'],
+            'purchases_period': purchases_stats['period']['total'],
+            'low_stock_items': Stock.objects.filter(branch__shop_id__in=shop_ids, quantity__lte=LOW_STOCK_LEVEL).count(),
+            # Branches Count (Single Shop: the owner's first shop or the employee's shop)
+            'total_branches': Branch.objects.filter(shop_id=shop_ids[0]).count() if shop_ids else 0,
+            'top_cashier': top_cashier,
+            'recent_sales': recent(sales),
+        }
+
+    return cached(key, TTL.get(date_range, DEFAULT_TTL), compute)
+
+
+def global_stats(date_range='today'):
+    """Platform-wide metrics for super admins (not versioned, so always the short TTL)."""
+    start_date = summary_windows()[date_range][0]
+
+    def compute():
+        from subscriptions.models import SubscriptionPayment
+        windows = {'all': (None, None), 'period': (start_date, None)}
+        sales_stats = aggregate_windows(Sale.objects.all(), windows, sums={'total': 'total_amount'}, count_field=None)
+        purchases_stats = aggregate_windows(
+            PurchaseOrder.objects.exclude(status=PurchaseOrder.Status.DRAFT), windows, sums={'total': 'total_cost'}, count_field=None
+        )
+        return {
+            'type': 'Global',
+            'total_shops': Shop.objects.count(),
+            'total_sales_volume': sales_stats['all']['total'],
+            'sales_period': sales_stats['period']['total'],
+            'total_purchases_volume': purchases_stats['all']['total'],
+            'purchases_period': purchases_stats['period']['total'],
+            'total_subscription_revenue': SubscriptionPayment.objects.filter(status='COMPLETED').aggregate(Sum('amount'))['amount__sum'] or 0,
+            'recent_sales': recent(Sale.objects.all()),
+        }
+
+    return cached(f'{STATS_PREFIX}global:{date_range}:{start_date.isoformat()}', TTL['today'], compute)
+
+
+def dashboard_stats(user, date_range='today'):
+    """The payload for this user: global for super admins, else their shops' metrics."""
+    if date_range not in summary_windows():
+        date_range = 'today'
+    if getattr(user, 'role', None) == 'SUPER_ADMIN' or user.is_superuser:
+        return global_stats(date_range)
+    if getattr(user, 'role', None) == 'EMPLOYEE':
+        # Employee belongs to a shop
+        shop_ids = [user.shop_id] if user.shop_id else []
+    else:
+        # Owner owns shops
+        shop_ids = list(Shop.objects.filter(owner=user).values_list('pk', flat=True))
+    return tenant_stats(user, shop_ids, date_range)
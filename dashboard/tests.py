@@ -1,3 +1,96 @@
+import datetime
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from shops.models import Shop, Branch
+from sales.models import Sale
+from inventory.models import Product, Stock
+from . import crm, signals, stats
 
-# Create your tests here.
+
+class DirectorySearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        alice = User.objects.create_user(username='alice', email='alice@example.com', phone='0700111222', password='pass1234!x')
+        bob = User.objects.create_user(username='bob', email='shopkeeper@example.com', password='pass1234!x')
+        cls.corner = Shop.objects.create(owner=alice, name='Corner Shop', slug='corner-shop')
+        cls.kiosk = Shop.objects.create(owner=bob, name='Kiosk', slug='kiosk')
+        cls.bakery = Shop.objects.create(owner=bob, name='Bakery', slug='bakery')
+
+    def search(self, query):
+        return set(crm.directory(query).values_list('name', flat=True))
+
+    def test_prefixes(self):
+        self.assertEqual(self.search('cOrn'), {'Corner Shop'})
+        self.assertEqual(self.search('ALI'), {'Corner Shop'})
+        self.assertEqual(self.search('shopkeeper@'), {'Kiosk', 'Bakery'})
+        self.assertEqual(self.search('0700111222'), {'Corner Shop'})
+        self.assertEqual(self.search('  '), {'Corner Shop', 'Kiosk', 'Bakery'})
+
+    def test_no_substring_matches(self):
+        self.assertEqual(self.search('shop'), {'Kiosk', 'Bakery'}) # shopkeeper@, not Corner Shop
+        self.assertEqual(self.search('orner'), set())
+        self.assertEqual(self.search('0700'), set()) # Phones match whole
+
+
+class TenantStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = get_user_model().objects.create_user(username='owner', password='pass1234!x', role='OWNER')
+        cls.shop = Shop.objects.create(owner=cls.owner, name='Corner Shop', slug='corner-shop')
+        cls.branch = Branch.objects.create(shop=cls.shop, name='Main', is_main=True)
+        cls.product = Product.objects.create(shop=cls.shop, name='Soda', selling_price=1500)
+        Stock.objects.filter(product=cls.product).update(quantity=20)
+
+    def setUp(self):
+        cache.clear()
+        signals._branch_shops.clear()
+
+    def load(self, date_range='today'):
+        return stats.tenant_stats(self.owner, [self.shop.pk], date_range)
+
+    def test_second_load_is_cached(self):
+        first = self.load()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.load(), first)
+
+    def test_sale_invalidates(self):
+        self.assertEqual(self.load()['sales_period'], 0)
+        Sale.objects.create(shop=self.shop, branch=self.branch, cashier=self.owner, total_amount=1500)
+        self.assertEqual(self.load()['sales_period'], 1500)
+
+    def test_stock_save_invalidates(self):
+        self.assertEqual(self.load()['low_stock_items'], 0)
+        stock = Stock.objects.get(product=self.product, branch=self.branch)
+        stock.quantity = 2
+        stock.save()
+        self.assertEqual(self.load()['low_stock_items'], 1)
+
+    def test_stock_save_does_not_load_the_branch(self):
+        stock = Stock.objects.get(product=self.product, branch=self.branch)
+        with self.assertNumQueries(2): # The branch's shop id, then the update
+            stock.save()
+        stock = Stock.objects.get(pk=stock.pk)
+        with self.assertNumQueries(1):
+            stock.save()
+        self.assertEqual(signals.get_shop_id(stock), self.shop.pk)
+
+    def test_ranges_are_cached_apart(self):
+        with mock.patch.object(stats, 'cached', wraps=stats.cached) as spy:
+            self.load('today')
+            self.load('week')
+        (today_key, today_ttl, _), (week_key, week_ttl, _) = [call.args for call in spy.call_args_list]
+        self.assertNotEqual(today_key, week_key)
+        self.assertEqual((today_ttl, week_ttl), (stats.TTL['today'], stats.DEFAULT_TTL))
+        self.assertIsNotNone(cache.get(today_key))
+        self.assertIsNotNone(cache.get(week_key))
+
+        # Each range keeps its own numbers: a sale three days ago is in the week, not today
+        sale = Sale.objects.create(shop=self.shop, branch=self.branch, cashier=self.owner, total_amount=700)
+        Sale.objects.filter(pk=sale.pk).update(created_at=timezone.now() - datetime.timedelta(days=3))
+        stats.bump_version(self.shop.pk)
+        self.assertEqual(self.load('week')['sales_period'], 700)
+        self.assertEqual(self.load('today')['sales_period'], 0)
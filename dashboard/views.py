@@ -12,6 +12,9 @@ from django.utils import timezone
 from datetime import timedelta
 from django.db import models # Added for aggregation
 from .models import Notification
+from .stats import dashboard_stats
+from . import crm
+from shops.pagination import keyset_page, page_links
 
 class DashboardTemplateView(LoginRequiredMixin, TemplateView):
     template_name = "dashboard/index.html"
@@ -37,106 +40,24 @@ class DashboardTemplateView(LoginRequiredMixin, TemplateView):
 
     def calculate_stats(self, context, date_range):
         user = self.request.user
-        today = timezone.now().date()
-        shops = Shop.objects.none() # Initialize to prevent UnboundLocalError for Super Admins
-        
-        # Determine start date and label based on range
-        if date_range == 'week':
-            start_date = today - timedelta(days=7)
-            period_label = "Last 7 Days"
-        elif date_range == 'month':
-            start_date = today - timedelta(days=30)
-            period_label = "Last 30 Days"
-        elif date_range == 'year':
-            start_date = today - timedelta(days=365)
-            period_label = "Last 365 Days"
-        else: # today
-            start_date = today
-            period_label = "Today"
+
+        # Determine label based on range
+        labels = {'week': "Last 7 Days", 'month': "Last 30 Days", 'year': "Last 365 Days"}
+        period_label = labels.get(date_range, "Today")
             
         context['selected_range'] = date_range
         context['period_label'] = period_label
 
-        if getattr(user, 'role', None) == 'SUPER_ADMIN' or user.is_superuser:
-            context['type'] = 'Global'
-            context['total_shops'] = Shop.objects.count()
-            # Global Sales
-            context['total_sales_volume'] = Sale.objects.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-            context['sales_period'] = Sale.objects.filter(created_at__date__gte=start_date).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-            
-            # Global Purchases
-            context['total_purchases_volume'] = PurchaseOrder.objects.aggregate(Sum('total_cost'))['total_cost__sum'] or 0
-            context['purchases_period'] = PurchaseOrder.objects.filter(created_at__date__gte=start_date).aggregate(Sum('total_cost'))['total_cost__sum'] or 0
-            
-            context['recent_sales'] = Sale.objects.order_by('-created_at')[:5]
-        else:
-            context['type'] = 'Tenant'
-            
-            # Identify Shops
-            if getattr(user, 'role', None) == 'EMPLOYEE':
-                # Employee belongs to a shop
-                shops = Shop.objects.filter(id=user.shop_id) if user.shop_id else Shop.objects.none()
-            else:
-                # Owner owns shops
-                shops = Shop.objects.filter(owner=user)
-
-            context['total_shops'] = shops.count()
-            
-            # Tenant Sales
-            sales = Sale.objects.filter(shop__in=shops)
-            
-            # If Employee, further filter by cashier
-            if getattr(user, 'role', None) == 'EMPLOYEE':
-                sales = sales.filter(cashier=user)
-
-            context['total_sales_volume'] = sales.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-            context['sales_period'] = sales.filter(created_at__date__gte=start_date).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-            
-            # Tenant Purchases (Generally employees don't see purchases unless role allows, but we'll filter similarly or hide)
-            # For now, let's assume employees shouldn't see sensitive purchase data or just filter by shop
-            # If we strictly follow "only show his staff" (stuff), maybe hide purchases? 
-            # Letting it show shop purchases for now but could be restricted.
-            # Tenant Purchases
-            if getattr(user, 'role', None) == 'EMPLOYEE':
-                 purchases = PurchaseOrder.objects.none() 
-            else:
-                purchases = PurchaseOrder.objects.filter(shop__in=shops)
-
-            context['total_purchases_volume'] = purchases.aggregate(Sum('total_cost'))['total_cost__sum'] or 0
-            context['purchases_period'] = purchases.filter(created_at__date__gte=start_date).aggregate(Sum('total_cost'))['total_cost__sum'] or 0
-            
-            context['low_stock_items'] = Stock.objects.filter(branch__shop__in=shops, quantity__lte=5).count()
-            context['recent_sales'] = sales.order_by('-created_at')[:5]
-            
-            # Branches Count (Single Shop)
-            if shops.exists():
-                context['total_branches'] = shops.first().branches.count()
-                
-            # Top Cashier Logic
-            try:
-                # Filter sales for period (using 'sales_period' logic implicitly via sales & start_date)
-                period_sales = sales.filter(created_at__date__gte=start_date)
-                top_cashier_data = period_sales.values('cashier__username', 'cashier__first_name', 'cashier__last_name').annotate(
-                    total=Sum('total_amount')
-                ).order_by('-total').first()
-                
-                if top_cashier_data:
-                    name = f"{top_cashier_data['cashier__first_name']} {top_cashier_data['cashier__last_name']}".strip()
-                    context['top_cashier'] = {
-                        'name': name if name else top_cashier_data['cashier__username'],
-                        'amount': top_cashier_data['total']
-                    }
-            except Exception as e:
-                print(f"Error calculating top cashier: {e}")
-                pass
+        # Sales, purchases, stock and cashier metrics: cached per shop version (shared with the mobile API)
+        context.update(dashboard_stats(user, date_range))
         
         # Get Subscription Status (Safe Mode)
         context['days_left'] = 0 # Default to 0 (expired/immediate action)
         context['subscription_status'] = 'EXPIRED'
         context['has_subscription'] = False
         
-        if shops.exists():
-            shop = shops.first()
+        shop = self.request.tenant.shop if context['type'] == 'Tenant' else None
+        if shop:
             try:
                 # Accessing shop.subscription raises DoesNotExist if missing
                 sub = shop.subscription
@@ -262,17 +183,10 @@ class SuperUserCRMView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        from subscriptions.models import ShopSubscription, SubscriptionPayment
-        from django.db.models import Count, Q
-        from django.utils import timezone
-        from datetime import timedelta
-
-        # 1. Pipeline Stats
-        total_shops = Shop.objects.count()
-        context['total_shops'] = total_shops
-        context['active_paid'] = ShopSubscription.objects.filter(status='ACTIVE').count()
-        context['active_trials'] = ShopSubscription.objects.filter(status='TRIAL').count()
-        context['expired'] = ShopSubscription.objects.filter(status='EXPIRED').count()
+        from subscriptions.models import SubscriptionPayment
+
+        # 1. Pipeline Stats (+ conversion rate), one aggregate query
+        context.update(crm.pipeline())
 
         # 2. Revenue (MRR Estimation)
         # Assuming last 30 days of completed payments as monthly revenue proxy
@@ -283,33 +197,12 @@ class SuperUserCRMView(LoginRequiredMixin, TemplateView):
         ).aggregate(total=Sum('amount'))['total'] or 0
 
         # 3. Customer List (Consolidated CRM View)
-        # We want to see Shops + Owners + Subscription Status
-        shops = Shop.objects.select_related('owner', 'subscription', 'subscription__plan').all().order_by('-created_at')
-        
-        # Add 'health' flag to objects in memory
-        for shop in shops:
-            if hasattr(shop, 'subscription'):
-                sub = shop.subscription
-                if sub.status == 'ACTIVE':
-                    shop.health_status = 'Healthy'
-                    shop.health_class = 'success'
-                elif sub.status == 'TRIAL':
-                    shop.health_status = 'In Trial'
-                    shop.health_class = 'primary'
-                else:
-                    shop.health_status = 'Expired'
-                    shop.health_class = 'danger'
-            else:
-                shop.health_status = 'No Plan'
-                shop.health_class = 'warning'
-
-        context['shops'] = shops[:20] # Limit to 20 for now
-        
-        # 4. Conversion Calculation
-        total_ever_trial = ShopSubscription.objects.filter(Q(status='ACTIVE') | Q(status='TRIAL') | Q(status='EXPIRED')).count()
-        conversion = (context['active_paid'] / total_ever_trial * 100) if total_ever_trial > 0 else 0
-        context['conversion_rate'] = round(conversion, 1)
-
+        # Shops + Owners + Subscription Status, health and activity computed by the database
+        shops = crm.directory(self.request.GET.get('q', ''), self.request.GET.get('health', ''))
+        page = keyset_page(shops, self.request.GET.get('cursor'))
+        context['shops'] = page
+        context.update(page_links(self.request, page))
+        context['health_choices'] = crm.HEALTH_CHOICES
         return context
 
 class SettingsView(LoginRequiredMixin, TemplateView):
@@ -317,15 +210,13 @@ class SettingsView(LoginRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        if hasattr(self.request.user, 'shops') and self.request.user.shops.exists():
-             context['shop'] = self.request.user.shops.first()
+        context['shop'] = self.request.tenant.owned_shop
         return context
 
     def post(self, request, *args, **kwargs):
         # Save Shop Details
-        if hasattr(request.user, 'shops') and request.user.shops.exists():
-            shop = request.user.shops.first()
-            
+        shop = request.tenant.owned_shop
+        if shop:
             shop.name = request.POST.get('shop_name', shop.name)
             shop.address = request.POST.get('address', shop.address)
             shop.website = request.POST.get('website', shop.website)
@@ -345,14 +236,11 @@ class SuperUserShopListView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        shops = Shop.objects.select_related('owner', 'subscription', 'subscription__plan').all().order_by('-created_at')
-        
-        # Simple Search
-        query = self.request.GET.get('q')
-        if query:
-            shops = shops.filter(name__icontains=query)
-            
-        context['shops'] = shops
+        # Search (name / owner prefix) and keyset pages, see dashboard.crm
+        shops = crm.directory(self.request.GET.get('q', ''))
+        page = keyset_page(shops, self.request.GET.get('cursor'))
+        context['shops'] = page
+        context.update(page_links(self.request, page))
         return context
         
     def post(self, request, *args, **kwargs):
@@ -654,10 +542,9 @@ class ShopPricingView(LoginRequiredMixin, TemplateView):
         context['plans'] = SubscriptionPlan.objects.filter(is_active=True).order_by('price_monthly')
         
         # Determine current plan
-        if hasattr(self.request.user, 'shops') and self.request.user.shops.exists():
-            shop = self.request.user.shops.first()
-            if hasattr(shop, 'subscription'):
-                context['current_subscription'] = shop.subscription
+        subscription = self.request.tenant.subscription
+        if subscription and self.request.tenant.owned_shop:
+            context['current_subscription'] = subscription
         
         return context
     
@@ -686,8 +573,8 @@ class SettingsView(LoginRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        if hasattr(self.request.user, 'shops') and self.request.user.shops.exists():
-             shop = self.request.user.shops.first()
+        shop = self.request.tenant.owned_shop
+        if shop:
              context['shop'] = shop
              # Pass Settings Explicitly
              from shops.models import ShopSettings
@@ -695,16 +582,15 @@ class SettingsView(LoginRequiredMixin, TemplateView):
              context['settings_obj'] = settings_obj
              
              # Pass Active Subscription Explicitly
-             if hasattr(shop, 'subscription'):
-                 context['active_subscription'] = shop.subscription
+             if self.request.tenant.subscription:
+                 context['active_subscription'] = self.request.tenant.subscription
                  
         return context
 
     def post(self, request, *args, **kwargs):
         # Save Shop Details
-        if hasattr(request.user, 'shops') and request.user.shops.exists():
-            shop = request.user.shops.first()
-            
+        shop = request.tenant.owned_shop
+        if shop:
             shop.name = request.POST.get('shop_name', shop.name)
             shop.address = request.POST.get('address', shop.address)
             shop.website = request.POST.get('website', shop.website)
@@ -727,34 +613,15 @@ class SettingsView(LoginRequiredMixin, TemplateView):
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions
+from shops.conditional import ConditionalGetMixin, get_version
+from subscriptions.models import PLANS_VERSION
 
 class DashboardSummaryView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        data = {}
-        
-        if getattr(user, 'role', None) == 'SUPER_ADMIN' or user.is_superuser:
-            data['type'] = 'Global'
-            data['total_shops'] = Shop.objects.count()
-            data['total_sales_volume'] = Sale.objects.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-            
-            # Subscription Revenue
-            from subscriptions.models import SubscriptionPayment
-            data['total_subscription_revenue'] = SubscriptionPayment.objects.filter(status='COMPLETED').aggregate(Sum('amount'))['amount__sum'] or 0
-            
-            data['recent_sales'] = Sale.objects.order_by('-created_at')[:5].values('id', 'total_amount', 'created_at')
-        else:
-            data['type'] = 'Tenant'
-            shops = Shop.objects.filter(owner=user)
-            data['total_shops'] = shops.count()
-            sales = Sale.objects.filter(shop__in=shops)
-            data['total_sales_volume'] = sales.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-            # Note: low_stock_items logic requires fix if used in API, keeping simple for now
-            data['low_stock_items'] = Stock.objects.filter(branch__shop__in=shops, quantity__lte=5).count()
-            data['recent_sales'] = sales.order_by('-created_at')[:5].values('id', 'total_amount', 'created_at')
-
+        # Same cached payload as the dashboard page
+        data = dashboard_stats(request.user, request.query_params.get('date_range', 'today'))
         return Response(data)
 
 class NotificationListAPIView(APIView):
@@ -800,8 +667,18 @@ class NotificationMarkReadAPIView(APIView):
             
         return Response({'status': 'success'})
 
-class PricingAPIView(APIView):
+class PricingAPIView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.AllowAny] # Allow public access to pricing if needed, or IsAuthenticated
+    vary_on = ('Authorization', 'Cookie') # Superusers also get the inactive plans
+    per_user = False
+
+    def get_validators(self):
+        return (get_version(PLANS_VERSION), self.request.user.is_superuser), None
+
+    def get_cache_control(self):
+        if self.request.user.is_superuser:
+            return {'private': True, 'no_cache': True}
+        return {'public': True, 'max_age': 60}
 
     def get(self, request):
         if request.user.is_superuser:
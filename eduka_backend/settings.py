@@ -17,6 +17,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 
 import os
+import sys
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -87,6 +88,9 @@ INSTALLED_APPS = [
     'customers',
     'finance',
     'dashboard',
+    'reports',
+    'jobs',
+    'sync',
 ]
 
 MIDDLEWARE = [
@@ -99,6 +103,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'shops.middleware.TenantMiddleware', # request.tenant: shop, branch, role, subscription
     'subscriptions.middleware.SubscriptionMiddleware', # Enforce subscription limits
     'allauth.account.middleware.AccountMiddleware',
 ]
@@ -174,6 +179,25 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'eduka_backend' / 'static']
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
 
+# Storefronts written by `python manage.py prerender_storefronts --output <dir>` (optional):
+# WhiteNoise serves <dir>/store/<slug>/index.html before the request reaches Django
+if os.getenv('STOREFRONT_STATIC_ROOT'):
+    WHITENOISE_ROOT = os.getenv('STOREFRONT_STATIC_ROOT')
+    WHITENOISE_INDEX_FILE = True
+
+# Cache (subscription state). Per process by default; point all workers at a shared
+# backend, e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache, CACHE_LOCATION=redis://127.0.0.1:6379
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Background Jobs (imports, exports, labels) - run with `python manage.py run_jobs`
+JOB_FILES_ROOT = os.getenv('JOB_FILES_ROOT', str(BASE_DIR / 'job_files'))
+JOBS_RUN_EAGERLY = os.getenv('JOBS_RUN_EAGERLY') == 'True' # Run jobs inside the request (no worker needed)
+
 # Custom User Model
 AUTH_USER_MODEL = 'users.CustomUser'
 
@@ -205,6 +229,10 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10
 }
 
+# API views over their query budget (shops.query_budget) raise instead of
+# logging a warning: while debugging, and in the test suite
+QUERY_BUDGET_STRICT = DEBUG or os.getenv('QUERY_BUDGET_STRICT') == 'True' or sys.argv[1:2] == ['test']
+
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
@@ -25,6 +25,9 @@ urlpatterns = [
     path('customers/', include('customers.urls_frontend')),
     path('reports/', include('reports.urls_frontend')),
     path('api/reports/', include('reports.urls')),
+    path('jobs/', include('jobs.urls_frontend')),
+    path('api/jobs/', include('jobs.urls')),
+    path('api/sync/', include('sync.urls')),
     path('', include('dashboard.urls_frontend')), # Main Dashboard
     path('settings/', shops_views.ShopSettingsView.as_view(), name='settings'),
     path('store/<slug:slug>/', public_views.PublicShopView.as_view(), name='public_store'),
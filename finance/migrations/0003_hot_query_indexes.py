@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0002_income'),
+        ('shops', '0003_shop_public_visibility_shop_slug'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['shop', 'date'], name='finance_expense_shop_date_idx'),
+        ),
+    ]
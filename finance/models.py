@@ -10,6 +10,11 @@ class Expense(models.Model):
     date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['shop', 'date'], name='finance_expense_shop_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.description} - {self.amount}"
 
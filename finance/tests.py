@@ -1,3 +1,22 @@
-from django.test import TestCase
+import datetime
+from shops.tests import TenantAPITestCase
+from .models import Expense
+from .views import ExpenseViewSet
 
-# Create your tests here.
+
+class ExpenseQueryBudgetTests(TenantAPITestCase):
+    def add_expenses(self, count=12):
+        Expense.objects.bulk_create(
+            Expense(
+                shop=self.shop, branch=self.branches[i % 2], category='Rent', description=f'Expense {i}',
+                amount=1000, date=datetime.date(2026, 1, 1) + datetime.timedelta(days=i)
+            )
+            for i in range(count)
+        )
+
+    def test_expenses(self):
+        self.add_expenses(3)
+        expense = Expense.objects.filter(shop=self.shop).first()
+        self.assertWithinBudget(ExpenseViewSet, 'list', '/api/finance/expenses/', **self.auth())
+        self.assertWithinBudget(ExpenseViewSet, 'retrieve', f'/api/finance/expenses/{expense.pk}/', **self.auth())
+        self.assertConstantQueries('/api/finance/expenses/', self.add_expenses, **self.auth())
@@ -1,9 +1,13 @@
 from rest_framework import viewsets, permissions
 from .models import Expense
 from .serializers import ExpenseSerializer
+from users.role_permissions import HasModulePermission
+from shops.query_budget import QueryBudgetMixin
 
-class ExpenseViewSet(viewsets.ModelViewSet):
-    permission_classes = [permissions.IsAuthenticated]
+class ExpenseViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    permission_module = 'finance'
+    query_budget = {'list': 3, 'retrieve': 2}
     serializer_class = ExpenseSerializer
 
     def get_queryset(self):
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Product, Stock
+from .models import Category, Product, Stock, DemandForecast
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -16,3 +16,8 @@ class ProductAdmin(admin.ModelAdmin):
 class StockAdmin(admin.ModelAdmin):
     list_display = ('product', 'branch', 'quantity')
     list_filter = ('branch__shop', 'branch')
+
+@admin.register(DemandForecast)
+class DemandForecastAdmin(admin.ModelAdmin):
+    list_display = ('product', 'branch', 'daily_usage', 'computed_at')
+    list_filter = ('shop', 'branch')
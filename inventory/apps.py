@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class InventoryConfig(AppConfig):
@@ -6,3 +7,5 @@ class InventoryConfig(AppConfig):
 
     def ready(self):
         import inventory.signals
+        from .search import ensure_search_index
+        post_migrate.connect(ensure_search_index, sender=self)
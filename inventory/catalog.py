@@ -0,0 +1,77 @@
+"""
+The POS catalog: every product of a shop with its stock in one branch, which
+sales/pos.html downloads once after the page has loaded and then searches and
+scans against locally.
+
+The document is columnar (one array per field, see COLUMNS) and cached already
+gzip-compressed, per branch and tagged with two versions: the shop's product
+version (inventory.search, bumped on product saves, deletes and imports) and
+the branch's stock version, bumped on Stock saves (inventory.signals) and by
+deduct_stock(), whose bulk updates skip the signals. The ETag is derived from
+the versions alone, so a POS reloading an unchanged catalog is answered 304
+without reading a product or stock row, and a cache hit reads none either.
+
+With the default per-process cache a bump only reaches the process that made
+it, so the versions also carry a time bucket that turns over every TTL seconds:
+no process serves a catalog (or a 304) older than that.
+"""
+import gzip
+import json
+import time
+from django.core.cache import cache
+from shops.conditional import bump_version, get_version, make_etag
+from .models import Product, Stock
+from . import search
+
+PREFIX = 'pos-catalog:'
+TTL = 60 # Upper bound on staleness with a per-process cache backend
+COLUMNS = ('id', 'name', 'sku', 'barcode', 'price', 'stock')
+
+
+def stock_version_name(branch_id):
+    return f'stock:{branch_id}'
+
+
+def invalidate_stock(branch_id):
+    bump_version(stock_version_name(branch_id))
+
+
+def get_versions(shop_id, branch_id):
+    """(product version, stock version, time bucket)"""
+    return (
+        get_version(search.version_name(shop_id)), get_version(stock_version_name(branch_id)), int(time.time() // TTL)
+    )
+
+
+def get_etag(shop_id, branch_id, versions):
+    return make_etag('pos-catalog', shop_id, branch_id, *versions)
+
+
+def build(shop_id, branch_id):
+    """The catalog document: {'branch', 'count', 'columns', 'id': [...], 'name': [...], ...}, by name."""
+    quantities = dict(Stock.objects.filter(branch_id=branch_id).values_list('product_id', 'quantity'))
+    rows = (
+        Product.objects.filter(shop_id=shop_id).order_by('name', 'pk')
+        .values_list('id', 'name', 'sku', 'barcode', 'selling_price')
+    )
+    document = {'branch': branch_id, 'count': 0, 'columns': COLUMNS, **{column: [] for column in COLUMNS}}
+    for pk, name, sku, barcode, price in rows:
+        document['id'].append(pk)
+        document['name'].append(name)
+        document['sku'].append(sku)
+        document['barcode'].append(barcode)
+        document['price'].append(str(price)) # Exact, as the serializers render it
+        document['stock'].append(quantities.get(pk, 0))
+    document['count'] = len(document['id'])
+    return document
+
+
+def get_compressed(shop_id, branch_id, versions):
+    """The gzip-compressed JSON catalog for these versions (see get_versions), from the cache or built."""
+    key = PREFIX + ':'.join(map(str, (branch_id, *versions)))
+    data = cache.get(key)
+    if data is None:
+        content = json.dumps(build(shop_id, branch_id), separators=(',', ':'), ensure_ascii=False)
+        data = gzip.compress(content.encode(), compresslevel=6)
+        cache.set(key, data, TTL) # The bucket has turned over by then
+    return data
@@ -0,0 +1,251 @@
+"""
+Streaming stock exports (CSV, XLSX, PDF), run by the STOCK_EXPORT background job.
+Rows are read with .iterator() and written to the output file as they arrive,
+so memory use stays flat no matter how many Stock rows a shop has.
+"""
+import csv
+import io
+import logging
+import os
+from datetime import datetime
+from django.conf import settings
+from django.db.models import Max, Value
+from django.db.models.functions import Coalesce, Length
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.drawing.image import Image as ExcelImage
+from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from .models import Stock
+
+CHUNK_SIZE = 2000
+HEADERS = ['Product Name', 'Category', 'Branch', 'Quantity', 'Cost Price', 'Selling Price', 'Total Value']
+LOGO_PATH = os.path.join(settings.BASE_DIR, 'eduka_backend', 'static', 'img', 'logoeduka.png')
+
+logger = logging.getLogger(__name__)
+
+
+def stock_export_queryset(shop):
+    return Stock.objects.filter(branch__shop=shop).order_by('pk')
+
+
+def iter_stock_rows(shop, progress=None, chunk_size=CHUNK_SIZE):
+    """
+    Yields (name, category, branch, quantity, cost_price, selling_price, total_value) tuples.
+    Plain values_list rows fetched in chunks (server-side cursor on PostgreSQL), no model instances.
+    `progress(rows_done)` is called once per chunk.
+    """
+    rows = stock_export_queryset(shop).values_list(
+        'product__name', 'product__category__name', 'branch__name',
+        'quantity', 'product__cost_price', 'product__selling_price'
+    ).iterator(chunk_size=chunk_size)
+    for index, (name, category, branch, quantity, cost_price, selling_price) in enumerate(rows, 1):
+        cost_price = cost_price or 0
+        yield name, category or "-", branch, quantity, cost_price, selling_price or 0, quantity * cost_price
+        if progress and index % chunk_size == 0:
+            progress(index)
+
+
+def export_filename(extension):
+    return f"Stock_Report_{datetime.now().strftime('%Y%m%d')}.{extension}"
+
+
+def write_stock_csv(shop, output, progress=None):
+    """Writes the CSV export to the binary file `output`."""
+    text = io.TextIOWrapper(output, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow(HEADERS)
+    total_value_sum = 0
+    for row in iter_stock_rows(shop, progress):
+        total_value_sum += row[-1]
+        writer.writerow(row)
+    writer.writerow([])
+    writer.writerow(['', '', '', '', '', 'Total Inventory Value:', total_value_sum])
+    text.flush()
+    text.detach() # Leave `output` open for the caller
+
+
+def stock_column_widths(shop):
+    """Column widths from the longest text values, computed in the database instead of walking every cell."""
+    lengths = stock_export_queryset(shop).aggregate(
+        name=Max(Length('product__name')),
+        category=Max(Coalesce(Length('product__category__name'), Value(1))),
+        branch=Max(Length('branch__name')),
+    )
+    text_widths = [lengths['name'] or 0, lengths['category'] or 0, lengths['branch'] or 0]
+    # Numeric columns: wide enough for the header and typical amounts
+    widths = text_widths + [10, 14, 14, 16]
+    return [max(width, len(header)) + 2 for width, header in zip(widths, HEADERS)]
+
+
+def write_stock_excel(shop, output, progress=None):
+    """
+    Writes the XLSX export to `output` with openpyxl's write-only mode
+    (rows are spooled to a temp file instead of being kept as cells).
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Stock List")
+
+    for index, width in enumerate(stock_column_widths(shop), 1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+
+    # Logo
+    if os.path.exists(LOGO_PATH):
+        try:
+            img = ExcelImage(LOGO_PATH)
+            img.height = 60
+            img.width = 150
+            ws.add_image(img, 'A1')
+            ws.row_dimensions[1].height = 50
+        except Exception:
+            logger.exception("Could not add the logo to the Excel stock export")
+
+    # Title on row 4, headers on row 6 (space left for the logo)
+    ws.append([])
+    ws.append([])
+    ws.append([])
+    title = WriteOnlyCell(ws, value=f"Stock Report - {shop.name}")
+    title.font = Font(bold=True, size=14)
+    ws.append([title])
+    ws.merged_cells.add('A4:F4')
+    ws.append([])
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="4e73df", end_color="4e73df", fill_type="solid")
+    header_alignment = Alignment(horizontal='center')
+    header_cells = []
+    for header in HEADERS:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    total_value_sum = 0
+    for row in iter_stock_rows(shop, progress):
+        total_value_sum += row[-1]
+        ws.append(row)
+
+    # Footer
+    ws.append([])
+    label = WriteOnlyCell(ws, value="Total Inventory Value:")
+    label.font = Font(bold=True)
+    total = WriteOnlyCell(ws, value=total_value_sum)
+    total.font = Font(bold=True)
+    ws.append([None, None, None, None, None, label, total])
+
+    wb.save(output)
+
+
+def fit_text(text, font, size, width):
+    """Truncates text so it fits in a column of the given width."""
+    text = str(text)
+    if stringWidth(text, font, size) <= width:
+        return text
+    while text and stringWidth(text + "...", font, size) > width:
+        text = text[:-1]
+    return text + "..."
+
+
+def write_stock_pdf(shop, output, progress=None):
+    """
+    Writes the PDF export to `output`, drawing straight onto the canvas one page
+    at a time (no platypus Table holding every row).
+    """
+    pdf = canvas.Canvas(output, pagesize=A4, pageCompression=1)
+    page_width, page_height = A4
+    margin = 0.5 * inch
+    row_height = 18
+    col_widths = [3.0*inch, 1.5*inch, 0.8*inch, 1.0*inch, 1.2*inch]
+    table_width = sum(col_widths)
+    left = (page_width - table_width) / 2
+    blue = colors.HexColor('#4e73df')
+    grid = colors.HexColor('#e3e6f0')
+    now = datetime.now()
+
+    def draw_header(first_page):
+        y = page_height - margin
+        if first_page:
+            if os.path.exists(LOGO_PATH):
+                try:
+                    pdf.drawImage(LOGO_PATH, (page_width - 2.0*inch) / 2, y - 0.8*inch, width=2.0*inch, height=0.8*inch, mask='auto')
+                    y -= 0.8*inch + 12
+                except Exception:
+                    logger.exception("Could not add the logo to the PDF stock export")
+            pdf.setFillColor(blue)
+            pdf.setFont("Helvetica-Bold", 18)
+            pdf.drawCentredString(page_width / 2, y - 18, "Stock Inventory Report")
+            pdf.setFillColor(colors.grey)
+            pdf.setFont("Helvetica", 12)
+            pdf.drawCentredString(page_width / 2, y - 40, f"Shop: {shop.name} | Date: {now.strftime('%B %d, %Y')}")
+            y -= 64
+
+        # Column headers, repeated on every page
+        pdf.setFillColor(blue)
+        pdf.rect(left, y - row_height, table_width, row_height, stroke=0, fill=1)
+        pdf.setFillColor(colors.white)
+        pdf.setFont("Helvetica", 10)
+        x = left
+        for header, width in zip(['Product Name', 'Branch', 'Qty', 'Cost Price', 'Total Value'], col_widths):
+            pdf.drawCentredString(x + width / 2, y - row_height + 5, header)
+            x += width
+        return y - row_height
+
+    def draw_row(y, values, shade=None, bold=False):
+        if shade:
+            pdf.setFillColor(shade)
+            pdf.rect(left, y - row_height, table_width, row_height, stroke=0, fill=1)
+        pdf.setStrokeColor(grid)
+        pdf.setLineWidth(0.5)
+        pdf.rect(left, y - row_height, table_width, row_height, stroke=1, fill=0)
+        pdf.setFillColor(colors.black)
+        font = "Helvetica-Bold" if bold else "Helvetica"
+        pdf.setFont(font, 9)
+        x = left
+        for index, (value, width) in enumerate(zip(values, col_widths)):
+            if index < 2:
+                pdf.drawString(x + 4, y - row_height + 5, fit_text(value, font, 9, width - 8))
+            else:
+                pdf.drawRightString(x + width - 4, y - row_height + 5, value)
+            x += width
+        return y - row_height
+
+    y = draw_header(first_page=True)
+    total_val = 0
+    total_items = 0
+    for index, (name, _, branch, quantity, cost_price, _, value) in enumerate(iter_stock_rows(shop, progress), 1):
+        if y - row_height < margin:
+            pdf.showPage()
+            y = draw_header(first_page=False)
+        total_val += value
+        total_items += quantity
+        shade = colors.HexColor('#f8f9fc') if index % 2 == 0 else None
+        y = draw_row(y, [name, branch, str(quantity), f"{cost_price:,.2f}", f"{value:,.2f}"], shade)
+
+    # Totals row and footer note
+    if y - row_height - 40 < margin:
+        pdf.showPage()
+        y = draw_header(first_page=False)
+    y = draw_row(y, ["Total", "", str(total_items), "", f"{total_val:,.2f}"], colors.HexColor('#eaecf4'), bold=True)
+    pdf.setStrokeColor(blue)
+    pdf.setLineWidth(1)
+    pdf.line(left, y + row_height, left + table_width, y + row_height)
+    pdf.setFillColor(colors.grey)
+    pdf.setFont("Helvetica", 8)
+    pdf.drawCentredString(page_width / 2, y - 30, f"Generated by eDuka System on {now.strftime('%Y-%m-%d %H:%M')}")
+
+    pdf.save()
+
+
+# format -> (writer, file extension)
+STOCK_EXPORT_FORMATS = {
+    'csv': (write_stock_csv, 'csv'),
+    'excel': (write_stock_excel, 'xlsx'),
+    'pdf': (write_stock_pdf, 'pdf'),
+}
@@ -1,45 +1,219 @@
 from django.utils import timezone
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Sum, OuterRef, Subquery
+from django.db.models.functions import TruncDate
 from datetime import timedelta
+from reports.aggregation import day_start
 from sales.models import SaleItem
+from .models import Stock, DemandForecast
+
+HISTORY_DAYS = 56 # Eight full weeks: every weekday gets the same number of samples
+SMOOTHING = 0.2 # Weight of the newest day in the exponentially weighted level
 
 class SalesForecaster:
-    def predict_daily_usage(self, product, shop, days=30):
+    def sold_quantities(self, shop, days=30, product_ids=None):
         """
-        Calculates the average daily usage of a product over the last X days.
+        Units sold per (product_id, branch_id) over the last X days, in one grouped query.
         """
         end_date = timezone.now()
         start_date = end_date - timedelta(days=days)
 
-        # Filter sales for this product in this shop (across all branches or specific logic?)
-        # As SaleItem doesn't directly link to Shop, we filter via Sale -> Shop
-        total_sold = SaleItem.objects.filter(
-            product=product,
+        # SaleItem doesn't directly link to Shop/Branch, so we filter and group via Sale
+        items = SaleItem.objects.filter(
             sale__shop=shop,
-            sale__created_at__range=(start_date, end_date)
-        ).aggregate(Sum('quantity'))['quantity__sum'] or 0
+            sale__created_at__range=(start_date, end_date),
+            product__isnull=False
+        )
+        if product_ids is not None:
+            items = items.filter(product_id__in=product_ids)
 
-        return total_sold / days
+        rows = items.values('product_id', 'sale__branch_id').annotate(total=Sum('quantity')).values_list(
+            'product_id', 'sale__branch_id', 'total'
+        )
+        return {(product_id, branch_id): total or 0 for product_id, branch_id, total in rows}
 
-    def predict_runout_date(self, stock):
+    def daily_sales(self, shop, start_date, end_date):
         """
-        Predicts the date when stock will run out.
-        Returns: (date, days_left, status)
+        Units sold per day for every (product_id, branch_id) with sales between
+        start_date and end_date (exclusive), in one grouped query.
+        Returns {(product_id, branch_id): [units per day, oldest first]}.
+        """
+        days = (end_date - start_date).days
+        rows = SaleItem.objects.filter(
+            sale__shop=shop,
+            sale__created_at__gte=day_start(start_date),
+            sale__created_at__lt=day_start(end_date),
+            product__isnull=False
+        ).values('product_id', 'sale__branch_id', day=TruncDate('sale__created_at')).annotate(
+            total=Sum('quantity')
+        ).values_list('product_id', 'sale__branch_id', 'day', 'total')
+
+        series = {}
+        for product_id, branch_id, day, total in rows:
+            values = series.setdefault((product_id, branch_id), [0] * days)
+            values[(day - start_date).days] += total or 0
+        return series
+
+    def estimate(self, series, start_date):
+        """
+        Seasonal exponential smoothing of one daily series.
+        Returns (level, weekday_factors): the smoothed units per day with the
+        day-of-week effect removed, and the Monday..Sunday demand multipliers.
+        """
+        total = sum(series)
+        if not total:
+            return 0.0, [1.0] * 7
+
+        mean = total / len(series)
+        sums = [0] * 7
+        counts = [0] * 7
+        weekday = start_date.weekday()
+        for value in series:
+            sums[weekday] += value
+            counts[weekday] += 1
+            weekday = (weekday + 1) % 7
+        factors = [(sums[w] / counts[w]) / mean if counts[w] else 1.0 for w in range(7)]
+
+        level = mean
+        weekday = start_date.weekday()
+        for value in series:
+            factor = factors[weekday]
+            if factor: # Weekdays that never sell tell us nothing about the level
+                level = SMOOTHING * (value / factor) + (1 - SMOOTHING) * level
+            weekday = (weekday + 1) % 7
+        return level, [round(factor, 3) for factor in factors]
+
+    def refresh(self, shop, days=HISTORY_DAYS):
+        """
+        Recomputes the shop's DemandForecast rows from the last `days` full days of sales.
+        Returns the number of (product, branch) forecasts written.
+        """
+        end_date = timezone.localdate()
+        start_date = end_date - timedelta(days=days)
+        now = timezone.now()
+
+        forecasts = []
+        for (product_id, branch_id), series in self.daily_sales(shop, start_date, end_date).items():
+            level, factors = self.estimate(series, start_date)
+            forecasts.append(DemandForecast(
+                shop=shop, product_id=product_id, branch_id=branch_id, daily_usage=level,
+                weekday_factors=factors, window_days=days, computed_at=now
+            ))
+
+        with transaction.atomic():
+            DemandForecast.objects.filter(shop=shop).delete()
+            DemandForecast.objects.bulk_create(forecasts, batch_size=1000)
+        return len(forecasts)
+
+    def runout(self, quantity, daily_usage, now=None, weekday_factors=None):
+        """
+        Returns: (date, days_left, status) for a stock level and daily usage.
+        With weekday factors, stock is drawn down day by day at the seasonal rate.
         """
-        daily_usage = self.predict_daily_usage(stock.product, stock.branch.shop)
-        
         if daily_usage <= 0:
             return None, None, 'Stagnant'
 
-        days_left = stock.quantity / daily_usage
-        
+        now = now or timezone.now()
+        if weekday_factors and sum(weekday_factors) > 0:
+            weekly_usage = daily_usage * sum(weekday_factors)
+            full_weeks = int(quantity // weekly_usage)
+            remaining = quantity - full_weeks * weekly_usage
+            days_left = full_weeks * 7
+            weekday = timezone.localtime(now).weekday()
+            while remaining > 0: # Less than a week left, so at most 7 steps
+                usage = daily_usage * weekday_factors[weekday]
+                if remaining < usage:
+                    days_left += remaining / usage
+                    break
+                remaining -= usage
+                days_left += 1
+                weekday = (weekday + 1) % 7
+        else:
+            days_left = quantity / daily_usage
+
         # Cap at specific reasonable limits or just return raw
-        runout_date = timezone.now() + timedelta(days=days_left)
-        
+        runout_date = now + timedelta(days=days_left)
+
         status = 'Safe'
         if days_left <= 3:
             status = 'Critical'
         elif days_left <= 7:
             status = 'Low'
-            
+
         return runout_date, int(days_left), status
+
+    def precomputed(self, shop):
+        """
+        Forecasts for the shop's in-stock items that sell, read from DemandForecast
+        with the live stock quantity in the same (indexed) query.
+        Same result format as forecast(), without the stagnant items.
+        """
+        rows = DemandForecast.objects.filter(shop=shop, daily_usage__gt=0).select_related('product', 'branch').annotate(
+            current_stock=Subquery(
+                Stock.objects.filter(product=OuterRef('product_id'), branch=OuterRef('branch_id')).values('quantity')[:1]
+            )
+        ).filter(current_stock__gt=0)
+
+        now = timezone.now()
+        results = []
+        for row in rows:
+            runout_date, days_left, status = self.runout(row.current_stock, row.daily_usage, now, row.weekday_factors)
+            results.append({
+                'product': row.product,
+                'branch': row.branch,
+                'current_stock': row.current_stock,
+                'daily_usage': row.daily_usage,
+                'days_left': days_left,
+                'runout_date': runout_date,
+                'status': status,
+            })
+
+        results.sort(key=lambda x: x['days_left'])
+        return results
+
+    def forecast(self, shop, stocks=None, days=30):
+        """
+        Live forecast of every stock of the shop (default: all with positive quantity)
+        from its branch's sales: one query for the stocks, one for the sold quantities.
+        Returns dicts (product, branch, current_stock, daily_usage, days_left,
+        runout_date, status) sorted by urgency, stagnant items last.
+        """
+        if stocks is None:
+            stocks = Stock.objects.filter(branch__shop=shop, quantity__gt=0).select_related('product', 'branch')
+            product_ids = None
+        else:
+            product_ids = {stock.product_id for stock in stocks}
+
+        sold = self.sold_quantities(shop, days, product_ids)
+        now = timezone.now()
+        results = []
+        for stock in stocks:
+            daily_usage = sold.get((stock.product_id, stock.branch_id), 0) / days
+            runout_date, days_left, status = self.runout(stock.quantity, daily_usage, now)
+            results.append({
+                'product': stock.product,
+                'branch': stock.branch,
+                'current_stock': stock.quantity,
+                'daily_usage': daily_usage,
+                'days_left': days_left,
+                'runout_date': runout_date,
+                'status': status,
+            })
+
+        results.sort(key=lambda x: (x['days_left'] is None, x['days_left'] or 0))
+        return results
+
+    def predict_daily_usage(self, product, shop, days=30):
+        """
+        Calculates the average daily usage of a product over the last X days (all branches).
+        """
+        sold = self.sold_quantities(shop, days, product_ids=[product.pk])
+        return sum(sold.values()) / days
+
+    def predict_runout_date(self, stock):
+        """
+        Predicts the date when stock will run out, from the sales of its branch.
+        Returns: (date, days_left, status)
+        """
+        result = self.forecast(stock.branch.shop_id, stocks=[stock])[0]
+        return result['runout_date'], result['days_left'], result['status']
@@ -0,0 +1,247 @@
+"""
+Set-based product CSV import.
+The whole file is parsed and validated first, then categories, products, stocks
+and movements are written with a handful of bulk queries instead of several
+queries per row (and no per-row create_initial_stock signal).
+"""
+from decimal import Decimal, InvalidOperation
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from dashboard import stats as dashboard_stats
+from shops.models import Branch
+from shops import storefront
+from .models import Product, Category, Stock, StockMovement
+from .provisioning import deferred_stock_provisioning, products_created
+from . import search
+
+BATCH_SIZE = 1000
+PROGRESS_EVERY = 500
+
+PRODUCT_UPDATE_FIELDS = ['category_id', 'selling_price', 'cost_price', 'si_unit', 'product_type', 'barcode']
+
+
+class InvalidPrice(ValueError):
+    pass
+
+
+def validate_fields(model, values):
+    """Runs the model field validators (max_length, max_digits...) so bad rows fail alone, not the whole batch."""
+    for field_name, value in values.items():
+        if value in (None, ''):
+            continue
+        try:
+            model._meta.get_field(field_name).run_validators(value)
+        except ValidationError as e:
+            raise ValueError(f"{field_name}: {' '.join(e.messages)}")
+
+
+def update_grouped(queryset, groups):
+    """
+    Applies {values: [pk, ...]} with one UPDATE per distinct set of values (and per BATCH_SIZE pks).
+    Imports repeat the same prices/thresholds a lot, so this is far fewer statements than
+    bulk_update's per-row CASE expressions, which are also slow to build in Python.
+    """
+    for values, pks in groups.items():
+        for start in range(0, len(pks), BATCH_SIZE):
+            queryset.filter(pk__in=pks[start:start + BATCH_SIZE]).update(**dict(values))
+
+
+def parse_row(row):
+    """Returns the cleaned values of one CSV row (raises ValueError on bad input)."""
+    try:
+        selling_price = Decimal(row.get('Selling Price (Bei Kuuzia)', '0').replace(',', '') or 0)
+        cost_price = Decimal(row.get('Cost Price (Bei Kununua)', '0').replace(',', '') or 0)
+    except (InvalidOperation, AttributeError):
+        raise InvalidPrice()
+
+    product_type_str = (row.get('Type (Bidhaa/Huduma - GOODS/SERVICE)') or 'GOODS').upper()
+    data = {
+        'name': row.get('Name (Jina)', '').strip(),
+        'category_name': (row.get('Category (Kundi)') or '').strip(),
+        'product_type': Product.Type.SERVICE if 'SERVICE' in product_type_str else Product.Type.GOODS,
+        'sku': (row.get('SKU') or '').strip(),
+        'barcode': (row.get('Barcode') or '').strip(),
+        'selling_price': selling_price,
+        'cost_price': cost_price,
+        'si_unit': (row.get('SI Unit (Kipimo)') or '').strip(),
+        'opening_stock': int(row.get('Opening Stock (Stock)', '0') or 0),
+        'threshold': int(row.get('Low Stock Threshold (Kiwango cha chini)', '0') or 0),
+    }
+    validate_fields(Product, {
+        field: data[field] for field in ('name', 'sku', 'barcode', 'si_unit', 'selling_price', 'cost_price')
+    })
+    validate_fields(Category, {'name': data['category_name']})
+    return data
+
+
+def import_products(shop, rows, user=None, progress=None):
+    """
+    Upserts products from template CSV rows (dicts). Products are matched by SKU
+    first, then by name, exactly like the old row-by-row import, including rows
+    that match a product created earlier in the same file.
+    Opening stock is added to the main branch (or the only branch).
+    Returns (created_count, updated_count, errors).
+    """
+    # 1. Parse and validate everything up front
+    parsed = []
+    errors = []
+    for index, row in enumerate(rows, start=1):
+        if progress and index % PROGRESS_EVERY == 0:
+            progress(index)
+        name = (row.get('Name (Jina)') or '').strip()
+        if not name:
+            continue # Skip empty rows
+        try:
+            parsed.append(dict(parse_row(row), row=index))
+        except InvalidPrice:
+            errors.append(f"Row {index}: Invalid price format.")
+        except Exception as e:
+            errors.append(f"Row {index} ({name}): {str(e)}")
+
+    with transaction.atomic():
+        # 2. Categories: one lookup, one bulk insert for the new names
+        category_names = {data['category_name'] for data in parsed if data['category_name']}
+        existing_names = set(Category.objects.filter(shop=shop).values_list('name', flat=True))
+        Category.objects.bulk_create(
+            [Category(shop=shop, name=name) for name in category_names - existing_names],
+            batch_size=BATCH_SIZE, ignore_conflicts=True
+        )
+        categories = {c.name: c for c in Category.objects.filter(shop=shop)} if category_names else {}
+
+        # 3. Existing products keyed by SKU and by name (first match wins, as .first() did), and by barcode
+        by_sku = {}
+        by_name = {}
+        by_barcode = {}
+        for product in Product.objects.filter(shop=shop).order_by('pk').iterator(chunk_size=BATCH_SIZE):
+            if product.sku:
+                by_sku.setdefault(product.sku, product)
+            by_name.setdefault(product.name, product)
+            if product.barcode:
+                by_barcode[product.barcode] = product
+
+        to_create = []
+        changed = {}
+        stock_rows = [] # (product, opening_stock, threshold) for goods rows
+        created_count = 0
+        updated_count = 0
+
+        for data in parsed:
+            product = by_sku.get(data['sku']) if data['sku'] else None
+            if not product:
+                product = by_name.get(data['name'])
+
+            category = categories.get(data['category_name']) if data['category_name'] else None
+
+            # Barcodes are unique per shop
+            owner = by_barcode.get(data['barcode']) if data['barcode'] else None
+            if owner is not None and owner is not product:
+                errors.append(f"Row {data['row']} ({data['name']}): Barcode {data['barcode']} is already used by {owner.name}.")
+                continue
+
+            if product:
+                values = {
+                    'category_id': category.pk if category else None,
+                    'selling_price': data['selling_price'],
+                    'cost_price': data['cost_price'],
+                    'si_unit': data['si_unit'],
+                    'product_type': data['product_type'],
+                }
+                if data['barcode']:
+                    values['barcode'] = data['barcode']
+                    by_barcode[data['barcode']] = product
+                if any(getattr(product, field) != value for field, value in values.items()):
+                    for field, value in values.items():
+                        setattr(product, field, value)
+                    if product.pk:
+                        changed[product.pk] = product # Unchanged products are not written at all
+                updated_count += 1
+            else:
+                product = Product(
+                    shop=shop,
+                    name=data['name'],
+                    category=category,
+                    product_type=data['product_type'],
+                    sku=data['sku'],
+                    barcode=data['barcode'] or None,
+                    selling_price=data['selling_price'],
+                    cost_price=data['cost_price'],
+                    si_unit=data['si_unit'],
+                )
+                to_create.append(product)
+                if data['barcode']:
+                    by_barcode[data['barcode']] = product
+                if data['sku']:
+                    by_sku.setdefault(data['sku'], product)
+                by_name.setdefault(data['name'], product)
+                created_count += 1
+
+            if product.product_type == Product.Type.GOODS:
+                stock_rows.append((product, data['opening_stock'], data['threshold']))
+
+        # 4.-5. One provisioning pass for every product the import creates, however they are saved
+        with deferred_stock_provisioning():
+            # 4. Products: bulk insert + grouped updates (bulk_create doesn't fire create_initial_stock)
+            Product.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+            product_groups = {}
+            now = timezone.now()
+            for product in changed.values():
+                values = tuple((field, getattr(product, field)) for field in PRODUCT_UPDATE_FIELDS) + (('updated_at', now),)
+                product_groups.setdefault(values, []).append(product.pk)
+            update_grouped(Product.objects.all(), product_groups)
+
+            # 5. Stock rows for every branch: new products (what the signal does) and imported goods missing some
+            branches = list(Branch.objects.filter(shop=shop))
+            needs_stock = {product.pk for product in to_create}
+            stocked = dict(
+                Stock.objects.filter(branch__shop=shop).values('product_id').annotate(n=Count('pk')).values_list('product_id', 'n')
+            )
+            needs_stock.update(product.pk for product, _, _ in stock_rows if stocked.get(product.pk, 0) < len(branches))
+            products_created(shop.pk, needs_stock)
+
+        # 6. Opening stock goes to the main branch (or the only branch)
+        target_branches = [branch for branch in branches if branch.is_main or len(branches) == 1]
+        if stock_rows and target_branches:
+            deltas = {}
+            for product, opening_stock, threshold in stock_rows:
+                for branch in target_branches:
+                    key = (product.pk, branch.pk)
+                    quantity, _ = deltas.get(key, (0, None))
+                    deltas[key] = (quantity + opening_stock, threshold) # Last row's threshold wins
+
+            stocks = {
+                (stock.product_id, stock.branch_id): stock
+                for stock in Stock.objects.filter(branch__in=target_branches).only('pk', 'product_id', 'branch_id')
+                if (stock.product_id, stock.branch_id) in deltas
+            }
+            stock_groups = {}
+            for key, stock in stocks.items():
+                quantity, threshold = deltas[key]
+                stock_groups.setdefault((quantity, threshold), []).append(stock.pk)
+            update_grouped(Stock.objects.all(), {
+                # F() keeps this safe against sales running meanwhile
+                (('quantity', F('quantity') + quantity), ('low_stock_threshold', threshold), ('updated_at', now)): pks
+                for (quantity, threshold), pks in stock_groups.items()
+            })
+
+            # Log Movement for Import (one per row, as before)
+            StockMovement.objects.bulk_create([
+                StockMovement(
+                    stock=stocks[(product.pk, branch.pk)],
+                    product=product,
+                    branch=branch,
+                    quantity_change=opening_stock,
+                    movement_type=StockMovement.Type.ADD,
+                    unit_cost=product.cost_price,
+                    reason="Bulk Import: Added via CSV",
+                    user=user
+                )
+                for product, opening_stock, _ in stock_rows if opening_stock > 0
+                for branch in target_branches
+            ], batch_size=BATCH_SIZE)
+
+    dashboard_stats.bump_version(shop.pk) # Bulk stock writes don't fire the signals
+    storefront.invalidate(shop.slug) # Nor do the bulk product writes
+    search.invalidate(shop.pk)
+    return created_count, updated_count, errors
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from shops.models import Branch
+from inventory.provisioning import provision_branch
+
+class Command(BaseCommand):
+    help = 'Creates the missing 0 quantity Stock rows so every product has one in every branch of its shop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, action='append', dest='shops', help='Only provision this shop id (repeatable)')
+
+    def handle(self, *args, **options):
+        branches = Branch.objects.order_by('pk')
+        if options.get('shops'):
+            branches = branches.filter(shop_id__in=options['shops'])
+
+        count = 0
+        for branch in branches:
+            provision_branch(branch)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Provisioned stock rows for {count} branch(es).'))
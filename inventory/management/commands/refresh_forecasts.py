@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from shops.models import Shop
+from inventory.forecasting import SalesForecaster, HISTORY_DAYS
+
+class Command(BaseCommand):
+    help = 'Recomputes the per-branch DemandForecast rows from recent sales (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, action='append', dest='shops', help='Only refresh this shop id (repeatable)')
+        parser.add_argument('--days', type=int, default=HISTORY_DAYS, help='Days of sales history to use')
+
+    def handle(self, *args, **options):
+        shops = Shop.objects.order_by('pk')
+        if options.get('shops'):
+            shops = shops.filter(pk__in=options['shops'])
+
+        forecaster = SalesForecaster()
+        count = 0
+        for shop in shops.iterator():
+            count += forecaster.refresh(shop, days=options['days'])
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully wrote {count} demand forecasts.'))
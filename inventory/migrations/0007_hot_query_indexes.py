@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-17 20:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_delete_happyhour'),
+        ('shops', '0003_shop_public_visibility_shop_slug'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('sku__isnull', False)), fields=['shop', 'sku'], name='inv_product_shop_sku_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('barcode__isnull', False)), fields=['shop', 'barcode'], name='inv_product_shop_barcode_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['branch', 'movement_type', 'created_at'], name='inv_movement_branch_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(condition=models.Q(('movement_type__in', ['DISPOSAL', 'DAMAGED', 'EXPIRED'])), fields=['branch', 'created_at'], name='inv_movement_disposal_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-17 21:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_hot_query_indexes'),
+        ('shops', '0003_shop_public_visibility_shop_slug'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('daily_usage', models.FloatField(default=0, help_text='Seasonally adjusted units sold per day')),
+                ('weekday_factors', models.JSONField(default=list, help_text='Demand multipliers, Monday to Sunday')),
+                ('window_days', models.IntegerField(default=56)),
+                ('computed_at', models.DateTimeField()),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecasts', to='shops.branch')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecasts', to='inventory.product')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecasts', to='shops.shop')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['shop', 'daily_usage'], name='inv_forecast_shop_usage_idx')],
+                'unique_together': {('product', 'branch')},
+            },
+        ),
+    ]
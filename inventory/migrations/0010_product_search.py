@@ -0,0 +1,63 @@
+# Generated by Django 6.0 on 2026-10-17 23:20
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_barcodes(apps, schema_editor):
+    """
+    Blank barcodes become NULL. A barcode shared by several products of a shop
+    stops the migration with the list to resolve: only the operator can tell
+    which product the code really belongs to.
+    """
+    Product = apps.get_model('inventory', 'Product')
+    Product.objects.filter(barcode='').update(barcode=None)
+    shared = (
+        Product.objects.filter(barcode__isnull=False).values('shop_id', 'barcode')
+        .annotate(n=Count('pk')).filter(n__gt=1).order_by('shop_id', 'barcode')
+    )
+    conflicts = []
+    for row in shared:
+        pks = Product.objects.filter(shop_id=row['shop_id'], barcode=row['barcode']).order_by('pk').values_list('pk', flat=True)
+        conflicts.append(f"  shop {row['shop_id']}, barcode {row['barcode']!r}: products {', '.join(map(str, pks))}")
+    if conflicts:
+        raise RuntimeError(
+            "Barcodes must be unique per shop. Change or clear the barcode of all but one "
+            "product in each group, then migrate again:\n" + '\n'.join(conflicts)
+        )
+
+
+def create_trigram_index(apps, schema_editor):
+    # Name search on PostgreSQL (inventory.search); SQLite gets an FTS5 table instead
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS inv_product_name_trgm_idx ON inventory_product USING gin (UPPER(name) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS inv_product_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_sync_updated_at'),
+        ('shops', '0004_shop_directory_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_barcodes, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='inv_product_shop_barcode_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(condition=models.Q(('barcode__isnull', False)), fields=('shop', 'barcode'), name='inv_product_shop_barcode_uniq'),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
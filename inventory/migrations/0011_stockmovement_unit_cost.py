@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-17 23:55
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_unit_cost(apps, schema_editor):
+    # Existing movements are valued at today's cost, as the reports did until now
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+    Product = apps.get_model('inventory', 'Product')
+    StockMovement.objects.filter(unit_cost__isnull=True).update(
+        unit_cost=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('cost_price')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_product_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockmovement',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_unit_cost, migrations.RunPython.noop),
+    ]
@@ -6,9 +6,14 @@ class Category(models.Model):
     shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='categories')
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('shop', 'name')
+        indexes = [
+            # Delta sync (sync.changes)
+            models.Index(fields=['shop', 'updated_at'], name='inv_category_shop_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.shop.name})"
@@ -34,6 +39,24 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # SKU lookups (imports, scanners); products without a code are left out of the index
+            models.Index(fields=['shop', 'sku'], name='inv_product_shop_sku_idx', condition=models.Q(sku__isnull=False)),
+            # Delta sync (sync.changes)
+            models.Index(fields=['shop', 'updated_at'], name='inv_product_shop_updated_idx'),
+        ]
+        constraints = [
+            # A scanned barcode identifies one product of the shop (inventory.search); blank codes are stored as NULL
+            models.UniqueConstraint(
+                fields=['shop', 'barcode'], condition=models.Q(barcode__isnull=False), name='inv_product_shop_barcode_uniq'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.barcode = self.barcode or None # '' would take the shop's one blank barcode
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
@@ -42,9 +65,15 @@ class Stock(models.Model):
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='stocks')
     quantity = models.IntegerField(default=0)
     low_stock_threshold = models.IntegerField(default=5)
+    # Also set explicitly by the queryset.update() paths (sale deductions, imports), which skip auto_now
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('product', 'branch')
+        indexes = [
+            # Delta sync (sync.changes)
+            models.Index(fields=['branch', 'updated_at'], name='inv_stock_branch_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.branch.name}: {self.quantity}"
@@ -66,9 +95,27 @@ class StockMovement(models.Model):
     quantity_change = models.IntegerField(help_text="Positive for addition, Negative for reduction")
     movement_type = models.CharField(max_length=20, choices=Type.choices)
     reason = models.CharField(max_length=255, blank=True, null=True)
+    # The product's cost price when the movement was recorded, so later cost edits don't revalue it
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
 
+    class Meta:
+        indexes = [
+            # Movement history / purchase lists per branch and type, newest first
+            models.Index(fields=['branch', 'movement_type', 'created_at'], name='inv_movement_branch_type_idx'),
+            # Disposal reports only ever read these three types
+            models.Index(
+                fields=['branch', 'created_at'], name='inv_movement_disposal_idx',
+                condition=models.Q(movement_type__in=['DISPOSAL', 'DAMAGED', 'EXPIRED'])
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.unit_cost is None and self.product_id:
+            self.unit_cost = self.product.cost_price
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.product.name} ({self.movement_type}): {self.quantity_change}"
 
@@ -76,3 +123,26 @@ class StockMovement(models.Model):
 
     def __str__(self):
         return f"{self.name} ({self.discount_percent}%)"
+
+class DemandForecast(models.Model):
+    """
+    Precomputed demand of a product in a branch (exponentially weighted daily level
+    plus day-of-week factors), refreshed nightly by `manage.py refresh_forecasts`.
+    """
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='demand_forecasts')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='demand_forecasts')
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='demand_forecasts')
+    daily_usage = models.FloatField(default=0, help_text="Seasonally adjusted units sold per day")
+    weekday_factors = models.JSONField(default=list, help_text="Demand multipliers, Monday to Sunday")
+    window_days = models.IntegerField(default=56)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('product', 'branch')
+        indexes = [
+            # Forecasting page / API: the shop's items that sell, in one range scan
+            models.Index(fields=['shop', 'daily_usage'], name='inv_forecast_shop_usage_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.branch.name}: {self.daily_usage:.2f}/day"
@@ -0,0 +1,97 @@
+"""
+Stock provisioning: every product has a Stock row (quantity 0 to start) in every
+branch of its shop. New products fan out to all branches and new branches are
+backfilled with the whole catalog, each with chunked bulk inserts.
+
+Inside `deferred_stock_provisioning()` the post_save signals and the bulk paths
+(inventory.importers) only record what was created, and everything is
+provisioned once when the block exits: one provision_products() call per shop.
+"""
+import threading
+from contextlib import contextmanager
+from dashboard import stats as dashboard_stats
+from shops.models import Branch
+from .models import Product, Stock
+
+CHUNK_SIZE = 2000
+
+_state = threading.local()
+
+
+def chunked(iterable, size=CHUNK_SIZE):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def provision_products(shop_id, product_ids, chunk_size=CHUNK_SIZE):
+    """Creates the missing Stock rows of these products in every branch of the shop."""
+    branch_ids = list(Branch.objects.filter(shop_id=shop_id).values_list('pk', flat=True))
+    if not branch_ids:
+        return
+    for chunk in chunked(product_ids, chunk_size):
+        Stock.objects.bulk_create(
+            [Stock(product_id=product_id, branch_id=branch_id, quantity=0) for product_id in chunk for branch_id in branch_ids],
+            batch_size=chunk_size, ignore_conflicts=True
+        )
+    dashboard_stats.bump_version(shop_id) # New 0 quantity rows count as low stock
+
+
+def provision_branch(branch, chunk_size=CHUNK_SIZE):
+    """Backfills Stock rows for the shop's whole catalog in a (new) branch."""
+    product_ids = Product.objects.filter(shop_id=branch.shop_id).order_by('pk').values_list('pk', flat=True)
+    for chunk in chunked(product_ids.iterator(chunk_size=chunk_size), chunk_size):
+        Stock.objects.bulk_create(
+            [Stock(product_id=product_id, branch_id=branch.pk, quantity=0) for product_id in chunk],
+            batch_size=chunk_size, ignore_conflicts=True
+        )
+    dashboard_stats.bump_version(branch.shop_id)
+
+
+
+def products_created(shop_id, product_ids):
+    """Provisions new products of a shop now, or when the enclosing deferred block exits."""
+    pending = getattr(_state, 'pending', None)
+    if pending is not None:
+        pending['products'].setdefault(shop_id, set()).update(product_ids)
+    else:
+        provision_products(shop_id, sorted(product_ids))
+
+
+def branch_created(branch):
+    pending = getattr(_state, 'pending', None)
+    if pending is not None:
+        pending['branches'].append(branch)
+    else:
+        provision_branch(branch)
+
+
+@contextmanager
+def deferred_stock_provisioning():
+    """
+    Defers the per-object provisioning of the post_save signals during bulk work:
+
+        with deferred_stock_provisioning():
+            for row in rows:
+                Product.objects.create(...)
+
+    Each block provisions what was created inside it when it exits, nested ones
+    included, so the Stock rows exist right after any block (the importer adds
+    opening stock to them). Nothing is provisioned if the block raises.
+    """
+    outer = getattr(_state, 'pending', None)
+    pending = _state.pending = {'products': {}, 'branches': []}
+    try:
+        yield
+    finally:
+        _state.pending = outer
+
+    for shop_id, product_ids in pending['products'].items():
+        provision_products(shop_id, sorted(product_ids))
+    for branch in pending['branches']:
+        provision_branch(branch)
@@ -0,0 +1,172 @@
+"""
+Product lookup by scanned code and product search by name, for the POS and
+the mobile app (ProductViewSet.lookup / .search).
+
+lookup() resolves a barcode (unique per shop, inv_product_shop_barcode_uniq),
+then a SKU (the oldest product having it, as the importer matches). Resolved
+rows, misses included, are kept in an in-process LRU keyed by (shop, code) and
+tagged with the shop's product version. Product saves, deletes and imports bump
+that version (inventory.signals, importers), so this process stops using
+entries of a changed catalog at once, and so do the others with a shared cache
+backend. With the default per-process cache other processes never see the
+bump, so entries also expire after LOCAL_TTL seconds. A repeated scan costs one
+cache read plus the branch stock query.
+
+search() matches every word of the query as a name prefix:
+- SQLite: the contentless FTS5 table inventory_product_fts, kept in step with
+  inventory_product by triggers. The shop is an indexed token, so a query only
+  reads its own shop's entries. ensure_search_index() creates it after every
+  migrate, because SQLite table rebuilds in later migrations drop the triggers.
+- PostgreSQL: icontains on the trigram index over UPPER(name) (migration 0010).
+- Other databases: istartswith.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from django.db import connection
+from django.db.models import Case, Q, Value, When
+from shops.conditional import bump_version, get_version
+from .models import Product, Stock
+
+FIELDS = ('id', 'name', 'sku', 'barcode', 'selling_price', 'si_unit', 'product_type', 'category_id')
+LOCAL_SIZE = 20000
+LOCAL_TTL = 30 # Upper bound on staleness with a per-process cache backend
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 50
+
+FTS_TABLE = 'inventory_product_fts'
+FTS_TRIGGERS = {
+    'inventory_product_fts_ai': (
+        "CREATE TRIGGER inventory_product_fts_ai AFTER INSERT ON inventory_product BEGIN "
+        "INSERT INTO inventory_product_fts (rowid, name, shop) VALUES (new.id, new.name, 's' || new.shop_id); END"
+    ),
+    'inventory_product_fts_ad': (
+        "CREATE TRIGGER inventory_product_fts_ad AFTER DELETE ON inventory_product BEGIN "
+        "INSERT INTO inventory_product_fts (inventory_product_fts, rowid, name, shop) "
+        "VALUES ('delete', old.id, old.name, 's' || old.shop_id); END"
+    ),
+    'inventory_product_fts_au': (
+        "CREATE TRIGGER inventory_product_fts_au AFTER UPDATE OF name, shop_id ON inventory_product BEGIN "
+        "INSERT INTO inventory_product_fts (inventory_product_fts, rowid, name, shop) "
+        "VALUES ('delete', old.id, old.name, 's' || old.shop_id); "
+        "INSERT INTO inventory_product_fts (rowid, name, shop) VALUES (new.id, new.name, 's' || new.shop_id); END"
+    ),
+}
+
+_MISSING = object()
+_local = OrderedDict() # (shop_id, code) -> (product version, row dict or None, local expiry)
+_lock = threading.Lock()
+
+
+def version_name(shop_id):
+    return f'products:{shop_id}'
+
+
+def invalidate(shop_id):
+    bump_version(version_name(shop_id))
+
+
+def find_code(shop_id, code):
+    """One query on the barcode and SKU indexes: the barcode match, else the oldest SKU match."""
+    return (
+        Product.objects.filter(Q(barcode=code) | Q(sku=code), shop_id=shop_id)
+        .order_by(Case(When(barcode=code, then=Value(0)), default=Value(1)), 'pk')
+        .values(*FIELDS).first()
+    )
+
+
+def with_stock(rows, branch_id):
+    """Copies of the rows with the branch's stock quantity (None without a branch or a stock row)."""
+    quantities = {}
+    if branch_id and rows:
+        quantities = dict(
+            Stock.objects.filter(branch_id=branch_id, product_id__in=[row['id'] for row in rows])
+            .values_list('product_id', 'quantity')
+        )
+    # Prices as strings, exact like ProductSerializer's
+    return [dict(row, selling_price=str(row['selling_price']), stock=quantities.get(row['id'])) for row in rows]
+
+
+def lookup(shop_id, code, branch_id=None):
+    """The product of the shop with this barcode or SKU, with its stock in the branch, or None."""
+    code = code.strip()
+    if not code:
+        return None
+    key = (shop_id, code)
+    now = time.time()
+    version = get_version(version_name(shop_id))
+    with _lock:
+        entry = _local.get(key)
+        row = entry[1] if entry and entry[0] == version and entry[2] > now else _MISSING
+        if row is not _MISSING:
+            _local.move_to_end(key)
+
+    if row is _MISSING:
+        row = find_code(shop_id, code)
+        with _lock:
+            _local[key] = (version, row, now + LOCAL_TTL)
+            _local.move_to_end(key)
+            while len(_local) > LOCAL_SIZE:
+                _local.popitem(last=False)
+    return with_stock([row], branch_id)[0] if row else None
+
+
+def match_expression(shop_id, query):
+    """FTS5 query: the shop's token and every word of the query as a name prefix (None without words)."""
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    return f'shop : s{shop_id} AND ' + ' AND '.join(f'name : "{word}"*' for word in words)
+
+
+def search(shop_id, query, branch_id=None, limit=SEARCH_LIMIT):
+    """Up to `limit` products of the shop whose name matches `query`, with their stock in the branch."""
+    query = query.strip()
+    if not query:
+        return []
+    products = Product.objects.filter(shop_id=shop_id)
+    if connection.vendor == 'sqlite':
+        expression = match_expression(shop_id, query)
+        if expression is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s', [expression, limit]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        rows = {row['id']: row for row in products.filter(pk__in=ids).values(*FIELDS)}
+        rows = [rows[pk] for pk in ids if pk in rows] # Best match first
+    elif connection.vendor == 'postgresql':
+        rows = list(products.filter(name__icontains=query).order_by('name', 'pk').values(*FIELDS)[:limit])
+    else:
+        rows = list(products.filter(name__istartswith=query).order_by('name', 'pk').values(*FIELDS)[:limit])
+    return with_stock(rows, branch_id)
+
+
+def ensure_search_index(using=None, **kwargs):
+    """
+    post_migrate: creates the SQLite FTS table and its triggers when any are
+    missing (new database, or triggers dropped by a table rebuild) and
+    re-indexes every product.
+    """
+    from django.db import connections
+    db = connections[using or 'default']
+    if db.vendor != 'sqlite' or 'inventory_product' not in db.introspection.table_names():
+        return
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'inventory_product' AND name LIKE %s",
+            [FTS_TABLE + '%']
+        )
+        if {row[0] for row in cursor.fetchall()} == set(FTS_TRIGGERS):
+            return
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "name, shop, content='', prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+        )
+        for name, sql in FTS_TRIGGERS.items():
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('delete-all')")
+        cursor.execute(f"INSERT INTO {FTS_TABLE} (rowid, name, shop) SELECT id, name, 's' || shop_id FROM inventory_product")
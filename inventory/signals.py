@@ -1,20 +1,61 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from .models import Product, Stock
 from shops.models import Branch
+from shops import storefront
+from . import catalog, provisioning, search
 
 @receiver(post_save, sender=Product)
 def create_initial_stock(sender, instance, created, **kwargs):
     """
     When a new product is created, automatically create Stock entries
-    with 0 quantity for all branches in the product's shop.
+    with 0 quantity for all branches in the product's shop (one bulk insert,
+    or one for all of a deferred_stock_provisioning() block).
     """
     if created:
-        shop = instance.shop
-        branches = Branch.objects.filter(shop=shop)
-        for branch in branches:
-            Stock.objects.get_or_create(
-                product=instance,
-                branch=branch,
-                defaults={'quantity': 0}
-            )
+        provisioning.products_created(instance.shop_id, [instance.pk])
+
+@receiver(post_save, sender=Branch)
+def backfill_branch_stock(sender, instance, created, **kwargs):
+    """
+    When a new branch is created (dashboard, API or admin), create 0 quantity
+    Stock entries for every product of the shop.
+    """
+    if created:
+        provisioning.branch_created(instance)
+
+@receiver(pre_save, sender=Product)
+def remember_public(sender, instance, **kwargs):
+    # A product taken off the storefront still has to drop its cached pages
+    if instance.pk and not instance.is_public:
+        instance._was_public = sender.objects.filter(pk=instance.pk, is_public=True).exists()
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_storefront(sender, instance, raw=False, **kwargs):
+    """Public product writes (name, price, unit, image) drop the shop's cached storefront pages."""
+    if raw or not (instance.is_public or getattr(instance, '_was_public', False)):
+        return
+    shop_id = instance.shop_id
+    storefront.invalidate_shop(shop_id)
+    transaction.on_commit(lambda: storefront.invalidate_shop(shop_id))
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_code_lookups(sender, instance, raw=False, **kwargs):
+    """Scanned codes resolve through a cache tagged with the shop's product version (inventory.search)."""
+    if raw:
+        return
+    shop_id = instance.shop_id
+    search.invalidate(shop_id)
+    transaction.on_commit(lambda: search.invalidate(shop_id))
+
+@receiver(post_save, sender=Stock)
+def invalidate_pos_catalog(sender, instance, raw=False, **kwargs):
+    """Stock saves change the branch's POS catalog (inventory.catalog); product writes bump the product version above."""
+    if raw:
+        return
+    branch_id = instance.branch_id
+    catalog.invalidate_stock(branch_id)
+    transaction.on_commit(lambda: catalog.invalidate_stock(branch_id))
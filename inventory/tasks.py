@@ -0,0 +1,63 @@
+"""
+Background job handlers for the inventory app (see jobs.queue.HANDLERS).
+"""
+import csv
+import io
+import tempfile
+from django.core.files import File
+from django.core.files.base import ContentFile
+from .models import Product
+from . import importers
+from .exports import STOCK_EXPORT_FORMATS, export_filename, stock_export_queryset
+from .utils import generate_pdf_labels
+
+
+def read_csv_rows(job):
+    with job.input_file.open('rb') as f:
+        decoded_file = f.read().decode('utf-8-sig') # utf-8-sig handles BOM if present (Excel often adds it)
+    return list(csv.DictReader(io.StringIO(decoded_file)))
+
+
+def import_products(job):
+    rows = read_csv_rows(job)
+    job.set_progress(0, len(rows))
+
+    created_count, updated_count, errors = importers.import_products(
+        job.shop, rows, user=job.user, progress=job.set_progress
+    )
+
+    job.progress = len(rows)
+    job.errors = errors
+    if errors:
+        return f"Import completed with warnings. Created: {created_count}, Updated: {updated_count}. Errors: {len(errors)}"
+    return f"Successfully imported {created_count} new products and updated {updated_count} existing products."
+
+
+def print_barcode_labels(job):
+    product_ids = job.payload.get('product_ids', [])
+    # [SECURITY] Only products of the job's shop
+    products = Product.objects.filter(shop=job.shop, id__in=product_ids)
+    total = products.count()
+    if not total:
+        raise ValueError("Products not found")
+    job.set_progress(0, total)
+
+    pdf_buffer = generate_pdf_labels(products, progress=job.set_progress)
+    job.result_file.save('barcodes.pdf', ContentFile(pdf_buffer.getvalue()), save=False)
+    job.payload['filename'] = 'barcodes.pdf'
+    job.progress = total
+    return f"{total} barcode label(s) ready to download."
+
+
+def export_stock(job):
+    writer, extension = STOCK_EXPORT_FORMATS[job.payload.get('format', 'csv')]
+    job.set_progress(0, stock_export_queryset(job.shop).count())
+
+    filename = export_filename(extension)
+    with tempfile.TemporaryFile() as output:
+        writer(job.shop, output, progress=job.set_progress)
+        output.seek(0)
+        job.result_file.save(filename, File(output), save=False)
+    job.payload['filename'] = filename
+    job.progress = job.total
+    return "Stock report ready to download."
@@ -1,3 +1,410 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import time
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models.query import QuerySet
+from django.test import SimpleTestCase
+from django.utils import timezone
+import openpyxl
+from shops.models import Branch, Shop
+from shops.tests import TenantAPITestCase
+from . import exports, provisioning, search
+from .models import Category, Product, Stock, StockMovement
+from .forecasting import SalesForecaster
+from .importers import import_products
+from .views import CategoryViewSet, ProductViewSet, StockViewSet
 
-# Create your tests here.
+
+class InventoryQueryBudgetTests(TenantAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.category = Category.objects.create(shop=cls.shop, name='Drinks')
+        cls.add_products(3)
+
+    @classmethod
+    def add_products(cls, count=12):
+        # Each product gets a Stock row per branch (inventory.signals)
+        start = Product.objects.filter(shop=cls.shop).count()
+        for i in range(start, start + count):
+            Product.objects.create(
+                shop=cls.shop, category=cls.category, name=f'Product {i}', sku=f'SKU-{i}',
+                selling_price=100 + i, cost_price=50
+            )
+
+    def test_categories(self):
+        self.assertWithinBudget(CategoryViewSet, 'list', '/api/inventory/categories/', **self.auth())
+        self.assertWithinBudget(CategoryViewSet, 'retrieve', f'/api/inventory/categories/{self.category.pk}/', **self.auth())
+
+    def test_products(self):
+        product = Product.objects.filter(shop=self.shop).first()
+        self.assertWithinBudget(ProductViewSet, 'list', '/api/inventory/products/', **self.auth())
+        self.assertWithinBudget(ProductViewSet, 'retrieve', f'/api/inventory/products/{product.pk}/', **self.auth())
+        self.assertConstantQueries('/api/inventory/products/', self.add_products, **self.auth())
+
+    def test_stocks(self):
+        stock = Stock.objects.filter(branch__shop=self.shop).first()
+        response = self.assertWithinBudget(StockViewSet, 'list', '/api/inventory/stocks/', **self.auth())
+        self.assertTrue(response.json()['results'][0]['product_name'])
+        self.assertWithinBudget(StockViewSet, 'retrieve', f'/api/inventory/stocks/{stock.pk}/', **self.auth())
+        self.assertConstantQueries('/api/inventory/stocks/', self.add_products, **self.auth())
+
+
+class InventoryConditionalGetTests(TenantAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.category = Category.objects.create(shop=cls.shop, name='Drinks')
+        cls.product = Product.objects.create(
+            shop=cls.shop, category=cls.category, name='Soda', sku='SKU-1', selling_price=100, cost_price=50
+        )
+
+    def revalidate(self, url):
+        first = self.client.get(url, **self.auth())
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('no-cache', first['Cache-Control'])
+        return first['ETag'], self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'], **self.auth())
+
+    def test_not_modified(self):
+        for url in ('/api/inventory/categories/', '/api/inventory/products/', '/api/inventory/stocks/'):
+            etag, response = self.revalidate(url)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response['ETag'], etag)
+            self.assertFalse(response.content)
+
+    def test_writes_change_the_etag(self):
+        etag, _ = self.revalidate('/api/inventory/stocks/')
+        # A rename shows up in the stock rows' product_name
+        Product.objects.filter(pk=self.product.pk).update(name='Cola', updated_at=timezone.now())
+        response = self.client.get('/api/inventory/stocks/', HTTP_IF_NONE_MATCH=etag, **self.auth())
+        self.assertEqual(response.status_code, 200)
+
+        etag, _ = self.revalidate('/api/inventory/products/')
+        Product.objects.create(shop=self.shop, name='Juice', sku='SKU-2', selling_price=100, cost_price=50).delete()
+        self.product.delete()
+        response = self.client.get('/api/inventory/products/', HTTP_IF_NONE_MATCH=etag, **self.auth())
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        url = f'/api/inventory/products/{self.product.pk}/'
+        first = self.client.get(url, **self.auth())
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'], **self.auth())
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('Last-Modified', self.client.get('/api/inventory/products/', **self.auth()))
+
+
+class ProductSearchTests(TenantAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.soda = Product.objects.create(
+            shop=cls.shop, name='Coca-Cola 500ml', sku='CC-500', barcode='5449000000996', selling_price=1500
+        )
+        cls.juice = Product.objects.create(shop=cls.shop, name='Mango Juice', sku='MJ-1', selling_price=2000)
+        Stock.objects.filter(product=cls.soda, branch=cls.branches[1]).update(quantity=7)
+        other = Shop.objects.create(owner=cls.owner, name='Other Shop', slug='other-shop')
+        Product.objects.create(shop=other, name='Coca-Cola 1L', barcode='5449000000996', selling_price=2500)
+
+    def setUp(self):
+        # The lookup LRU outlives a test's transaction, and shop ids are reused
+        cache.clear()
+        search._local.clear()
+
+    def test_lookup(self):
+        url = '/api/inventory/products/lookup/?code=5449000000996'
+        response = self.assertWithinBudget(ProductViewSet, 'lookup', url, **self.auth())
+        self.assertEqual(response.json()['id'], self.soda.pk)
+        self.assertEqual(response.json()['stock'], 0) # Main branch
+
+        # A SKU with a branch, and a miss, both uncached
+        url = f'/api/inventory/products/lookup/?code=MJ-1&branch={self.branches[1].pk}'
+        response = self.assertWithinBudget(ProductViewSet, 'lookup', url, **self.auth())
+        self.assertEqual(response.json()['id'], self.juice.pk)
+        url = f'/api/inventory/products/lookup/?code=5449000000996&branch={self.branches[1].pk}'
+        self.assertEqual(self.client.get(url, **self.auth()).json()['stock'], 7)
+        url = '/api/inventory/products/lookup/?code=nope'
+        self.assertWithinBudget(ProductViewSet, 'lookup', url, status=404, **self.auth())
+
+    def test_barcode_wins_over_sku(self):
+        Product.objects.create(shop=self.shop, name='Odd SKU', sku='5449000000996', selling_price=1)
+        Product.objects.create(shop=self.shop, name='Mango Juice copy', sku='MJ-1', selling_price=1)
+        self.assertEqual(search.lookup(self.shop.pk, '5449000000996')['id'], self.soda.pk)
+        # The oldest product with the SKU, as the importer matches
+        self.assertEqual(search.lookup(self.shop.pk, 'MJ-1')['id'], self.juice.pk)
+
+    def test_lookup_entries_expire(self):
+        # A write in another process, whose version bump a per-process cache never sees
+        self.assertEqual(search.lookup(self.shop.pk, 'MJ-1')['selling_price'], '2000.00')
+        Product.objects.filter(pk=self.juice.pk).update(selling_price=2200)
+        self.assertEqual(search.lookup(self.shop.pk, 'MJ-1')['selling_price'], '2000.00')
+        later = time.time() + search.LOCAL_TTL
+        with mock.patch('inventory.search.time.time', return_value=later):
+            self.assertEqual(search.lookup(self.shop.pk, 'MJ-1')['selling_price'], '2200.00')
+
+    def test_lookup_sees_product_changes(self):
+        url = '/api/inventory/products/lookup/?code=5449000000996'
+        self.client.get(url, **self.auth())
+        self.soda.selling_price = 1800
+        self.soda.save()
+        self.assertEqual(self.client.get(url, **self.auth()).json()['selling_price'], '1800.00')
+
+        self.soda.barcode = '111'
+        self.soda.save()
+        self.assertEqual(self.client.get(url, **self.auth()).status_code, 404)
+
+    def test_barcodes_are_unique_per_shop(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Product.objects.create(shop=self.shop, name='Copy', barcode='5449000000996', selling_price=1)
+        # Blank barcodes are stored as NULL, so any number of products can have none
+        Product.objects.create(shop=self.shop, name='No code', barcode='', selling_price=1)
+
+    def test_search(self):
+        url = f'/api/inventory/products/search/?q=coca%20co&branch={self.branches[1].pk}'
+        response = self.assertWithinBudget(ProductViewSet, 'search', url, **self.auth())
+        results = response.json()['results']
+        self.assertEqual([(row['id'], row['stock']) for row in results], [(self.soda.pk, 7)])
+
+        self.juice.name = 'Mango Nectar'
+        self.juice.save()
+        results = self.client.get('/api/inventory/products/search/?q=nect', **self.auth()).json()['results']
+        self.assertEqual([row['id'] for row in results], [self.juice.pk])
+        self.assertEqual(self.client.get('/api/inventory/products/search/?q=juice', **self.auth()).json()['results'], [])
+
+
+class ProductImportTests(TenantAPITestCase):
+    csv = (
+        "Name (Jina),Category (Kundi),Type (Bidhaa/Huduma - GOODS/SERVICE),SKU,Barcode,Selling Price (Bei Kuuzia),"
+        "Cost Price (Bei Kununua),SI Unit (Kipimo),Opening Stock (Stock),Low Stock Threshold (Kiwango cha chini)\n"
+        "Soda,Drinks,GOODS,SODA-1,111,\"1,200\",800,btl,10,3\n" # Existing, matched by SKU
+        "Bread,Bakery,GOODS,BR-1,333,1500,900,pc,4,2\n"
+        "Cake,Bakery,GOODS,CK-1,222,5000,3000,pc,1,0\n" # Juice's barcode
+        "Milk,Dairy,GOODS,MK-1,,abc,900,l,1,0\n"
+        "Delivery,,SERVICE,DLV,,2000,0,,0,0\n"
+        ",,,,,,,,,\n"
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.soda = Product.objects.create(shop=cls.shop, name='Soda', sku='SODA-1', barcode='111', selling_price=1000)
+        cls.juice = Product.objects.create(shop=cls.shop, name='Juice', sku='JC-1', barcode='222', selling_price=2000)
+        Stock.objects.filter(product=cls.soda, branch=cls.branches[0]).update(quantity=5)
+
+    def stock(self, product, branch):
+        return Stock.objects.get(product=product, branch=branch)
+
+    def test_import(self):
+        rows = list(csv.DictReader(io.StringIO(self.csv)))
+        created, updated, errors = import_products(self.shop, rows, user=self.owner)
+
+        self.assertEqual((created, updated), (2, 1))
+        self.assertCountEqual(errors, ["Row 3 (Cake): Barcode 222 is already used by Juice.", "Row 4: Invalid price format."])
+        self.assertFalse(Product.objects.filter(shop=self.shop, name__in=['Cake', 'Milk']).exists())
+
+        self.soda.refresh_from_db()
+        self.assertEqual((self.soda.selling_price, self.soda.category.name), (Decimal('1200.00'), 'Drinks'))
+        bread = Product.objects.get(shop=self.shop, sku='BR-1')
+        self.assertEqual((bread.barcode, bread.category.name, bread.si_unit), ('333', 'Bakery', 'pc'))
+        self.assertEqual(Product.objects.get(shop=self.shop, name='Delivery').product_type, Product.Type.SERVICE)
+
+        # Opening stock is added to the main branch only; new products get a row in every branch
+        self.assertEqual(self.stock(self.soda, self.branches[0]).quantity, 15)
+        self.assertEqual(self.stock(self.soda, self.branches[0]).low_stock_threshold, 3)
+        self.assertEqual(self.stock(self.soda, self.branches[1]).quantity, 0)
+        self.assertEqual(self.stock(bread, self.branches[0]).quantity, 4)
+        self.assertEqual(Stock.objects.filter(product=bread).count(), 2)
+
+        # One movement per row with opening stock
+        movements = StockMovement.objects.filter(movement_type=StockMovement.Type.ADD)
+        self.assertEqual(
+            sorted(movements.values_list('product__name', 'branch_id', 'quantity_change')),
+            [('Bread', self.branches[0].pk, 4), ('Soda', self.branches[0].pk, 10)]
+        )
+
+    def test_reimport_matches_existing_products(self):
+        rows = list(csv.DictReader(io.StringIO(self.csv)))
+        import_products(self.shop, rows)
+        created, updated, _ = import_products(self.shop, rows)
+        self.assertEqual((created, updated), (0, 3))
+        self.assertEqual(Product.objects.filter(shop=self.shop).count(), 4)
+        self.assertEqual(self.stock(self.soda, self.branches[0]).quantity, 25)
+
+    def test_import_provisions_once(self):
+        rows = list(csv.DictReader(io.StringIO(self.csv)))
+        with mock.patch('inventory.provisioning.provision_products', wraps=provisioning.provision_products) as provision:
+            # Even inside a caller's block, the stock rows exist before the opening stock is added
+            with provisioning.deferred_stock_provisioning():
+                import_products(self.shop, rows)
+        provision.assert_called_once()
+        bread = Product.objects.get(shop=self.shop, sku='BR-1')
+        self.assertEqual(self.stock(bread, self.branches[0]).quantity, 4)
+
+
+class ProvisioningTests(TenantAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.products = [Product.objects.create(shop=cls.shop, name=f'Product {i}', selling_price=100) for i in range(3)]
+
+    def rows(self, **filters):
+        return sorted(Stock.objects.filter(**filters).values_list('product_id', 'branch_id', 'quantity'))
+
+    def test_new_product_in_every_branch(self):
+        self.assertEqual(
+            self.rows(product=self.products[0]), [(self.products[0].pk, branch.pk, 0) for branch in self.branches]
+        )
+
+    def test_provision_products(self):
+        product = self.products[1]
+        Stock.objects.filter(product=product).delete()
+        Stock.objects.filter(product=self.products[2], branch=self.branches[0]).update(quantity=9)
+        provisioning.provision_products(self.shop.pk, [product.pk, self.products[2].pk])
+        self.assertEqual(self.rows(product=product), [(product.pk, branch.pk, 0) for branch in self.branches])
+        # Rerunning adds nothing and leaves existing quantities alone
+        provisioning.provision_products(self.shop.pk, [product.pk, self.products[2].pk])
+        self.assertEqual(Stock.objects.filter(branch__shop=self.shop).count(), 6)
+        self.assertEqual(Stock.objects.get(product=self.products[2], branch=self.branches[0]).quantity, 9)
+
+    def test_provision_branch(self):
+        branch = Branch.objects.create(shop=self.shop, name='Airport')
+        self.assertEqual(self.rows(branch=branch), [(product.pk, branch.pk, 0) for product in self.products])
+        provisioning.provision_branch(branch)
+        self.assertEqual(Stock.objects.filter(branch=branch).count(), 3)
+
+    def test_deferred_provisioning(self):
+        with mock.patch('inventory.provisioning.provision_products', wraps=provisioning.provision_products) as provision:
+            with provisioning.deferred_stock_provisioning():
+                new = [Product.objects.create(shop=self.shop, name=f'New {i}', selling_price=1) for i in range(5)]
+                branch = Branch.objects.create(shop=self.shop, name='Airport')
+                self.assertFalse(Stock.objects.filter(product__in=new).exists())
+                self.assertFalse(Stock.objects.filter(branch=branch).exists())
+        provision.assert_called_once_with(self.shop.pk, [product.pk for product in new])
+        self.assertEqual(Stock.objects.filter(product__in=new).count(), 5 * 3)
+        self.assertEqual(Stock.objects.filter(branch=branch).count(), 8)
+
+    def test_nothing_provisioned_when_the_block_raises(self):
+        with self.assertRaises(ValueError), provisioning.deferred_stock_provisioning():
+            product = Product.objects.create(shop=self.shop, name='New', selling_price=1)
+            raise ValueError
+        self.assertFalse(Stock.objects.filter(product=product).exists())
+
+
+class StockExportTests(TenantAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        drinks = Category.objects.create(shop=cls.shop, name='Drinks')
+        cls.soda = Product.objects.create(shop=cls.shop, category=drinks, name='Soda', selling_price=1500, cost_price=1000)
+        cls.bread = Product.objects.create(shop=cls.shop, name='Bread', selling_price=900, cost_price=600)
+        Stock.objects.filter(product=cls.soda, branch=cls.branches[0]).update(quantity=4)
+        Stock.objects.filter(product=cls.bread, branch=cls.branches[1]).update(quantity=10)
+
+    def export(self, writer):
+        output = io.BytesIO()
+        writer(self.shop, output)
+        return output.getvalue()
+
+    def test_csv(self):
+        rows = list(csv.reader(io.StringIO(self.export(exports.write_stock_csv).decode())))
+        self.assertEqual(rows[0], exports.HEADERS)
+        self.assertCountEqual(rows[1:5], [
+            ['Soda', 'Drinks', 'Main', '4', '1000.00', '1500.00', '4000.00'],
+            ['Soda', 'Drinks', 'Town', '0', '1000.00', '1500.00', '0.00'],
+            ['Bread', '-', 'Main', '0', '600.00', '900.00', '0.00'],
+            ['Bread', '-', 'Town', '10', '600.00', '900.00', '6000.00'],
+        ])
+        self.assertEqual(rows[5:], [[], ['', '', '', '', '', 'Total Inventory Value:', '10000.00']])
+
+    def test_excel(self):
+        wb = openpyxl.load_workbook(io.BytesIO(self.export(exports.write_stock_excel)))
+        ws = wb['Stock List']
+        self.assertEqual(ws['A4'].value, 'Stock Report - Budget Shop')
+        self.assertIn('A4:F4', [str(cells) for cells in ws.merged_cells.ranges])
+        # 'Product Name' is longer than any product name, 'Category' than 'Drinks'
+        self.assertEqual(ws.column_dimensions['A'].width, len('Product Name') + 2)
+        self.assertEqual(ws.column_dimensions['B'].width, len('Category') + 2)
+        rows = [list(row) for row in ws.iter_rows(min_row=6, values_only=True)]
+        self.assertEqual(rows[0], exports.HEADERS)
+        self.assertCountEqual([row[0] for row in rows[1:5]], ['Soda', 'Soda', 'Bread', 'Bread'])
+        self.assertEqual(rows[-1][5:], ['Total Inventory Value:', 10000])
+
+    def test_pdf(self):
+        self.assertTrue(self.export(exports.write_stock_pdf).startswith(b'%PDF'))
+
+    def test_rows_are_streamed(self):
+        # Every writer reads the rows through .iterator(), never as a cached list
+        querysets = []
+        iterator = QuerySet.iterator
+
+        def spy(queryset, *args, **kwargs):
+            querysets.append(queryset)
+            return iterator(queryset, *args, **kwargs)
+
+        for writer, _ in exports.STOCK_EXPORT_FORMATS.values():
+            with mock.patch.object(QuerySet, 'iterator', autospec=True, side_effect=spy):
+                self.export(writer)
+        self.assertEqual(len(querysets), 3)
+        self.assertTrue(all(queryset._result_cache is None for queryset in querysets))
+
+        progress = mock.Mock()
+        rows = list(exports.iter_stock_rows(self.shop, progress, chunk_size=2))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(progress.call_args_list, [mock.call(2), mock.call(4)])
+
+
+class ForecastEstimateTests(SimpleTestCase):
+    # Monday 5 January 2026: eight full weeks of weekdays selling 2, Saturdays 9 and Sundays 0
+    start = datetime.date(2026, 1, 5)
+    week = [2, 2, 2, 2, 2, 9, 0]
+    # Friday noon
+    now = timezone.make_aware(datetime.datetime(2026, 1, 9, 12))
+
+    def setUp(self):
+        self.forecaster = SalesForecaster()
+
+    def series(self, start, days=56):
+        return [self.week[(start + datetime.timedelta(days=i)).weekday()] for i in range(days)]
+
+    def test_weekday_factors(self):
+        level, factors = self.forecaster.estimate(self.series(self.start), self.start)
+        mean = sum(self.week) / 7
+        self.assertAlmostEqual(level, mean)
+        self.assertEqual(factors, [round(units / mean, 3) for units in self.week])
+        self.assertEqual(factors[6], 0)
+
+        # Factors stay Monday..Sunday whatever weekday the series starts on
+        wednesday = self.start + datetime.timedelta(days=2)
+        self.assertEqual(self.forecaster.estimate(self.series(wednesday), wednesday)[1], factors)
+
+    def test_recent_days_weigh_more(self):
+        series = self.series(self.start)
+        series[-7:] = [units * 2 for units in series[-7:]] # Demand doubled last week
+        level, _ = self.forecaster.estimate(series, self.start)
+        mean = sum(self.week) / 7
+        self.assertGreater(level, mean * 1.5)
+
+    def test_no_sales(self):
+        self.assertEqual(self.forecaster.estimate([0] * 56, self.start), (0.0, [1.0] * 7))
+        self.assertEqual(self.forecaster.runout(10, 0.0, self.now, [1.0] * 7), (None, None, 'Stagnant'))
+        self.assertEqual(self.forecaster.runout(10, 2, self.now, [0] * 7)[1:], (5, 'Low')) # Flat rate
+
+    def test_status_thresholds(self):
+        for quantity, days_left, status in [(6, 3, 'Critical'), (14, 7, 'Low'), (16, 8, 'Safe')]:
+            runout_date, days, label = self.forecaster.runout(quantity, 2, self.now)
+            self.assertEqual((days, label), (days_left, status), quantity)
+            self.assertEqual(runout_date, self.now + datetime.timedelta(days=days_left))
+
+    def test_runout_follows_the_weekdays(self):
+        factors = [1, 1, 1, 1, 1, 2, 0] # Saturdays sell double, Sundays nothing
+        # From Friday: 2 on Friday, 4 on Saturday
+        self.assertEqual(self.forecaster.runout(6, 2, self.now, factors)[1:], (2, 'Critical'))
+        # A full week (14), then Friday and Saturday
+        runout_date, days_left, status = self.forecaster.runout(20, 2, self.now, factors)
+        self.assertEqual((days_left, status), (9, 'Safe'))
+        self.assertEqual(runout_date, self.now + datetime.timedelta(days=9))
+        # Sunday sells nothing, so the last unit lasts until Monday noon
+        self.assertEqual(self.forecaster.runout(7, 2, self.now, factors)[1], 3)
@@ -24,11 +24,12 @@ def generate_barcode(product_sku):
     
     return buffer
 
-def generate_pdf_labels(products):
+def generate_pdf_labels(products, progress=None):
     """
     Generates a PDF with barcode labels for a list of products.
     Each label contains: Product Name, Price, and Barcode.
     Layout: 3x7 grid on A4.
+    `progress(labels_done)` is called after each full page.
     """
     buffer = BytesIO()
     p = canvas.Canvas(buffer, pagesize=A4)
@@ -49,7 +50,7 @@ def generate_pdf_labels(products):
     col = 0
     row = 0
     
-    for product in products:
+    for index, product in enumerate(products, 1):
         # Draw Label Border (Optional, helpful for cutting)
         p.setStrokeColorRGB(0.8, 0.8, 0.8)
         p.rect(x, y, label_width, label_height)
@@ -95,6 +96,8 @@ def generate_pdf_labels(products):
             
         # New Page if full
         if row >= 7:
+            if progress:
+                progress(index)
             p.showPage()
             x = x_start
             y = y_start
@@ -1,77 +1,137 @@
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from django.db.models import Count, Max
 from .models import Category, Product, Stock
 from .serializers import CategorySerializer, ProductSerializer, StockSerializer
+from . import search as product_search
+from users.role_permissions import HasModulePermission
+from shops.conditional import ConditionalGetMixin
+from shops.models import Branch
+from shops.query_budget import QueryBudgetMixin
 
-class CategoryViewSet(viewsets.ModelViewSet):
-    permission_classes = [permissions.IsAuthenticated]
+class CategoryViewSet(QueryBudgetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    permission_module = 'products'
+    query_budget = {'list': 5, 'retrieve': 4}
     serializer_class = CategorySerializer
 
     def get_queryset(self):
         user = self.request.user
         if getattr(user, 'role', None) == 'SUPER_ADMIN' or user.is_superuser:
             return Category.objects.all()
-        # Fix for Employees
-        if hasattr(user, 'shops') and user.shops.exists():
-            return Category.objects.filter(shop=user.shops.first())
-        elif hasattr(user, 'shop') and user.shop:
-            return Category.objects.filter(shop=user.shop)
+        # Owner's or Employee's shop
+        shop = self.request.tenant.shop
+        if shop:
+            return Category.objects.filter(shop=shop)
         return Category.objects.none()
 
     def perform_create(self, serializer):
-        user = self.request.user
-        shop = None
-        if hasattr(user, 'shops') and user.shops.exists():
-            shop = user.shops.first()
-        elif hasattr(user, 'shop') and user.shop:
-            shop = user.shop
-        
+        shop = self.request.tenant.shop
         if shop:
             serializer.save(shop=shop)
         else:
             raise ValidationError({"shop": "No shop found for user."})
 
-class ProductViewSet(viewsets.ModelViewSet):
-    permission_classes = [permissions.IsAuthenticated]
+class ProductViewSet(QueryBudgetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    """
+    Products of the shop, plus the POS endpoints (inventory.search), each with the
+    stock of one branch (the employee's own, else ?branch= or the main branch):
+    lookup/?code= (barcode or SKU) and search/?q= (name prefixes, ?limit=).
+    """
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    permission_module = 'products'
+    query_budget = {'list': 5, 'retrieve': 4, 'lookup': 5, 'search': 6}
     serializer_class = ProductSerializer
 
     def get_queryset(self):
         user = self.request.user
         if getattr(user, 'role', None) == 'SUPER_ADMIN' or user.is_superuser:
             return Product.objects.all()
-        # Fix for Employees
-        if hasattr(user, 'shops') and user.shops.exists():
-            return Product.objects.filter(shop=user.shops.first())
-        elif hasattr(user, 'shop') and user.shop:
-            return Product.objects.filter(shop=user.shop)
+        # Owner's or Employee's shop
+        shop = self.request.tenant.shop
+        if shop:
+            return Product.objects.filter(shop=shop)
         return Product.objects.none()
         
     def perform_create(self, serializer):
         # Auto-assign shop for Products too
-        user = self.request.user
-        shop = None
-        if hasattr(user, 'shops') and user.shops.exists():
-            shop = user.shops.first()
-        elif hasattr(user, 'shop') and user.shop:
-            shop = user.shop
-            
+        shop = self.request.tenant.shop
         if shop:
             serializer.save(shop=shop)
         else:
-            from rest_framework.exceptions import ValidationError
             raise ValidationError({"shop": "No shop found."})
 
-class StockViewSet(viewsets.ModelViewSet):
-    permission_classes = [permissions.IsAuthenticated]
+    def get_branch_id(self):
+        user = self.request.user
+        if getattr(user, 'role', None) == 'EMPLOYEE' and user.branch_id:
+            return user.branch_id
+        branch_id = self.request.query_params.get('branch')
+        if not branch_id:
+            branch = self.request.tenant.branch
+            return branch.pk if branch else None
+        try:
+            branch_id = int(branch_id)
+        except ValueError:
+            raise ValidationError({'branch': "Must be an id."})
+        if not Branch.objects.filter(pk=branch_id, shop_id=self.request.tenant.shop_id).exists():
+            raise ValidationError({'branch': "Not a branch of this shop."})
+        return branch_id
+
+    def get_shop_id(self):
+        shop_id = self.request.tenant.shop_id
+        if not shop_id:
+            raise ValidationError({"shop": "No shop found."})
+        return shop_id
+
+    @action(detail=False)
+    def lookup(self, request):
+        code = request.query_params.get('code', '')
+        if not code.strip():
+            raise ValidationError({'code': "A barcode or SKU is required."})
+        product = product_search.lookup(self.get_shop_id(), code, self.get_branch_id())
+        if product is None:
+            raise NotFound(f"No product with code {code.strip()}.")
+        return Response(product)
+
+    @action(detail=False)
+    def search(self, request):
+        try:
+            limit = int(request.query_params.get('limit', product_search.SEARCH_LIMIT))
+        except ValueError:
+            raise ValidationError({'limit': "Must be a number."})
+        limit = min(max(limit, 1), product_search.MAX_SEARCH_LIMIT)
+        results = product_search.search(self.get_shop_id(), request.query_params.get('q', ''), self.get_branch_id(), limit)
+        return Response({'results': results})
+
+class StockViewSet(QueryBudgetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    permission_module = 'inventory'
+    query_budget = {'list': 6, 'retrieve': 5}
     serializer_class = StockSerializer
 
-    def get_queryset(self):
+    def is_super_admin(self):
         user = self.request.user
-        if getattr(user, 'role', None) == 'SUPER_ADMIN' or user.is_superuser:
-            return Stock.objects.all()
+        return getattr(user, 'role', None) == 'SUPER_ADMIN' or user.is_superuser
+
+    def get_queryset(self):
+        # product_name and branch_name come from the same query
+        stocks = Stock.objects.select_related('product', 'branch')
+        if self.is_super_admin():
+            return stocks.all()
         
-        # Fix for Employees
-        if hasattr(user, 'shops') and user.shops.exists():
-            return Stock.objects.filter(branch__shop=user.shops.first())
-        elif hasattr(user, 'shop') and user.shop:
-            return Stock.objects.filter(branch__shop=user.shop)
+        # Owner's or Employee's shop
+        shop = self.request.tenant.shop
+        if shop:
+            return stocks.filter(branch__shop=shop)
         return Stock.objects.none()
+
+    def get_validators(self):
+        # product_name and branch_name change with the product and branch rows, not the stock row
+        stocks = self.get_queryset().order_by()
+        if 'pk' in self.kwargs:
+            stocks = stocks.filter(pk=self.kwargs['pk'])
+        state = stocks.aggregate(latest=Max('updated_at'), count=Count('pk'), products=Max('product__updated_at'))
+        branches = Branch.objects.all() if self.is_super_admin() else Branch.objects.filter(shop=self.request.tenant.shop)
+        return (state['latest'], state['count'], state['products'], list(branches.values_list('pk', 'name'))), None
@@ -12,6 +12,7 @@ from reportlab.lib.enums import TA_RIGHT, TA_CENTER, TA_LEFT
 from reportlab.lib.units import inch, cm
 from datetime import datetime
 from django.conf import settings
+from django.utils import timezone
 import os
 from django.shortcuts import redirect, render
 from django.http import HttpResponse
@@ -20,7 +21,9 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.contrib import messages
 from .models import Product, Category, Stock, StockMovement
-from .utils import generate_pdf_labels
+from . import search
+from jobs.models import Job
+from jobs.queue import enqueue
 from .forms import ProductForm, CategoryForm, StockAdjustmentForm, StockTransferForm, PurchaseForm
 from shops.models import Shop, Branch
 import io
@@ -28,24 +31,8 @@ from django.db import transaction
 from django.db.models import F, Sum, Count, Case, When, Value, DecimalField
 from django.core.exceptions import ValidationError
 from decimal import Decimal
-
-class BaseShopView(LoginRequiredMixin):
-    """Base view to handle shop context and security"""
-    
-    def get_shop(self):
-        # 1. Direct check for Employee's assigned shop
-        if getattr(self.request.user, 'shop', None):
-            return self.request.user.shop
-            
-        # 2. Check for Owner's shops
-        if hasattr(self.request.user, 'shops') and self.request.user.shops.exists():
-            return self.request.user.shops.first()
-            
-        # 3. Legacy fallback
-        if hasattr(self.request.user, 'employee_profile'):
-             return self.request.user.employee_profile.shop
-             
-        return None
+from shops.mixins import BaseShopView
+from dashboard import stats as dashboard_stats
 
 class ProductListView(BaseShopView, ListView):
     model = Product
@@ -88,7 +75,9 @@ class ProductListView(BaseShopView, ListView):
             # Update stocks for this product
             stocks = Stock.objects.filter(product=product)
             if stocks.exists():
-                stocks.update(quantity=opening_stock, low_stock_threshold=threshold)
+                stocks.update(quantity=opening_stock, low_stock_threshold=threshold, updated_at=timezone.now())
+                dashboard_stats.bump_version(shop.pk)
+                search.invalidate(shop.pk) # The update skips the signals; refreshes the POS catalogs too
             
             messages.success(request, "Product created successfully!")
             return redirect('product_list')
@@ -331,146 +320,22 @@ class StockManagementView(BaseShopView, ListView):
         shop = self.get_shop()
         if shop:
             return StockMovement.objects.filter(branch__shop=shop).select_related('product', 'branch', 'user').order_by('-created_at')
+def enqueue_stock_export(request, shop, export_format):
+    # Large catalogs take a while, so the file is built by a background job
+    job = enqueue(Job.Kind.STOCK_EXPORT, shop, user=request.user, payload={'format': export_format})
+    messages.info(request, "Preparing your stock report. It will be ready to download shortly.")
+    return redirect('job_detail', pk=job.pk)
+
 def export_stock_pdf(request):
     if not request.user.is_authenticated:
         return redirect('login')
     
-    shop = None
-    if getattr(request.user, 'shop', None):
-        shop = request.user.shop
-    elif hasattr(request.user, 'shops') and request.user.shops.exists():
-        shop = request.user.shops.first()
-    elif hasattr(request.user, 'employee_profile'):
-        shop = request.user.employee_profile.shop
+    shop = request.tenant.shop
     
     if not shop:
         return redirect('stock_list')
 
-    stocks = Stock.objects.filter(branch__shop=shop).select_related('product', 'branch')
-
-    response = HttpResponse(content_type='application/pdf')
-    filename = f"Stock_Report_{datetime.now().strftime('%Y%m%d')}.pdf"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-    # Document Setup
-    doc = SimpleDocTemplate(
-        response, 
-        pagesize=A4,
-        rightMargin=0.5*inch,
-        leftMargin=0.5*inch,
-        topMargin=0.5*inch,
-        bottomMargin=0.5*inch
-    )
-    elements = []
-    styles = getSampleStyleSheet()
-
-    # Custom Styles
-    styles.add(ParagraphStyle(name='TitleStyle', parent=styles['Heading1'], alignment=TA_CENTER, fontSize=18, textColor=colors.HexColor('#4e73df'), spaceAfter=12))
-    styles.add(ParagraphStyle(name='SubtitleStyle', parent=styles['Normal'], alignment=TA_CENTER, fontSize=12, textColor=colors.grey, spaceAfter=24))
-    styles.add(ParagraphStyle(name='TableHeader', parent=styles['Normal'], fontSize=10, textColor=colors.white, alignment=TA_CENTER))
-    styles.add(ParagraphStyle(name='TableData', parent=styles['Normal'], fontSize=9, textColor=colors.black))
-    styles.add(ParagraphStyle(name='TableNumber', parent=styles['Normal'], fontSize=9, textColor=colors.black, alignment=TA_RIGHT))
-    styles.add(ParagraphStyle(name='Footer', parent=styles['Normal'], fontSize=8, textColor=colors.grey, alignment=TA_CENTER))
-
-    # --- Header Section ---
-    # Logo
-    logo_path = os.path.join(settings.BASE_DIR, 'eduka_backend', 'static', 'img', 'logoeduka.png')
-    if os.path.exists(logo_path):
-        try:
-            # Create a table for the header: Logo Left, Text Right (or Center)
-            # Actually, a centered layout often looks cleaner for reports
-            im = PDFImage(logo_path, width=2.0*inch, height=0.8*inch)
-            im.hAlign = 'CENTER'
-            elements.append(im)
-            elements.append(Spacer(1, 12))
-        except Exception as e:
-            print(f"PDF Logo Error: {e}")
-
-    # Title & Info
-    elements.append(Paragraph(f"Stock Inventory Report", styles['TitleStyle']))
-    elements.append(Paragraph(f"<b>Shop:</b> {shop.name} | <b>Date:</b> {datetime.now().strftime('%B %d, %Y')}", styles['SubtitleStyle']))
-
-    # --- Table Section ---
-    # Headers
-    headers = [
-        Paragraph('Product Name', styles['TableHeader']),
-        Paragraph('Branch', styles['TableHeader']),
-        Paragraph('Qty', styles['TableHeader']),
-        Paragraph('Cost Price', styles['TableHeader']),
-        Paragraph('Total Value', styles['TableHeader']),
-    ]
-    
-    data = [headers]
-    total_val = 0
-    total_items = 0
-
-    # Data Rows
-    for stock in stocks:
-        val = stock.quantity * (stock.product.cost_price or 0)
-        total_val += val
-        total_items += stock.quantity
-        
-        row = [
-            Paragraph(stock.product.name[:35], styles['TableData']), # Truncate check
-            Paragraph(stock.branch.name[:20], styles['TableData']),
-            Paragraph(str(stock.quantity), styles['TableNumber']),
-            Paragraph(f"{stock.product.cost_price:,.2f}", styles['TableNumber']),
-            Paragraph(f"{val:,.2f}", styles['TableNumber']),
-        ]
-        data.append(row)
-
-    # Footer Row (Totals)
-    footer_row = [
-        Paragraph("<b>Total</b>", styles['TableData']),
-        '',
-        Paragraph(f"<b>{total_items}</b>", styles['TableNumber']),
-        '',
-        Paragraph(f"<b>{total_val:,.2f}</b>", styles['TableNumber']),
-    ]
-    data.append(footer_row)
-
-    # Table Styling
-    col_widths = [3.0*inch, 1.5*inch, 0.8*inch, 1.0*inch, 1.2*inch]
-    table = Table(data, colWidths=col_widths, repeatRows=1)
-    
-    # Premium Table Style
-    t_style = TableStyle([
-        # Header
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4e73df')), # eDuka Blue
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
-        ('TOPPADDING', (0, 0), (-1, 0), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        
-        # Grid
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e3e6f0')),
-        
-        # Alignment for numbers (columns 2,3,4) - Indices 2, 3, 4
-        ('ALIGN', (2, 1), (-1, -1), 'RIGHT'), 
-        
-        # Footer
-        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#eaecf4')),
-        ('TopPadding', (0, -1), (-1, -1), 10),
-        ('BottomPadding', (0, -1), (-1, -1), 10),
-        ('LINEABOVE', (0, -1), (-1, -1), 1, colors.HexColor('#4e73df')),
-    ])
-    
-    # Zebra Stripping
-    for i, row in enumerate(data[1:-1], start=1):
-        if i % 2 == 0:
-            t_style.add('BACKGROUND', (0, i), (-1, i), colors.HexColor('#f8f9fc'))
-
-    table.setStyle(t_style)
-    elements.append(table)
-
-    # --- Footer Note ---
-    elements.append(Spacer(1, 30))
-    elements.append(Paragraph(f"Generated by eDuka System on {datetime.now().strftime('%Y-%m-%d %H:%M')}", styles['Footer']))
-
-    doc.build(elements)
-    
-    return response
+    return enqueue_stock_export(request, shop, 'pdf')
 
 def export_stock_csv(request):
     """
@@ -479,44 +344,12 @@ def export_stock_csv(request):
     if not request.user.is_authenticated:
         return redirect('login')
     
-    shop = None
-    if getattr(request.user, 'shop', None):
-        shop = request.user.shop
-    elif hasattr(request.user, 'shops') and request.user.shops.exists():
-        shop = request.user.shops.first()
-    elif hasattr(request.user, 'employee_profile'):
-        shop = request.user.employee_profile.shop
+    shop = request.tenant.shop
     
     if not shop:
         return redirect('stock_list')
 
-    stocks = Stock.objects.filter(branch__shop=shop).select_related('product', 'branch')
-
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="Stock_Report_{datetime.now().strftime("%Y%m%d")}.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(['Product Name', 'Category', 'Branch', 'Quantity', 'Cost Price', 'Selling Price', 'Total Value'])
-
-    total_value_sum = 0
-    for stock in stocks:
-        total_val = stock.quantity * (stock.product.cost_price or 0)
-        total_value_sum += total_val
-        
-        writer.writerow([
-            stock.product.name,
-            stock.product.category.name if stock.product.category else "-",
-            stock.branch.name,
-            stock.quantity,
-            stock.product.cost_price or 0,
-            stock.product.selling_price or 0,
-            total_val
-        ])
-    
-    writer.writerow([])
-    writer.writerow(['', '', '', '', '', 'Total Inventory Value:', total_value_sum])
-
-    return response
+    return enqueue_stock_export(request, shop, 'csv')
 
 
 def export_stock_excel(request):
@@ -524,89 +357,13 @@ def export_stock_excel(request):
     if not request.user.is_authenticated:
         return redirect('login')
     
-    # Logic to get shop (duplicated from BaseShopView for function view)
-    shop = None
-    if getattr(request.user, 'shop', None):
-        shop = request.user.shop
-    elif hasattr(request.user, 'shops') and request.user.shops.exists():
-        shop = request.user.shops.first()
-    elif hasattr(request.user, 'employee_profile'):
-        shop = request.user.employee_profile.shop
+    shop = request.tenant.shop
     
     if not shop:
         messages.error(request, "No shop associated.")
         return redirect('stock_list')
 
-    stocks = Stock.objects.filter(branch__shop=shop).select_related('product', 'branch')
-
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="Stock_Report.xlsx"'
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Stock List"
-
-    # Logo
-    logo_path = os.path.join(settings.BASE_DIR, 'eduka_backend', 'static', 'img', 'logoeduka.png')
-    if os.path.exists(logo_path):
-        try:
-            img = ExcelImage(logo_path)
-            img.height = 60
-            img.width = 150 # Aspect ratio?
-            ws.add_image(img, 'A1')
-            ws.row_dimensions[1].height = 50
-        except Exception as e:
-            print(f"Error adding logo to Excel: {e}")
-
-    # Headers (Start at row 5 usually to leave space for logo/title)
-    ws['A4'] = f"Stock Report - {shop.name}"
-    ws['A4'].font = Font(bold=True, size=14)
-    ws.merge_cells('A4:F4')
-
-    headers = ['Product Name', 'Category', 'Branch', 'Quantity', 'Cost Price', 'Selling Price', 'Total Value']
-    header_row = 6
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=header_row, column=col_num, value=header)
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.fill = PatternFill(start_color="4e73df", end_color="4e73df", fill_type="solid")
-        cell.alignment = Alignment(horizontal='center')
-
-    # Data
-    row_num = 7
-    total_value_sum = 0
-    for stock in stocks:
-        ws.cell(row=row_num, column=1, value=stock.product.name)
-        ws.cell(row=row_num, column=2, value=stock.product.category.name if stock.product.category else "-")
-        ws.cell(row=row_num, column=3, value=stock.branch.name)
-        ws.cell(row=row_num, column=4, value=stock.quantity)
-        ws.cell(row=row_num, column=5, value=stock.product.cost_price)
-        ws.cell(row=row_num, column=6, value=stock.product.selling_price)
-        
-        total_val = stock.quantity * (stock.product.cost_price or 0)
-        ws.cell(row=row_num, column=7, value=total_val)
-        total_value_sum += total_val
-        
-        row_num += 1
-
-    # Footer
-    ws.cell(row=row_num+1, column=6, value="Total Inventory Value:").font = Font(bold=True)
-    ws.cell(row=row_num+1, column=7, value=total_value_sum).font = Font(bold=True)
-
-    # Column/Row Resizing
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter # Get the column name
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
-
-    wb.save(response)
-    return response
+    return enqueue_stock_export(request, shop, 'excel')
 
 class StockTransferView(BaseShopView, View):
     template_name = 'inventory/stock_transfer.html'
@@ -817,131 +574,21 @@ class ProductImportView(BaseShopView, TemplateView):
              messages.error(request, "No shop found. Please create a shop first.")
              return redirect('dashboard')
 
+        # Basic validation of headers (checking only a key one to ensure compatibility)
+        # Headers from template: 'Name (Jina)', 'Category (Kundi)', etc.
         try:
-            # Read and decode the file
-            decoded_file = file.read().decode('utf-8-sig') # utf-8-sig handles BOM if present (Excel often adds it)
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string)
-            
-            # Basic validation of headers (checking only a key one to ensure compatibility)
-            # Headers from template: 'Name (Jina)', 'Category (Kundi)', etc.
-            field_names = reader.fieldnames
-            if not field_names or 'Name (Jina)' not in field_names:
-                 messages.error(request, "Invalid CSV format. Please use the provided template.")
-                 return redirect('product_import')
-
-            created_count = 0
-            updated_count = 0
-            errors = []
-
-            with transaction.atomic():
-                for index, row in enumerate(reader, start=1):
-                    try:
-                        name = row.get('Name (Jina)', '').strip()
-                        if not name: continue # Skip empty rows
-                        
-                        category_name = row.get('Category (Kundi)', '').strip()
-                        product_type_str = row.get('Type (Bidhaa/Huduma - GOODS/SERVICE)', 'GOODS').upper()
-                        sku = row.get('SKU', '').strip()
-                        barcode = row.get('Barcode', '').strip()
-                        
-                        # Price parsing
-                        try:
-                            selling_price = Decimal(row.get('Selling Price (Bei Kuuzia)', '0').replace(',', '') or 0)
-                            cost_price = Decimal(row.get('Cost Price (Bei Kununua)', '0').replace(',', '') or 0)
-                        except:
-                            errors.append(f"Row {index}: Invalid price format.")
-                            continue
-
-                        si_unit = row.get('SI Unit (Kipimo)', '').strip()
-                        opening_stock = int(row.get('Opening Stock (Stock)', '0') or 0)
-                        threshold = int(row.get('Low Stock Threshold (Kiwango cha chini)', '0') or 0)
-
-                        # Logic:
-                        # 1. Get/Create Category
-                        category = None
-                        if category_name:
-                            category, _ = Category.objects.get_or_create(shop=shop, name=category_name)
-                        
-                        # 2. Update or Create Product (Match by SKU first, then Name if SKU empty)
-                        product = None
-                        if sku:
-                            product = Product.objects.filter(shop=shop, sku=sku).first()
-                        
-                        if not product:
-                            product = Product.objects.filter(shop=shop, name=name).first()
-
-                        product_type = Product.Type.SERVICE if 'SERVICE' in product_type_str else Product.Type.GOODS
-
-                        if product:
-                            # Update existing
-                            product.category = category
-                            product.selling_price = selling_price
-                            product.cost_price = cost_price
-                            product.si_unit = si_unit
-                            product.product_type = product_type
-                            if barcode: product.barcode = barcode
-                            product.save()
-                            updated_count += 1
-                        else:
-                            # Create new
-                            product = Product.objects.create(
-                                shop=shop,
-                                name=name,
-                                category=category,
-                                product_type=product_type,
-                                sku=sku,
-                                barcode=barcode,
-                                selling_price=selling_price,
-                                cost_price=cost_price,
-                                si_unit=si_unit
-                            )
-                            created_count += 1
-
-                        # 3. Handle Stock (Only for Goods)
-                        if product.product_type == Product.Type.GOODS:
-                            # Update stock for the main branch (or all branches?)
-                            # For simplicity in import, apply to the first found branch or all.
-                            # Usually imports are for "Opening Stock" which implies setting the base level.
-                            branches = Branch.objects.filter(shop=shop)
-                            for branch in branches:
-                                stock, created = Stock.objects.get_or_create(product=product, branch=branch)
-                                # If import specifies stock, do we ADD or SET?
-                                # Usually import = SET current state.
-                                # But if multiple branches exist, this is ambiguous.
-                                # Let's assume this import sets the quantity for the MAIN branch if it exists, or random one.
-                                if branch.is_main or branches.count() == 1:
-                                    stock.quantity += opening_stock
-                                    stock.low_stock_threshold = threshold
-                                    stock.save()
-                                    
-                                    # Log Movement for Import
-                                    if opening_stock > 0:
-                                        StockMovement.objects.create(
-                                            stock=stock,
-                                            product=product,
-                                            branch=branch,
-                                            quantity_change=opening_stock,
-                                            movement_type=StockMovement.Type.ADD,
-                                            reason="Bulk Import: Added via CSV",
-                                            user=request.user
-                                        )
-
-                    except Exception as e:
-                        errors.append(f"Row {index} ({name}): {str(e)}")
-
-            if errors:
-                messages.warning(request, f"Import completed with warnings. Created: {created_count}, Updated: {updated_count}. Errors: {len(errors)}")
-                # Optionally show first few errors
-                for err in errors[:5]:
-                    messages.error(request, err)
-            else:
-                messages.success(request, f"Successfully imported {created_count} new products and updated {updated_count} existing products.")
-
-        except Exception as e:
-            messages.error(request, f"Critical error during import: {str(e)}")
-        
-        return redirect('product_list')
+            header = next(csv.reader([file.readline().decode('utf-8-sig')]), [])
+        except UnicodeDecodeError:
+            header = []
+        file.seek(0)
+        if 'Name (Jina)' not in header:
+             messages.error(request, "Invalid CSV format. Please use the provided template.")
+             return redirect('product_import')
+
+        # The import itself runs in the background (inventory.tasks.import_products)
+        job = enqueue(Job.Kind.PRODUCT_IMPORT, shop, user=request.user, input_file=file)
+        messages.info(request, "Import started. You will be notified when it is done.")
+        return redirect('job_detail', pk=job.pk)
 
 class PurchaseCreateView(BaseShopView, View):
     template_name = 'inventory/purchase_form.html'
@@ -1072,7 +719,7 @@ class ProductTemplateDownloadView(LoginRequiredMixin, View):
         
         return response
 
-class BarcodePrintView(LoginRequiredMixin, View):
+class BarcodePrintView(BaseShopView, View):
     def get(self, request, *args, **kwargs):
         # Get product IDs from query param `ids` (comma separated)
         product_ids_str = request.GET.get('ids', '')
@@ -1086,12 +733,10 @@ class BarcodePrintView(LoginRequiredMixin, View):
         else:
             product_ids = [int(id) for id in product_ids_str.split(',') if id.isdigit()]
             
-        products = Product.objects.filter(id__in=product_ids)
-        if not products.exists():
+        shop = self.get_shop()
+        if not shop or not Product.objects.filter(shop=shop, id__in=product_ids).exists():
             return HttpResponse("Products not found", status=404)
             
-        pdf_buffer = generate_pdf_labels(products)
-        
-        response = HttpResponse(pdf_buffer, content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="barcodes.pdf"'
-        return response
+        # Barcode images are slow to render, so the PDF is built by a background job
+        job = enqueue(Job.Kind.BARCODE_LABELS, shop, user=request.user, payload={'product_ids': product_ids})
+        return redirect('job_detail', pk=job.pk)
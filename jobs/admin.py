@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import Job
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'shop', 'user', 'status', 'progress', 'total', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('shop__name', 'user__username')
@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from jobs.queue import run_pending, requeue_stale
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (imports, exports, barcode labels)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run every pending job, then exit')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=3600, help='Requeue RUNNING jobs older than this many seconds')
+
+    def handle(self, *args, **options):
+        requeued, failed = requeue_stale(options['stale_after'])
+        if requeued or failed:
+            self.stdout.write(f"Requeued {requeued} stale job(s), failed {failed}.")
+
+        if options['once']:
+            count = run_pending()
+            self.stdout.write(self.style.SUCCESS(f"Ran {count} job(s)."))
+            return
+
+        self.stdout.write("Waiting for jobs...")
+        try:
+            while True:
+                if not run_pending(limit=1):
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write("Worker stopped.")
@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-17 23:30
+
+import jobs.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    # The storage isn't in the schema: state only, so SQLite doesn't rebuild the table
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='job',
+                    name='input_file',
+                    field=models.FileField(blank=True, null=True, storage=jobs.models.get_job_storage, upload_to='input/%Y/%m/'),
+                ),
+                migrations.AlterField(
+                    model_name='job',
+                    name='result_file',
+                    field=models.FileField(blank=True, null=True, storage=jobs.models.get_job_storage, upload_to='results/%Y/%m/'),
+                ),
+            ],
+        ),
+    ]
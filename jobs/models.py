@@ -0,0 +1,93 @@
+from django.db import models
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from shops.models import Shop
+
+# Uploaded inputs and generated results are private to the shop, so they live
+# outside MEDIA and are only served through the authenticated download view.
+job_storage = FileSystemStorage(location=settings.JOB_FILES_ROOT)
+
+def get_job_storage():
+    # Callable, so migrations don't record the deployment's JOB_FILES_ROOT
+    return job_storage
+
+class Job(models.Model):
+    class Kind(models.TextChoices):
+        PRODUCT_IMPORT = 'PRODUCT_IMPORT', 'Product Import'
+        CLIENT_IMPORT = 'CLIENT_IMPORT', 'Client Import'
+        BARCODE_LABELS = 'BARCODE_LABELS', 'Barcode Labels'
+        STOCK_EXPORT = 'STOCK_EXPORT', 'Stock Export'
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        DONE = 'DONE', 'Done'
+        FAILED = 'FAILED', 'Failed'
+
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='jobs')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='jobs')
+    kind = models.CharField(max_length=30, choices=Kind.choices)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    payload = models.JSONField(default=dict, blank=True)
+    input_file = models.FileField(upload_to='input/%Y/%m/', storage=get_job_storage, blank=True, null=True)
+    result_file = models.FileField(upload_to='results/%Y/%m/', storage=get_job_storage, blank=True, null=True)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    message = models.TextField(blank=True)
+    errors = models.JSONField(default=list, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Worker polling: oldest pending job first
+            models.Index(fields=['status', 'created_at'], name='jobs_job_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.id} ({self.status})"
+
+    @property
+    def percent(self):
+        if self.status == self.Status.DONE:
+            return 100
+        if not self.total:
+            return 0
+        return min(100, int(self.progress * 100 / self.total))
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.DONE, self.Status.FAILED)
+
+    def set_progress(self, progress, total=None):
+        """Saves progress with a single UPDATE so handlers can call it inside their own transactions."""
+        self.progress = progress
+        fields = {'progress': progress}
+        if total is not None:
+            self.total = total
+            fields['total'] = total
+        Job.objects.filter(pk=self.pk).update(**fields)
+
+    def mark_finished(self, status, message=''):
+        self.status = status
+        self.message = message
+        self.finished_at = timezone.now()
+        self.save(update_fields=['status', 'message', 'errors', 'payload', 'result_file', 'progress', 'total', 'finished_at'])
+
+
+def visible_jobs(tenant):
+    """
+    Jobs the tenant's user may see and download: every job of the shop for its
+    owner, otherwise only the user's own (job files hold the shop's data).
+    """
+    shop = tenant.shop
+    if not shop:
+        return Job.objects.none()
+    jobs = Job.objects.filter(shop=shop)
+    if shop.owner_id != tenant.user_id:
+        jobs = jobs.filter(user_id=tenant.user_id)
+    return jobs
@@ -0,0 +1,120 @@
+"""
+Database-backed job queue: views enqueue a Job row and return straight away,
+and `python manage.py run_jobs` workers pick jobs up and run their handler.
+No broker is needed; several workers can run side by side.
+"""
+import datetime
+import logging
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Job kind -> handler. Handlers take the Job, may attach job.result_file / job.errors,
+# report progress with job.set_progress() and return a short summary message.
+HANDLERS = {
+    Job.Kind.PRODUCT_IMPORT: 'inventory.tasks.import_products',
+    Job.Kind.CLIENT_IMPORT: 'customers.tasks.import_clients',
+    Job.Kind.BARCODE_LABELS: 'inventory.tasks.print_barcode_labels',
+    Job.Kind.STOCK_EXPORT: 'inventory.tasks.export_stock',
+}
+
+MAX_ATTEMPTS = 3
+
+
+def enqueue(kind, shop, user=None, payload=None, input_file=None):
+    """Creates a pending job (storing the uploaded file if any) and returns it."""
+    job = Job(kind=kind, shop=shop, user=user, payload=payload or {})
+    if input_file is not None:
+        job.input_file.save(input_file.name, input_file, save=False)
+    job.save()
+
+    if getattr(settings, 'JOBS_RUN_EAGERLY', False):
+        # Local development without a worker: run it in the request once committed
+        transaction.on_commit(lambda: run_pending(job_id=job.pk))
+    return job
+
+
+def claim_next(job_id=None):
+    """
+    Moves the oldest pending job to RUNNING and returns it, or None if there is nothing to do.
+    The conditional UPDATE makes the claim safe between concurrent workers; on PostgreSQL
+    SKIP LOCKED also keeps them from queueing up behind the same row.
+    """
+    with transaction.atomic():
+        queryset = Job.objects.filter(status=Job.Status.PENDING).order_by('created_at')
+        if job_id:
+            queryset = queryset.filter(pk=job_id)
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        job = queryset.first()
+        if job is None:
+            return None
+
+        claimed = Job.objects.filter(pk=job.pk, status=Job.Status.PENDING).update(
+            status=Job.Status.RUNNING, started_at=timezone.now(), attempts=F('attempts') + 1
+        )
+        if not claimed:
+            return None
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job):
+    """Runs a claimed job's handler and records the outcome."""
+    try:
+        handler = import_string(HANDLERS[job.kind])
+        message = handler(job) or ''
+    except Exception as e:
+        logger.exception("Job %s failed", job.pk)
+        job.mark_finished(Job.Status.FAILED, f"Error: {e}")
+    else:
+        job.mark_finished(Job.Status.DONE, message)
+    notify(job)
+    return job
+
+
+def run_pending(job_id=None, limit=None):
+    """Runs pending jobs until the queue is empty (or `limit` jobs ran). Returns how many ran."""
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next(job_id)
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+        if job_id:
+            break
+    return count
+
+
+def requeue_stale(timeout):
+    """
+    Puts RUNNING jobs whose worker died (started more than `timeout` ago) back in the queue,
+    or fails them once they have used up their attempts.
+    """
+    cutoff = timezone.now() - datetime.timedelta(seconds=timeout)
+    stale = Job.objects.filter(status=Job.Status.RUNNING, started_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=Job.Status.FAILED, message="Worker stopped before the job finished.", finished_at=timezone.now()
+    )
+    requeued = stale.filter(attempts__lt=MAX_ATTEMPTS).update(status=Job.Status.PENDING)
+    return requeued, failed
+
+
+def notify(job):
+    if not job.user_id:
+        return
+    from dashboard.models import Notification
+    verb = f"{job.get_kind_display()} {'ready' if job.status == Job.Status.DONE else 'failed'}"
+    Notification.objects.create(
+        recipient_id=job.user_id,
+        verb=verb,
+        message=job.message or verb,
+        link=reverse('job_detail', args=[job.pk]),
+    )
@@ -0,0 +1,21 @@
+from rest_framework import serializers
+from django.urls import reverse
+from .models import Job
+
+class JobSerializer(serializers.ModelSerializer):
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+    percent = serializers.IntegerField(read_only=True)
+    is_finished = serializers.BooleanField(read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = (
+            'id', 'kind', 'kind_display', 'status', 'progress', 'total', 'percent', 'is_finished',
+            'message', 'errors', 'download_url', 'created_at', 'started_at', 'finished_at'
+        )
+
+    def get_download_url(self, obj):
+        if obj.status == Job.Status.DONE and obj.result_file:
+            return reverse('job_download', args=[obj.pk])
+        return None
@@ -0,0 +1,151 @@
+import datetime
+import io
+import shutil
+import tempfile
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from dashboard.models import Notification
+from shops.models import Shop
+from . import queue
+from .models import Job
+
+
+def finish(job):
+    job.result_file.save('stock.csv', ContentFile(b'sku,quantity\nSKU-1,4\n'), save=False)
+    job.payload['filename'] = 'stock.csv'
+    return "Stock report ready to download."
+
+
+def fail(job):
+    raise ValueError("Unreadable file")
+
+
+class JobQueueTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Job files go to a throwaway directory instead of JOB_FILES_ROOT
+        cls.files_root = tempfile.mkdtemp()
+        storage = FileSystemStorage(location=cls.files_root)
+        for name in ('input_file', 'result_file'):
+            patcher = mock.patch.object(Job._meta.get_field(name), 'storage', storage)
+            patcher.start()
+            cls.addClassCleanup(patcher.stop)
+        cls.addClassCleanup(shutil.rmtree, cls.files_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.owner = User.objects.create_user(username='owner', password='pass1234!x', role='OWNER')
+        cls.shop = Shop.objects.create(owner=cls.owner, name='Job Shop', slug='job-shop')
+        cls.employee = User.objects.create_user(username='clerk', password='pass1234!x', role='EMPLOYEE', shop=cls.shop)
+        other_owner = User.objects.create_user(username='other', password='pass1234!x', role='OWNER')
+        cls.other_shop = Shop.objects.create(owner=other_owner, name='Other Shop', slug='other-shop')
+
+    def setUp(self):
+        handlers = {Job.Kind.STOCK_EXPORT: 'jobs.tests.finish', Job.Kind.BARCODE_LABELS: 'jobs.tests.fail'}
+        patcher = mock.patch.dict(queue.HANDLERS, handlers)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def enqueue(self, kind=Job.Kind.STOCK_EXPORT, shop=None, user=None):
+        return queue.enqueue(kind, shop or self.shop, user=user or self.owner)
+
+    def test_one_worker_claims_a_job(self):
+        job = self.enqueue()
+        claimed = queue.claim_next()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual((claimed.status, claimed.attempts), (Job.Status.RUNNING, 1))
+        self.assertIsNotNone(claimed.started_at)
+        # The second worker finds nothing left to claim
+        self.assertIsNone(queue.claim_next())
+        self.assertIsNone(queue.claim_next(job_id=job.pk))
+
+    def test_oldest_job_first(self):
+        first, second = self.enqueue(), self.enqueue()
+        self.assertEqual(queue.claim_next().pk, first.pk)
+        self.assertEqual(queue.claim_next().pk, second.pk)
+
+    def test_job_succeeds(self):
+        job = self.enqueue()
+        self.assertEqual(queue.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.DONE)
+        self.assertEqual(job.message, "Stock report ready to download.")
+        self.assertEqual(job.percent, 100)
+        self.assertIsNotNone(job.finished_at)
+        with job.result_file.open('rb') as f:
+            self.assertIn(b'SKU-1', f.read())
+        self.assertEqual(Notification.objects.get(recipient=self.owner).verb, "Stock Export ready")
+
+    def test_job_fails(self):
+        job = self.enqueue(Job.Kind.BARCODE_LABELS)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            queue.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.message, "Error: Unreadable file")
+        self.assertFalse(job.result_file)
+        self.assertEqual(Notification.objects.get(recipient=self.owner).verb, "Barcode Labels failed")
+
+    def test_requeue_stale(self):
+        long_ago = timezone.now() - datetime.timedelta(hours=2)
+        retry = self.enqueue()
+        exhausted = self.enqueue()
+        recent = self.enqueue()
+        Job.objects.filter(pk=retry.pk).update(status=Job.Status.RUNNING, started_at=long_ago, attempts=1)
+        Job.objects.filter(pk=exhausted.pk).update(status=Job.Status.RUNNING, started_at=long_ago, attempts=queue.MAX_ATTEMPTS)
+        Job.objects.filter(pk=recent.pk).update(status=Job.Status.RUNNING, started_at=timezone.now(), attempts=1)
+
+        self.assertEqual(queue.requeue_stale(3600), (1, 1))
+        statuses = dict(Job.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[retry.pk], Job.Status.PENDING)
+        self.assertEqual(statuses[exhausted.pk], Job.Status.FAILED)
+        self.assertEqual(statuses[recent.pk], Job.Status.RUNNING)
+
+    def test_run_jobs_command(self):
+        self.enqueue()
+        self.enqueue(Job.Kind.BARCODE_LABELS)
+        stale = self.enqueue()
+        Job.objects.filter(pk=stale.pk).update(
+            status=Job.Status.RUNNING, started_at=timezone.now() - datetime.timedelta(hours=2), attempts=1
+        )
+
+        out = io.StringIO()
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            call_command('run_jobs', '--once', stdout=out)
+        self.assertIn("Requeued 1 stale job(s), failed 0.", out.getvalue())
+        self.assertIn("Ran 3 job(s).", out.getvalue())
+        self.assertEqual(
+            sorted(Job.objects.values_list('status', flat=True)), [Job.Status.DONE, Job.Status.DONE, Job.Status.FAILED]
+        )
+        self.assertEqual(Job.objects.get(pk=stale.pk).attempts, 2)
+
+    def test_download_is_limited_to_the_shop_and_user(self):
+        job = self.enqueue(user=self.employee)
+        queue.run_pending()
+        url = f'/jobs/{job.pk}/download/'
+
+        for user in (self.employee, self.owner):
+            self.client.force_login(user)
+            response = self.client.get(url, secure=True)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b''.join(response.streaming_content), b'sku,quantity\nSKU-1,4\n')
+            self.assertIn('stock.csv', response['Content-Disposition'])
+
+        # Another employee of the shop, and the owner of another shop
+        colleague = get_user_model().objects.create_user(username='colleague', password='pass1234!x', role='EMPLOYEE', shop=self.shop)
+        for user in (colleague, self.other_shop.owner):
+            self.client.force_login(user)
+            self.assertEqual(self.client.get(url, secure=True).status_code, 404)
+            self.assertEqual(self.client.get(f'/jobs/{job.pk}/', secure=True).status_code, 404)
+
+    def test_unfinished_job_has_no_download(self):
+        job = self.enqueue()
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(f'/jobs/{job.pk}/download/', secure=True).status_code, 404)
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import JobListAPIView, JobStatusAPIView
+
+urlpatterns = [
+    path('', JobListAPIView.as_view(), name='api_job_list'),
+    path('<int:pk>/', JobStatusAPIView.as_view(), name='api_job_status'),
+]
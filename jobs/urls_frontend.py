@@ -0,0 +1,7 @@
+from django.urls import path
+from .views_frontend import JobDetailView, JobDownloadView
+
+urlpatterns = [
+    path('<int:pk>/', JobDetailView.as_view(), name='job_detail'),
+    path('<int:pk>/download/', JobDownloadView.as_view(), name='job_download'),
+]
@@ -0,0 +1,16 @@
+from rest_framework import generics, permissions
+from .models import visible_jobs
+from .serializers import JobSerializer
+
+class ShopJobMixin:
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        return visible_jobs(self.request.tenant)
+
+class JobListAPIView(ShopJobMixin, generics.ListAPIView):
+    """Recent jobs of the user's shop (only their own for employees)."""
+
+class JobStatusAPIView(ShopJobMixin, generics.RetrieveAPIView):
+    """Status and progress of one job (polled by the job page)."""
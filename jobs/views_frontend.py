@@ -0,0 +1,23 @@
+import os
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.views.generic import DetailView, View
+from shops.mixins import BaseShopView
+from .models import Job, visible_jobs
+
+class BaseJobView(BaseShopView):
+    def get_queryset(self):
+        return visible_jobs(self.request.tenant)
+
+class JobDetailView(BaseJobView, DetailView):
+    model = Job
+    template_name = 'jobs/job_detail.html'
+    context_object_name = 'job'
+
+class JobDownloadView(BaseJobView, View):
+    def get(self, request, pk):
+        job = get_object_or_404(self.get_queryset(), pk=pk, status=Job.Status.DONE)
+        if not job.result_file:
+            raise Http404("This job has no file to download.")
+        filename = job.payload.get('filename') or os.path.basename(job.result_file.name)
+        return FileResponse(job.result_file.open('rb'), as_attachment=True, filename=filename)
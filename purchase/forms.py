@@ -29,6 +29,11 @@ class PurchaseOrderForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         if shop:
             self.fields['supplier'].queryset = Supplier.objects.filter(shop=shop)
+        # Drafts only come from the reorder engine and are confirmed from the order list
+        self.fields['status'].choices = [
+            choice for choice in self.fields['status'].choices if choice[0] != PurchaseOrder.Status.DRAFT
+        ]
+
 class PurchaseReturnForm(forms.ModelForm):
     class Meta:
         model = PurchaseReturn
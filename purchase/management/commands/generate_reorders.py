@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from shops.models import Shop
+from purchase.reorder import generate_reorders, LEAD_TIME_DAYS, COVER_DAYS
+
+class Command(BaseCommand):
+    help = 'Creates draft purchase orders for everything at or below its reorder point'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, action='append', dest='shops', help='Only this shop id (repeatable)')
+        parser.add_argument('--lead-time', type=int, default=LEAD_TIME_DAYS, help='Supplier lead time in days')
+        parser.add_argument('--cover-days', type=int, default=COVER_DAYS, help='Days of demand each order should cover')
+
+    def handle(self, *args, **options):
+        shops = Shop.objects.order_by('pk')
+        if options.get('shops'):
+            shops = shops.filter(pk__in=options['shops'])
+
+        order_count = 0
+        item_count = 0
+        for shop in shops.iterator():
+            orders, suggestions = generate_reorders(shop, options['lead_time'], options['cover_days'])
+            order_count += len(orders)
+            item_count += len(suggestions)
+
+        self.stdout.write(self.style.SUCCESS(f'Created {order_count} draft purchase orders ({item_count} items).'))
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('purchase', '0002_purchasereturn_purchasereturnitem'),
+        ('shops', '0003_shop_public_visibility_shop_slug'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['shop', 'created_at'], name='purchase_po_shop_created_idx'),
+        ),
+    ]
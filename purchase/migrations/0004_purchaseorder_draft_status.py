@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 22:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('purchase', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='purchaseorder',
+            name='status',
+            field=models.CharField(choices=[('DRAFT', 'Draft'), ('PENDING', 'Pending'), ('RECEIVED', 'Received')], default='PENDING', max_length=10),
+        ),
+    ]
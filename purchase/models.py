@@ -15,6 +15,7 @@ class Supplier(models.Model):
 
 class PurchaseOrder(models.Model):
     class Status(models.TextChoices):
+        DRAFT = 'DRAFT', 'Draft' # Suggested by the reorder engine, not sent to the supplier yet
         PENDING = 'PENDING', 'Pending'
         RECEIVED = 'RECEIVED', 'Received'
 
@@ -26,8 +27,13 @@ class PurchaseOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['shop', 'created_at'], name='purchase_po_shop_created_idx'),
+        ]
+
     def __str__(self):
-        return f"PO #{self.id} - {self.supplier.name}"
+        return f"PO #{self.id} - {self.supplier.name if self.supplier else 'No supplier'}"
 
 class PurchaseItem(models.Model):
     purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='items')
@@ -0,0 +1,126 @@
+"""
+Reorder-point engine: turns stock levels and demand forecasts into draft
+purchase orders, one per (branch, supplier).
+
+For every goods (product, branch):
+    reorder point = low stock threshold (safety stock) + demand over the lead time
+    order up to   = reorder point + demand over the cover period
+    order qty     = order up to - in stock - already on open/draft orders
+Demand comes from the nightly DemandForecast rows (live sales average until the
+first refresh). A product's supplier is the one it was last purchased from.
+Everything is read with a handful of grouped queries and written with bulk inserts.
+"""
+import math
+from collections import namedtuple
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum
+from inventory.forecasting import SalesForecaster
+from inventory.models import Product, Stock, DemandForecast
+from .models import PurchaseOrder, PurchaseItem
+
+LEAD_TIME_DAYS = 7
+COVER_DAYS = 14
+BATCH_SIZE = 1000
+
+Suggestion = namedtuple('Suggestion', 'product branch supplier_id quantity in_stock on_order reorder_point daily_usage')
+
+
+def daily_usage_by_stock(shop):
+    """{(product_id, branch_id): units per day}, from the precomputed forecasts if there are any."""
+    rows = DemandForecast.objects.filter(shop=shop).values_list('product_id', 'branch_id', 'daily_usage')
+    usage = {(product_id, branch_id): daily_usage for product_id, branch_id, daily_usage in rows}
+    if usage:
+        return usage
+    days = 30
+    sold = SalesForecaster().sold_quantities(shop, days)
+    return {key: total / days for key, total in sold.items()}
+
+
+def last_suppliers(shop):
+    """{product_id: supplier_id} of the most recent purchase order that had the product."""
+    rows = PurchaseItem.objects.filter(
+        purchase_order__shop=shop, purchase_order__supplier__isnull=False
+    ).order_by('purchase_order__created_at', 'pk').values_list('product_id', 'purchase_order__supplier_id')
+    return dict(rows.iterator(chunk_size=BATCH_SIZE)) # Later orders overwrite earlier ones
+
+
+def on_order(shop):
+    """{(product_id, branch_id): units} on draft or pending purchase orders."""
+    rows = PurchaseItem.objects.filter(
+        purchase_order__shop=shop,
+        purchase_order__status__in=[PurchaseOrder.Status.DRAFT, PurchaseOrder.Status.PENDING]
+    ).values('product_id', 'purchase_order__branch_id').annotate(total=Sum('quantity')).values_list(
+        'product_id', 'purchase_order__branch_id', 'total'
+    )
+    return {(product_id, branch_id): total or 0 for product_id, branch_id, total in rows}
+
+
+def suggest_reorders(shop, lead_time_days=LEAD_TIME_DAYS, cover_days=COVER_DAYS, branch=None):
+    """Returns the Suggestions for every goods (product, branch) of the shop that needs ordering."""
+    usage = daily_usage_by_stock(shop)
+    suppliers = last_suppliers(shop)
+    ordered = on_order(shop)
+
+    stocks = Stock.objects.filter(
+        branch__shop=shop, product__product_type=Product.Type.GOODS
+    ).select_related('product', 'branch')
+    if branch:
+        stocks = stocks.filter(branch=branch)
+
+    suggestions = []
+    for stock in stocks.iterator(chunk_size=BATCH_SIZE):
+        key = (stock.product_id, stock.branch_id)
+        daily_usage = usage.get(key, 0)
+        reorder_point = stock.low_stock_threshold + math.ceil(daily_usage * lead_time_days)
+        pending = ordered.get(key, 0)
+        available = stock.quantity + pending
+        if available > reorder_point:
+            continue
+
+        order_up_to = reorder_point + math.ceil(daily_usage * cover_days)
+        quantity = order_up_to - available
+        if quantity <= 0:
+            continue
+        suggestions.append(Suggestion(
+            stock.product, stock.branch, suppliers.get(stock.product_id), quantity,
+            stock.quantity, pending, reorder_point, daily_usage
+        ))
+    return suggestions
+
+
+def create_draft_orders(shop, suggestions):
+    """
+    Creates one draft PurchaseOrder per (branch, supplier) with bulk inserts
+    (orders first, then all their items). Returns the created orders.
+    """
+    groups = {}
+    for suggestion in suggestions:
+        groups.setdefault((suggestion.branch.pk, suggestion.supplier_id), []).append(suggestion)
+    if not groups:
+        return []
+
+    with transaction.atomic():
+        orders = PurchaseOrder.objects.bulk_create([
+            PurchaseOrder(
+                shop=shop,
+                branch_id=branch_id,
+                supplier_id=supplier_id,
+                status=PurchaseOrder.Status.DRAFT,
+                total_cost=sum((s.product.cost_price or Decimal('0')) * s.quantity for s in items)
+            )
+            for (branch_id, supplier_id), items in groups.items()
+        ], batch_size=BATCH_SIZE)
+
+        PurchaseItem.objects.bulk_create([
+            PurchaseItem(purchase_order=order, product=s.product, quantity=s.quantity, unit_cost=s.product.cost_price or 0)
+            for order, items in zip(orders, groups.values())
+            for s in items
+        ], batch_size=BATCH_SIZE)
+    return orders
+
+
+def generate_reorders(shop, lead_time_days=LEAD_TIME_DAYS, cover_days=COVER_DAYS, branch=None):
+    """Suggests and creates the draft orders in one go. Returns (orders, suggestions)."""
+    suggestions = suggest_reorders(shop, lead_time_days, cover_days, branch)
+    return create_draft_orders(shop, suggestions), suggestions
@@ -1,3 +1,81 @@
-from django.test import TestCase
+from decimal import Decimal
+from inventory.models import Category, Product, Stock
+from reports.models import DailyShopSummary
+from shops.tests import TenantAPITestCase
+from .forms import PurchaseOrderForm
+from .models import Supplier, PurchaseOrder, PurchaseItem
+from .reorder import generate_reorders
+from .views import SupplierViewSet, PurchaseOrderViewSet
 
-# Create your tests here.
+
+class PurchaseQueryBudgetTests(TenantAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        category = Category.objects.create(shop=cls.shop, name='Stationery')
+        cls.products = [
+            Product.objects.create(shop=cls.shop, category=category, name=f'Product {i}', sku=f'SKU-{i}', selling_price=100, cost_price=50)
+            for i in range(3)
+        ]
+        cls.add_orders(3)
+
+    @classmethod
+    def add_orders(cls, count=12):
+        for i in range(count):
+            supplier = Supplier.objects.create(shop=cls.shop, name=f'Supplier {i}')
+            order = PurchaseOrder.objects.create(shop=cls.shop, branch=cls.branches[0], supplier=supplier)
+            PurchaseItem.objects.bulk_create(
+                PurchaseItem(purchase_order=order, product=product, quantity=5, unit_cost=50) for product in cls.products
+            )
+
+    def test_suppliers(self):
+        supplier = Supplier.objects.filter(shop=self.shop).first()
+        self.assertWithinBudget(SupplierViewSet, 'list', '/api/purchase/suppliers/', **self.auth())
+        self.assertWithinBudget(SupplierViewSet, 'retrieve', f'/api/purchase/suppliers/{supplier.pk}/', **self.auth())
+
+    def test_orders(self):
+        order = PurchaseOrder.objects.filter(shop=self.shop).first()
+        response = self.assertWithinBudget(PurchaseOrderViewSet, 'list', '/api/purchase/orders/', **self.auth())
+        self.assertEqual(len(response.json()['results'][0]['items']), 3)
+        self.assertWithinBudget(PurchaseOrderViewSet, 'retrieve', f'/api/purchase/orders/{order.pk}/', **self.auth())
+        self.assertConstantQueries('/api/purchase/orders/', self.add_orders, **self.auth())
+
+
+class ReorderDraftTests(TenantAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = Product.objects.create(shop=cls.shop, name='Pens', sku='PEN', selling_price=100, cost_price=50)
+        # Below the threshold (5) in the main branch only
+        Stock.objects.filter(product=cls.product, branch=cls.branches[1]).update(quantity=100)
+
+    def purchases_count(self):
+        return sum(DailyShopSummary.objects.filter(shop=self.shop).values_list('purchases_count', flat=True))
+
+    def test_draft_is_created_once_then_confirmed(self):
+        orders, _ = generate_reorders(self.shop)
+        self.assertEqual(len(orders), 1)
+        order = PurchaseOrder.objects.get(shop=self.shop)
+        self.assertEqual((order.status, order.branch), (PurchaseOrder.Status.DRAFT, self.branches[0]))
+        self.assertEqual(list(order.items.values_list('product_id', 'quantity')), [(self.product.pk, 5)])
+        self.assertEqual(order.total_cost, Decimal('250.00'))
+
+        # The draft's quantity counts as on order, so a re-run suggests nothing
+        self.assertEqual(generate_reorders(self.shop), ([], []))
+        self.assertEqual(self.purchases_count(), 0) # Drafts aren't purchases yet
+
+        self.client.force_login(self.owner)
+        url = f'/purchase/{order.pk}/confirm/'
+        self.assertContains(self.client.get('/purchase/list/', secure=True), f'action="{url}"')
+        self.assertEqual(self.client.post(url, secure=True).status_code, 302)
+        order.refresh_from_db()
+        self.assertEqual(order.status, PurchaseOrder.Status.PENDING)
+        self.assertEqual(self.purchases_count(), 1)
+        self.assertEqual(generate_reorders(self.shop), ([], []))
+        self.assertEqual(self.client.post(url, secure=True).status_code, 404) # Only drafts are confirmed
+
+    def test_drafts_are_not_a_manual_status(self):
+        form = PurchaseOrderForm(shop=self.shop, data={'status': 'DRAFT', 'total_cost': '10'})
+        self.assertNotIn('DRAFT', [value for value, _ in form.fields['status'].choices])
+        self.assertFalse(form.is_valid())
+        self.assertIn('status', form.errors)
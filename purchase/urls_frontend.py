@@ -1,6 +1,6 @@
 from django.urls import path
 from .views_frontend import (
-    PurchaseCreateView, PurchaseListView, PurchaseRecentView,
+    PurchaseCreateView, PurchaseConfirmView, PurchaseListView, PurchaseRecentView, ReorderView,
     SupplierListView, SupplierCreateView, SupplierDetailView, SupplierUpdateView
 )
 
@@ -8,6 +8,8 @@ urlpatterns = [
     path('create/', PurchaseCreateView.as_view(), name='purchase_create'),
     path('list/', PurchaseListView.as_view(), name='purchase_list'),
     path('recent/', PurchaseRecentView.as_view(), name='purchase_recent'),
+    path('<int:pk>/confirm/', PurchaseConfirmView.as_view(), name='purchase_confirm'),
+    path('reorder/', ReorderView.as_view(), name='purchase_reorder'),
     
     # Supplier URLs
     path('suppliers/', SupplierListView.as_view(), name='supplier_list'),
@@ -1,9 +1,14 @@
 from rest_framework import viewsets, permissions
-from .models import Supplier, PurchaseOrder
+from django.db.models import Prefetch
+from .models import Supplier, PurchaseOrder, PurchaseItem
 from .serializers import SupplierSerializer, PurchaseOrderSerializer
+from users.role_permissions import HasModulePermission
+from shops.query_budget import QueryBudgetMixin
 
-class SupplierViewSet(viewsets.ModelViewSet):
-    permission_classes = [permissions.IsAuthenticated]
+class SupplierViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    permission_module = 'purchases'
+    query_budget = {'list': 3, 'retrieve': 2}
     serializer_class = SupplierSerializer
 
     def get_queryset(self):
@@ -12,12 +17,18 @@ class SupplierViewSet(viewsets.ModelViewSet):
             return Supplier.objects.all()
         return Supplier.objects.filter(shop__owner=user)
 
-class PurchaseOrderViewSet(viewsets.ModelViewSet):
-    permission_classes = [permissions.IsAuthenticated]
+class PurchaseOrderViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    permission_module = 'purchases'
+    query_budget = {'list': 4, 'retrieve': 3}
     serializer_class = PurchaseOrderSerializer
 
     def get_queryset(self):
         user = self.request.user
+        # supplier_name and the items' product_name, two queries per page
+        orders = PurchaseOrder.objects.select_related('supplier').prefetch_related(
+            Prefetch('items', queryset=PurchaseItem.objects.select_related('product'))
+        )
         if getattr(user, 'role', None) == 'SUPER_ADMIN' or user.is_superuser:
-            return PurchaseOrder.objects.all()
-        return PurchaseOrder.objects.filter(shop__owner=user)
+            return orders.all()
+        return orders.filter(shop__owner=user)
@@ -1,4 +1,4 @@
-from django.views.generic import ListView, CreateView, TemplateView
+from django.views.generic import ListView, CreateView, TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.contrib import messages
@@ -6,22 +6,9 @@ from .models import PurchaseOrder, Supplier
 from .forms import PurchaseOrderForm, SupplierForm
 from django.db import transaction
 from django.views.generic import ListView, CreateView, UpdateView, DetailView, TemplateView
-
-class BaseShopView(LoginRequiredMixin):
-    def get_shop(self):
-        # 1. Direct check for Employee's assigned shop
-        if getattr(self.request.user, 'shop', None):
-            return self.request.user.shop
-            
-        # 2. Check for Owner's shops
-        if hasattr(self.request.user, 'shops') and self.request.user.shops.exists():
-            return self.request.user.shops.first()
-            
-        # 3. Legacy fallback
-        if hasattr(self.request.user, 'employee_profile'):
-             return self.request.user.employee_profile.shop
-             
-        return None
+from django.shortcuts import redirect, get_object_or_404
+from .reorder import suggest_reorders, create_draft_orders
+from shops.mixins import BaseShopView
 
 class SupplierListView(BaseShopView, ListView):
     model = Supplier
@@ -114,6 +101,56 @@ class PurchaseCreateView(BaseShopView, CreateView):
         messages.success(self.request, "Purchase Order created successfully!")
         return super().form_valid(form)
 
+class ReorderView(BaseShopView, TemplateView):
+    """Reorder suggestions from stock levels and demand forecasts; POST turns them into draft orders."""
+    template_name = 'purchase/reorder.html'
+    preview_limit = 200
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        shop = self.get_shop()
+        suggestions = suggest_reorders(shop) if shop else []
+
+        # One draft order per (branch, supplier), as create_draft_orders will make them
+        groups = {}
+        for s in suggestions:
+            group = groups.setdefault((s.branch.pk, s.supplier_id), {'branch': s.branch, 'supplier_id': s.supplier_id, 'items': 0, 'total_cost': 0})
+            group['items'] += 1
+            group['total_cost'] += s.product.cost_price * s.quantity
+        suppliers = dict(Supplier.objects.filter(shop=shop).values_list('id', 'name')) if shop else {}
+        for group in groups.values():
+            group['supplier'] = suppliers.get(group['supplier_id'])
+
+        suggestions.sort(key=lambda s: s.in_stock - s.reorder_point) # Furthest below the reorder point first
+        context['suggestions'] = suggestions[:self.preview_limit]
+        context['suggestion_count'] = len(suggestions)
+        context['orders'] = list(groups.values())
+        return context
+
+    def post(self, request, *args, **kwargs):
+        shop = self.get_shop()
+        if not shop:
+            messages.error(request, "No shop associated.")
+            return redirect('dashboard')
+
+        suggestions = suggest_reorders(shop)
+        if not suggestions:
+            messages.info(request, "Everything is above its reorder point. No orders needed.")
+            return redirect('purchase_reorder')
+
+        orders = create_draft_orders(shop, suggestions)
+        messages.success(request, f"Created {len(orders)} draft purchase order(s) for {len(suggestions)} product(s).")
+        return redirect('purchase_list')
+
+class PurchaseConfirmView(BaseShopView, View):
+    """POST: turns a draft order of the reorder engine into a pending order, to be sent to the supplier."""
+    def post(self, request, pk):
+        order = get_object_or_404(PurchaseOrder, pk=pk, shop=self.get_shop(), status=PurchaseOrder.Status.DRAFT)
+        order.status = PurchaseOrder.Status.PENDING
+        order.save(update_fields=['status', 'updated_at'])
+        messages.success(request, f"Purchase order #{order.pk} confirmed.")
+        return redirect('purchase_list')
+
 class PurchaseRecentView(BaseShopView, ListView):
     model = PurchaseOrder
     template_name = 'purchase/purchase_list.html'
@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import DailyShopSummary
+
+@admin.register(DailyShopSummary)
+class DailyShopSummaryAdmin(admin.ModelAdmin):
+    list_display = ('date', 'shop', 'branch', 'sales_total', 'sales_count', 'purchases_total', 'expenses_total')
+    list_filter = ('shop',)
+    date_hierarchy = 'date'
@@ -0,0 +1,85 @@
+import datetime
+from django.db.models import Q, Sum, Count, DateTimeField
+from django.utils import timezone
+
+
+def summary_windows(today=None):
+    """
+    The today/week/month/year windows used by the report summaries and the dashboard.
+    Each window is a (start_date, end_date) pair of calendar days, end inclusive; None leaves that side open.
+    """
+    today = today or timezone.localdate()
+    return {
+        'today': (today, None),
+        'week': (today - datetime.timedelta(days=7), None),
+        'month': (today - datetime.timedelta(days=30), None),
+        'year': (today - datetime.timedelta(days=365), None),
+    }
+
+
+def day_start(day, tz=None):
+    """Aware datetime of local midnight at the start of `day`."""
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min), tz or timezone.get_current_timezone())
+
+
+def window_q(date_field, start_date=None, end_date=None, is_datetime=True, tz=None):
+    """
+    Q for a window of calendar days on `date_field`.
+    DateTime fields get a half-open [start midnight, day-after-end midnight) range in `tz`
+    (the current timezone by default), which keeps the column index usable unlike the __date transform.
+    """
+    q = Q()
+    if is_datetime:
+        if start_date:
+            q &= Q(**{f'{date_field}__gte': day_start(start_date, tz)})
+        if end_date:
+            q &= Q(**{f'{date_field}__lt': day_start(end_date + datetime.timedelta(days=1), tz)})
+    else:
+        if start_date:
+            q &= Q(**{f'{date_field}__gte': start_date})
+        if end_date:
+            q &= Q(**{f'{date_field}__lte': end_date})
+    return q
+
+
+def is_datetime_field(model, date_field):
+    return isinstance(model._meta.get_field(date_field), DateTimeField)
+
+
+def filter_window(queryset, date_field, start_date=None, end_date=None, tz=None):
+    """Filters a queryset to a window of calendar days (see window_q)."""
+    is_datetime = is_datetime_field(queryset.model, date_field)
+    return queryset.filter(window_q(date_field, start_date, end_date, is_datetime, tz))
+
+
+def aggregate_windows(queryset, windows, date_field='created_at', sums=None, count_field='pk', tz=None):
+    """
+    Aggregates any set of date windows over `queryset` in a single SQL statement,
+    using one conditional SUM/COUNT (FILTER (WHERE ...)) per window instead of a query per window.
+
+    windows: {name: (start_date, end_date)} as returned by summary_windows()
+    sums: {key: field name or expression} to total in every window
+    count_field: counted as 'count' in every window (None to skip)
+
+    Returns {name: {key: total, ..., 'count': n}}, with empty totals as 0.
+    """
+    sums = sums or {}
+    is_datetime = is_datetime_field(queryset.model, date_field)
+
+    aggregates = {}
+    for name, (start_date, end_date) in windows.items():
+        q = window_q(date_field, start_date, end_date, is_datetime, tz)
+        condition = q if q else None # An open window is a plain aggregate
+        for key, value in sums.items():
+            aggregates[f'{name}_{key}'] = Sum(value, filter=condition)
+        if count_field:
+            aggregates[f'{name}_count'] = Count(count_field, filter=condition)
+
+    result = queryset.aggregate(**aggregates) if aggregates else {}
+
+    data = {}
+    for name in windows:
+        data[name] = {key: result[f'{name}_{key}'] or 0 for key in sums}
+        if count_field:
+            data[name]['count'] = result[f'{name}_count']
+    return data
@@ -1,9 +1,12 @@
 from rest_framework import views, permissions, response
-from django.db.models import Sum
+from django.db.models import Sum, Count
 from sales.models import Sale
 from purchase.models import PurchaseOrder
 from finance.models import Expense
 from inventory.models import Product, StockMovement
+from inventory.forecasting import SalesForecaster
+from .aggregation import aggregate_windows, filter_window, summary_windows
+from .rollup import summary_totals
 from .serializers import (
     ReportSaleSerializer, ReportPurchaseSerializer, ReportExpenseSerializer, 
     ReportProductPricingSerializer, ReportStockMovementSerializer
@@ -11,19 +14,15 @@ from .serializers import (
 import datetime
 from django.utils import timezone # Added timezone
 from django.utils.dateparse import parse_date
+from users.role_permissions import HasModulePermission
+from shops.query_budget import QueryBudgetMixin
 
 class ReportBaseView(views.APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    permission_module = 'reports'
 
     def get_shop(self):
-        user = self.request.user
-        if getattr(user, 'shop', None):
-            return user.shop
-        if hasattr(user, 'shops') and user.shops.exists():
-            return user.shops.first()
-        if hasattr(user, 'employee_profile'):
-            return user.employee_profile.shop
-        return None
+        return self.request.tenant.shop
 
     def get_date_range(self):
         start_date_str = self.request.query_params.get('start_date')
@@ -34,33 +33,23 @@ class ReportBaseView(views.APIView):
         
         return start_date, end_date
 
-    def get_summary_stats(self, queryset, date_field='created_at', sum_field='total_amount', date_transform=True):
-        today = timezone.now().date()
-        periods = {
-            'today': today,
-            'week': today - datetime.timedelta(days=7),
-            'month': today - datetime.timedelta(days=30),
-            'year': today - datetime.timedelta(days=365)
-        }
-        
-        data = {}
-        lookup_suffix = "__date__gte" if date_transform else "__gte"
-        for key, start_date in periods.items():
-            filter_kwargs = {f"{date_field}{lookup_suffix}": start_date}
-            qs = queryset.filter(**filter_kwargs)
-            
-            if sum_field:
-                total = qs.aggregate(Sum(sum_field))[f'{sum_field}__sum'] or 0
-            else:
-                total = 0 # or count?
-                
-            count = qs.count()
-            data[key] = {
-                'total': total,
-                'count': count
-            }
+    def get_summary_stats(self, queryset, date_field='created_at', sum_field='total_amount'):
+        # All four periods in one statement (conditional SUM/COUNT per window)
+        sums = {'total': sum_field} if sum_field else {}
+        data = aggregate_windows(queryset, summary_windows(), date_field=date_field, sums=sums)
+        for values in data.values():
+            values.setdefault('total', 0)
         return data
 
+    def get_rollup_stats(self, shop, metrics):
+        """Same periods as get_summary_stats, answered from the DailyShopSummary rollup."""
+        return summary_totals(shop, summary_windows(), metrics)
+
+    def get_rollup_totals(self, shop, metrics, start_date=None, end_date=None):
+        """Totals of the given metrics over an inclusive date range, in one rollup query."""
+        stats = summary_totals(shop, {'range': (start_date, end_date)}, metrics)['range']
+        return {metric: stats[metric]['total'] for metric in metrics}
+
 class SalesReportAPIView(ReportBaseView):
     def get(self, request):
         shop = self.get_shop()
@@ -69,14 +58,11 @@ class SalesReportAPIView(ReportBaseView):
             
         queryset = Sale.objects.filter(shop=shop).order_by('-created_at')
         start_date, end_date = self.get_date_range()
-        
-        if start_date:
-            queryset = queryset.filter(created_at__date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(created_at__date__lte=end_date)
+        queryset = filter_window(queryset, 'created_at', start_date, end_date)
             
-        total_sales = queryset.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        total_count = queryset.count()
+        totals = queryset.aggregate(total=Sum('total_amount'), count=Count('pk'))
+        total_sales = totals['total'] or 0
+        total_count = totals['count']
         
         serializer = ReportSaleSerializer(queryset, many=True)
         return response.Response({
@@ -91,8 +77,8 @@ class SalesSummaryAPIView(ReportBaseView):
         if not shop:
             return response.Response({'error': 'No shop associated'}, status=400)
             
-        base_qs = Sale.objects.filter(shop=shop)
-        data = self.get_summary_stats(base_qs, date_field='created_at', sum_field='total_amount')
+        stats = self.get_rollup_stats(shop, ['sales'])
+        data = {key: values['sales'] for key, values in stats.items()}
         return response.Response(data)
 
 class PurchasesReportAPIView(ReportBaseView):
@@ -101,13 +87,9 @@ class PurchasesReportAPIView(ReportBaseView):
         if not shop:
             return response.Response({'error': 'No shop associated'}, status=400)
             
-        queryset = PurchaseOrder.objects.filter(shop=shop).order_by('-created_at')
+        queryset = PurchaseOrder.objects.filter(shop=shop).exclude(status=PurchaseOrder.Status.DRAFT).order_by('-created_at')
         start_date, end_date = self.get_date_range()
-        
-        if start_date:
-            queryset = queryset.filter(created_at__date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(created_at__date__lte=end_date)
+        queryset = filter_window(queryset, 'created_at', start_date, end_date)
             
         total_purchases = queryset.aggregate(Sum('total_cost'))['total_cost__sum'] or 0
         
@@ -146,17 +128,8 @@ class ExpensesReportAPIView(ReportBaseView):
             
         serializer = ReportExpenseSerializer(data=request.data)
         if serializer.is_valid():
-            # Determine Branch
-            branch = None
-            if getattr(request.user, 'branch', None):
-                 branch = request.user.branch
-            elif hasattr(request.user, 'employee_profile') and request.user.employee_profile.branch:
-                 branch = request.user.employee_profile.branch
-            else:
-                 # Default to Main Branch for Owner
-                 if hasattr(shop, 'branches'):
-                     branch = shop.branches.filter(is_main=True).first()
-            
+            # Employee's branch, else the Main Branch for Owner
+            branch = request.tenant.branch
             if not branch:
                  return response.Response({'error': 'No active branch found for expense.'}, status=400)
 
@@ -185,15 +158,37 @@ class DisposalReportAPIView(ReportBaseView):
         queryset = StockMovement.objects.filter(product__shop=shop, movement_type__in=['DISPOSAL', 'DAMAGED', 'EXPIRED']).order_by('-created_at')
         
         start_date, end_date = self.get_date_range()
-        
-        if start_date:
-            queryset = queryset.filter(created_at__date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(created_at__date__lte=end_date)
+        queryset = filter_window(queryset, 'created_at', start_date, end_date)
             
         serializer = ReportStockMovementSerializer(queryset, many=True)
         return response.Response(serializer.data)
 
+class ForecastReportAPIView(QueryBudgetMixin, ReportBaseView):
+    """Precomputed forecasts (refresh_forecasts), else a live forecast for shops not refreshed yet."""
+    query_budget = {'get': 5} # 3 when precomputed, 5 with the live fallback
+
+    def get(self, request):
+        shop = self.get_shop()
+        if not shop:
+            return response.Response({'error': 'No shop associated'}, status=400)
+
+        forecaster = SalesForecaster()
+        forecasts = forecaster.precomputed(shop) or forecaster.forecast(shop)
+        return response.Response([
+            {
+                'product_id': f['product'].id,
+                'product_name': f['product'].name,
+                'branch_id': f['branch'].id,
+                'branch_name': f['branch'].name,
+                'current_stock': f['current_stock'],
+                'daily_usage': round(f['daily_usage'], 2),
+                'days_left': f['days_left'],
+                'runout_date': f['runout_date'],
+                'status': f['status'],
+            }
+            for f in forecasts if f['daily_usage'] > 0
+        ])
+
 class IncomeStatementAPIView(ReportBaseView):
     def get(self, request):
         shop = self.get_shop()
@@ -202,23 +197,11 @@ class IncomeStatementAPIView(ReportBaseView):
             
         start_date, end_date = self.get_date_range()
         
-        sales_qs = Sale.objects.filter(shop=shop)
-        purchases_qs = PurchaseOrder.objects.filter(shop=shop)
-        expenses_qs = Expense.objects.filter(shop=shop)
-        
-        if start_date:
-            sales_qs = sales_qs.filter(created_at__date__gte=start_date)
-            purchases_qs = purchases_qs.filter(created_at__date__gte=start_date)
-            expenses_qs = expenses_qs.filter(date__gte=start_date)
-            
-        if end_date:
-            sales_qs = sales_qs.filter(created_at__date__lte=end_date)
-            purchases_qs = purchases_qs.filter(created_at__date__lte=end_date)
-            expenses_qs = expenses_qs.filter(date__lte=end_date)
-            
-        total_sales = sales_qs.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        total_purchases = purchases_qs.aggregate(Sum('total_cost'))['total_cost__sum'] or 0
-        total_expenses = expenses_qs.aggregate(Sum('amount'))['amount__sum'] or 0
+        # One query against the daily rollup instead of three raw-table scans
+        totals = self.get_rollup_totals(shop, ['sales', 'purchases', 'expenses'], start_date, end_date)
+        total_sales = totals['sales']
+        total_purchases = totals['purchases']
+        total_expenses = totals['expenses']
         
         return response.Response({
             'total_income': total_sales,
@@ -236,23 +219,11 @@ class CashflowAPIView(ReportBaseView):
             
         start_date, end_date = self.get_date_range()
         
-        sales_qs = Sale.objects.filter(shop=shop)
-        purchases_qs = PurchaseOrder.objects.filter(shop=shop)
-        expenses_qs = Expense.objects.filter(shop=shop)
-        
-        if start_date:
-            sales_qs = sales_qs.filter(created_at__date__gte=start_date)
-            purchases_qs = purchases_qs.filter(created_at__date__gte=start_date)
-            expenses_qs = expenses_qs.filter(date__gte=start_date)
-            
-        if end_date:
-            sales_qs = sales_qs.filter(created_at__date__lte=end_date)
-            purchases_qs = purchases_qs.filter(created_at__date__lte=end_date)
-            expenses_qs = expenses_qs.filter(date__lte=end_date)
-            
-        total_sales = sales_qs.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        total_purchases = purchases_qs.aggregate(Sum('total_cost'))['total_cost__sum'] or 0
-        total_expenses = expenses_qs.aggregate(Sum('amount'))['amount__sum'] or 0
+        # One query against the daily rollup instead of three raw-table scans
+        totals = self.get_rollup_totals(shop, ['sales', 'purchases', 'expenses'], start_date, end_date)
+        total_sales = totals['sales']
+        total_purchases = totals['purchases']
+        total_expenses = totals['expenses']
         
         inflow = total_sales
         outflow = total_purchases + total_expenses
@@ -268,38 +239,25 @@ class PurchasesSummaryAPIView(ReportBaseView):
     def get(self, request):
         shop = self.get_shop()
         if not shop: return response.Response({'error': 'No shop associated'}, status=400)
-        qs = PurchaseOrder.objects.filter(shop=shop)
-        data = self.get_summary_stats(qs, date_field='created_at', sum_field='total_cost')
+        stats = self.get_rollup_stats(shop, ['purchases'])
+        data = {key: values['purchases'] for key, values in stats.items()}
         return response.Response(data)
 
 class ExpensesSummaryAPIView(ReportBaseView):
     def get(self, request):
         shop = self.get_shop()
         if not shop: return response.Response({'error': 'No shop associated'}, status=400)
-        qs = Expense.objects.filter(shop=shop)
-        # Expense uses 'date' (DateField), so no __date transform needed
-        data = self.get_summary_stats(qs, date_field='date', sum_field='amount', date_transform=False)
+        stats = self.get_rollup_stats(shop, ['expenses'])
+        data = {key: values['expenses'] for key, values in stats.items()}
         return response.Response(data)
 
 class DisposalSummaryAPIView(ReportBaseView):
     def get(self, request):
         shop = self.get_shop()
         if not shop: return response.Response({'error': 'No shop associated'}, status=400)
-        # Disposal is StockMovement with type DISPOSAL or DAMAGED or EXPIRED
-        qs = StockMovement.objects.filter(
-            branch__shop=shop, 
-            movement_type__in=['DISPOSAL', 'DAMAGED', 'EXPIRED']
-        )
-        # We need value. StockMovement doesn't have value field.
-        # We need to annotate value = quantity_change (abs) * product__cost_price
-        # Note: quantity_change is negative for reductions.
-        from django.db.models import F
-        from django.db.models.functions import Abs
-        qs = qs.annotate(
-            val=Abs(F('quantity_change')) * F('product__cost_price')
-        )
-        # StockMovement has created_at (DateTime)
-        data = self.get_summary_stats(qs, date_field='created_at', sum_field='val')
+        # Disposal value (abs(quantity_change) * cost_price) is pre-computed in the rollup
+        stats = self.get_rollup_stats(shop, ['disposal'])
+        data = {key: values['disposal'] for key, values in stats.items()}
         return response.Response(data)
 
 class PricingSummaryAPIView(ReportBaseView):
@@ -317,16 +275,13 @@ class IncomeSummaryAPIView(ReportBaseView):
         if not shop: return response.Response({'error': 'No shop associated'}, status=400)
         
         # Income = Sales - Purchases - Expenses
-        sales_data = self.get_summary_stats(Sale.objects.filter(shop=shop), 'created_at', 'total_amount')
-        purchases_data = self.get_summary_stats(PurchaseOrder.objects.filter(shop=shop), 'created_at', 'total_cost')
-        # Expenses need date_transform=False
-        expenses_data = self.get_summary_stats(Expense.objects.filter(shop=shop), 'date', 'amount', date_transform=False)
+        stats = self.get_rollup_stats(shop, ['sales', 'purchases', 'expenses'])
         
         income_data = {}
         for key in ['today', 'week', 'month', 'year']:
-            s = sales_data[key]['total']
-            p = purchases_data[key]['total']
-            e = expenses_data[key]['total']
+            s = stats[key]['sales']['total']
+            p = stats[key]['purchases']['total']
+            e = stats[key]['expenses']['total']
             income_data[key] = {
                 'total': s - p - e, # Net Profit
                 'sales': s,
@@ -340,14 +295,12 @@ class CashflowSummaryAPIView(ReportBaseView):
         shop = self.get_shop()
         if not shop: return response.Response({'error': 'No shop associated'}, status=400)
         
-        sales_data = self.get_summary_stats(Sale.objects.filter(shop=shop), 'created_at', 'total_amount')
-        purchases_data = self.get_summary_stats(PurchaseOrder.objects.filter(shop=shop), 'created_at', 'total_cost')
-        expenses_data = self.get_summary_stats(Expense.objects.filter(shop=shop), 'date', 'amount', date_transform=False)
+        stats = self.get_rollup_stats(shop, ['sales', 'purchases', 'expenses'])
         
         cashflow_data = {}
         for key in ['today', 'week', 'month', 'year']:
-            inflow = sales_data[key]['total']
-            outflow = purchases_data[key]['total'] + expenses_data[key]['total']
+            inflow = stats[key]['sales']['total']
+            outflow = stats[key]['purchases']['total'] + stats[key]['expenses']['total']
             cashflow_data[key] = {
                 'net_cashflow': inflow - outflow,
                 'inflow': inflow,
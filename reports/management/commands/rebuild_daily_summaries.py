@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from reports.rollup import rebuild
+
+class Command(BaseCommand):
+    help = 'Rebuilds the DailyShopSummary rollup from sales, purchases, expenses, disposals and returns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, action='append', dest='shops', help='Only rebuild this shop id (repeatable)')
+
+    def handle(self, *args, **options):
+        shop_ids = options.get('shops')
+        scope = f"shops {', '.join(map(str, shop_ids))}" if shop_ids else "all shops"
+        self.stdout.write(f"Rebuilding daily summaries for {scope}...")
+
+        count = rebuild(shop_ids=shop_ids)
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully wrote {count} daily summary rows.'))
@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-17 19:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('shops', '0003_shop_public_visibility_shop_slug'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyShopSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('sales_total', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('sales_count', models.IntegerField(default=0)),
+                ('purchases_total', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('purchases_count', models.IntegerField(default=0)),
+                ('expenses_total', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('expenses_count', models.IntegerField(default=0)),
+                ('disposal_value', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('disposal_count', models.IntegerField(default=0)),
+                ('returns_total', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('returns_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='shops.branch')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='shops.shop')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['shop', 'date'], name='reports_summary_shop_date_idx')],
+                'unique_together': {('shop', 'branch', 'date')},
+            },
+        ),
+    ]
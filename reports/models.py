@@ -0,0 +1,34 @@
+from django.db import models
+from shops.models import Shop, Branch
+
+class DailyShopSummary(models.Model):
+    """
+    Pre-aggregated per-branch daily totals used by the report summaries.
+    Maintained by reports.signals and rebuilt with `manage.py rebuild_daily_summaries`.
+    """
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='daily_summaries')
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='daily_summaries')
+    date = models.DateField()
+
+    sales_total = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    sales_count = models.IntegerField(default=0)
+    purchases_total = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    purchases_count = models.IntegerField(default=0)
+    expenses_total = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    expenses_count = models.IntegerField(default=0)
+    disposal_value = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    disposal_count = models.IntegerField(default=0)
+    returns_total = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    returns_count = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('shop', 'branch', 'date')
+        indexes = [
+            models.Index(fields=['shop', 'date'], name='reports_summary_shop_date_idx'),
+        ]
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.branch.name} - {self.date}: {self.sales_total}"
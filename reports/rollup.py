@@ -0,0 +1,139 @@
+import datetime
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, Sum, Count, DecimalField
+from django.db.models.functions import Abs, Coalesce, TruncDate
+from django.utils import timezone
+from .models import DailyShopSummary
+from .aggregation import aggregate_windows, day_start
+
+DISPOSAL_TYPES = ['DISPOSAL', 'DAMAGED', 'EXPIRED']
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+# metric -> (total field, count field) on DailyShopSummary
+METRIC_FIELDS = {
+    'sales': ('sales_total', 'sales_count'),
+    'purchases': ('purchases_total', 'purchases_count'),
+    'expenses': ('expenses_total', 'expenses_count'),
+    'disposal': ('disposal_value', 'disposal_count'),
+    'returns': ('returns_total', 'returns_count'),
+}
+
+
+def get_sources():
+    """
+    metric -> (base queryset, shop lookup, branch lookup, date field, is_datetime, value expression)
+    """
+    from sales.models import Sale, SaleReturn
+    from purchase.models import PurchaseOrder
+    from finance.models import Expense
+    from inventory.models import StockMovement
+
+    return {
+        'sales': (Sale.objects.all(), 'shop', 'branch', 'created_at', True, F('total_amount')),
+        'purchases': (PurchaseOrder.objects.exclude(status=PurchaseOrder.Status.DRAFT), 'shop', 'branch', 'created_at', True, F('total_cost')),
+        'expenses': (Expense.objects.all(), 'shop', 'branch', 'date', False, F('amount')),
+        'disposal': (
+            StockMovement.objects.filter(movement_type__in=DISPOSAL_TYPES), 'branch__shop', 'branch', 'created_at', True,
+            # Valued at the cost recorded with the movement; the current cost only for rows without one
+            Abs(F('quantity_change')) * Coalesce(F('unit_cost'), F('product__cost_price'))
+        ),
+        'returns': (SaleReturn.objects.all(), 'sale__shop', 'sale__branch', 'created_at', True, F('total_refund')),
+    }
+
+
+def day_range(day):
+    """Half-open [start, end) datetime range of a calendar day in the current timezone."""
+    return day_start(day), day_start(day + datetime.timedelta(days=1))
+
+
+def local_day(value):
+    if isinstance(value, datetime.datetime):
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value
+
+
+def refresh_metric(metric, shop_id, branch_id, day, create=True):
+    """
+    Recomputes one metric of a (shop, branch, day) bucket from the source table.
+    The recount is bounded to a single day of a single branch, so it stays cheap
+    and, unlike a blind increment, is also correct for updates and deletes.
+    """
+    if not (shop_id and branch_id and day):
+        return
+    queryset, shop_lookup, branch_lookup, date_field, is_datetime, value = get_sources()[metric]
+
+    queryset = queryset.filter(**{f'{shop_lookup}_id': shop_id, f'{branch_lookup}_id': branch_id})
+    if is_datetime:
+        start, end = day_range(day)
+        queryset = queryset.filter(**{f'{date_field}__gte': start, f'{date_field}__lt': end})
+    else:
+        queryset = queryset.filter(**{date_field: day})
+
+    agg = queryset.aggregate(total=Sum(value, output_field=MONEY), count=Count('pk'))
+    total_field, count_field = METRIC_FIELDS[metric]
+    values = {total_field: agg['total'] or Decimal('0.00'), count_field: agg['count']}
+
+    if create:
+        DailyShopSummary.objects.update_or_create(shop_id=shop_id, branch_id=branch_id, date=day, defaults=values)
+    else:
+        # Deletes never need a new row (and may run while the shop itself is being deleted)
+        DailyShopSummary.objects.filter(shop_id=shop_id, branch_id=branch_id, date=day).update(
+            updated_at=timezone.now(), **values
+        )
+
+
+def rebuild(shop_ids=None, batch_size=1000):
+    """
+    Rebuilds the rollup from scratch (optionally for some shops only) with one
+    grouped query per source table. Returns the number of summary rows written.
+    """
+    buckets = {}
+    for metric, (queryset, shop_lookup, branch_lookup, date_field, is_datetime, value) in get_sources().items():
+        if shop_ids:
+            queryset = queryset.filter(**{f'{shop_lookup}_id__in': shop_ids})
+        day_expr = TruncDate(date_field) if is_datetime else F(date_field)
+        rows = queryset.values(
+            shop_ref=F(f'{shop_lookup}_id'), branch_ref=F(f'{branch_lookup}_id'), day=day_expr
+        ).annotate(total=Sum(value, output_field=MONEY), count=Count('pk')).order_by()
+
+        total_field, count_field = METRIC_FIELDS[metric]
+        for row in rows:
+            key = (row['shop_ref'], row['branch_ref'], row['day'])
+            summary = buckets.get(key)
+            if summary is None:
+                summary = buckets[key] = DailyShopSummary(shop_id=key[0], branch_id=key[1], date=key[2])
+            setattr(summary, total_field, row['total'] or Decimal('0.00'))
+            setattr(summary, count_field, row['count'])
+
+    with transaction.atomic():
+        existing = DailyShopSummary.objects.all()
+        if shop_ids:
+            existing = existing.filter(shop_id__in=shop_ids)
+        existing.delete()
+        DailyShopSummary.objects.bulk_create(buckets.values(), batch_size=batch_size)
+    return len(buckets)
+
+
+def summary_totals(shop, windows, metrics):
+    """
+    Totals and counts of the given metrics for any set of date windows,
+    read from the rollup in one query.
+    Returns {window: {metric: {'total': ..., 'count': ...}}}
+    """
+    sums = {}
+    for metric in metrics:
+        total_field, count_field = METRIC_FIELDS[metric]
+        sums[total_field] = total_field
+        sums[count_field] = count_field
+
+    stats = aggregate_windows(
+        DailyShopSummary.objects.filter(shop=shop), windows, date_field='date', sums=sums, count_field=None
+    )
+    return {
+        name: {
+            metric: {'total': values[METRIC_FIELDS[metric][0]], 'count': values[METRIC_FIELDS[metric][1]]}
+            for metric in metrics
+        }
+        for name, values in stats.items()
+    }
@@ -0,0 +1,78 @@
+"""
+Keeps DailyShopSummary in step with the source tables.
+Each write only recounts the (shop, branch, day) bucket it touched.
+"""
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.core.exceptions import ObjectDoesNotExist
+from sales.models import Sale, SaleReturn
+from purchase.models import PurchaseOrder
+from finance.models import Expense
+from inventory.models import StockMovement
+from .rollup import refresh_metric, local_day, DISPOSAL_TYPES
+
+def get_bucket(instance):
+    """Returns (metric, shop_id, branch_id, day) for a source row, or None if it isn't rolled up."""
+    if isinstance(instance, Sale):
+        return 'sales', instance.shop_id, instance.branch_id, local_day(instance.created_at)
+    if isinstance(instance, PurchaseOrder):
+        return 'purchases', instance.shop_id, instance.branch_id, local_day(instance.created_at)
+    if isinstance(instance, Expense):
+        return 'expenses', instance.shop_id, instance.branch_id, instance.date
+    if isinstance(instance, SaleReturn):
+        sale = instance.sale
+        return 'returns', sale.shop_id, sale.branch_id, local_day(instance.created_at)
+    if isinstance(instance, StockMovement):
+        if instance.movement_type not in DISPOSAL_TYPES:
+            return None
+        return 'disposal', instance.branch.shop_id, instance.branch_id, local_day(instance.created_at)
+    return None
+
+# (shop, branch, date) fields of the rows whose branch or date can be edited
+BUCKET_FIELDS = {
+    Sale: ('shop_id', 'branch_id', 'created_at'),
+    PurchaseOrder: ('shop_id', 'branch_id', 'created_at'),
+    Expense: ('shop_id', 'branch_id', 'date'),
+}
+
+@receiver(pre_save, sender=Sale)
+@receiver(pre_save, sender=PurchaseOrder)
+@receiver(pre_save, sender=Expense)
+def remember_bucket(sender, instance, raw=False, **kwargs):
+    # A row moved to another branch or day leaves its old bucket, which has to be recounted too
+    if raw or not instance.pk:
+        return
+    row = sender.objects.filter(pk=instance.pk).values_list(*BUCKET_FIELDS[sender]).first()
+    if row:
+        instance._previous_bucket = (row[0], row[1], local_day(row[2]))
+
+@receiver(post_save, sender=Sale)
+@receiver(post_save, sender=PurchaseOrder)
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=SaleReturn)
+@receiver(post_save, sender=StockMovement)
+def update_daily_summary(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bucket = get_bucket(instance)
+    if not bucket:
+        return
+    refresh_metric(*bucket)
+
+    previous = getattr(instance, '_previous_bucket', None)
+    if previous and previous != bucket[1:]:
+        refresh_metric(bucket[0], *previous, create=False)
+
+@receiver(post_delete, sender=Sale)
+@receiver(post_delete, sender=PurchaseOrder)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=SaleReturn)
+@receiver(post_delete, sender=StockMovement)
+def remove_from_daily_summary(sender, instance, **kwargs):
+    try:
+        bucket = get_bucket(instance)
+    except ObjectDoesNotExist:
+        # Parent rows (sale/branch) may already be gone during cascades
+        return
+    if bucket:
+        refresh_metric(*bucket, create=False)
@@ -0,0 +1,297 @@
+import datetime
+from unittest import mock, skipUnless
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from shops.models import Shop, Branch
+from shops.tests import TenantAPITestCase
+from sales.models import Sale, SaleItem
+from purchase.models import PurchaseOrder
+from finance.models import Expense
+from inventory.forecasting import SalesForecaster
+from inventory.models import DemandForecast, Product, Stock, StockMovement
+from dashboard import crm
+from dashboard.models import Notification
+from .api_views import ForecastReportAPIView
+from .aggregation import aggregate_windows, day_start, filter_window, summary_windows, window_q
+from .models import DailyShopSummary
+from .rollup import DISPOSAL_TYPES, rebuild, summary_totals
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), "Query plans are only checked on SQLite and PostgreSQL")
+class HotQueryIndexTests(TestCase):
+    """
+    Query-plan regression tests: the tenant-scoped report, dashboard and inventory
+    queries must be answered from the composite/partial indexes, not table scans.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='owner', password='pass1234!x', role='OWNER')
+        cls.shop = Shop.objects.create(owner=cls.user, name='Shop', slug='index-shop')
+        cls.branch = Branch.objects.create(shop=cls.shop, name='Main', is_main=True)
+        cls.start_date = timezone.localdate() - datetime.timedelta(days=30)
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Test tables are tiny, so force the planner to show which index it would pick
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def tearDown(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('RESET enable_seqscan')
+
+    def assertUsesIndex(self, queryset, *index_names):
+        plan = queryset.explain()
+        self.assertTrue(any(name in plan for name in index_names), f"Expected one of {index_names} in plan:\n{plan}")
+
+    def test_sales_window(self):
+        qs = filter_window(Sale.objects.filter(shop=self.shop), 'created_at', self.start_date)
+        self.assertUsesIndex(qs, 'sales_sale_shop_created_idx')
+
+    def test_sales_list(self):
+        self.assertUsesIndex(Sale.objects.filter(shop=self.shop).order_by('-created_at'), 'sales_sale_shop_created_idx')
+
+    def test_purchases_window(self):
+        qs = filter_window(PurchaseOrder.objects.filter(shop=self.shop), 'created_at', self.start_date)
+        self.assertUsesIndex(qs.order_by('-created_at'), 'purchase_po_shop_created_idx')
+
+    def test_expenses_range(self):
+        qs = Expense.objects.filter(shop=self.shop, date__gte=self.start_date).order_by('-date')
+        self.assertUsesIndex(qs, 'finance_expense_shop_date_idx')
+
+    def test_movements_by_type(self):
+        qs = StockMovement.objects.filter(
+            branch=self.branch, movement_type=StockMovement.Type.PURCHASE
+        ).order_by('-created_at')
+        self.assertUsesIndex(qs, 'inv_movement_branch_type_idx')
+
+    def test_disposals(self):
+        qs = filter_window(
+            StockMovement.objects.filter(branch=self.branch, movement_type__in=DISPOSAL_TYPES), 'created_at', self.start_date
+        )
+        self.assertUsesIndex(qs, 'inv_movement_disposal_idx', 'inv_movement_branch_type_idx')
+
+    def test_notifications(self):
+        self.assertUsesIndex(Notification.objects.filter(recipient=self.user), 'dash_notif_recipient_idx')
+
+    def test_unread_notifications(self):
+        qs = Notification.objects.filter(recipient=self.user, is_read=False)
+        self.assertUsesIndex(qs, 'dash_notif_unread_idx')
+
+    def test_product_sku_lookup(self):
+        self.assertUsesIndex(Product.objects.filter(shop=self.shop, sku='SKU-1'), 'inv_product_shop_sku_idx')
+
+    def test_product_barcode_lookup(self):
+        self.assertUsesIndex(Product.objects.filter(shop=self.shop, barcode='123'), 'inv_product_shop_barcode_uniq')
+
+    def test_shop_directory_search(self):
+        qs = Shop.objects.filter(crm.search_filter('sho'))
+        for index in ('shops_shop_name_upper_idx', 'users_user_username_upper_idx', 'users_user_email_upper_idx', 'users_user_phone_idx'):
+            self.assertUsesIndex(qs, index)
+
+
+@override_settings(TIME_ZONE='Africa/Nairobi') # UTC+3, so local midnight is 21:00 UTC the day before
+class AggregationWindowTests(TestCase):
+    """Windows are half-open ranges between local midnights, and end dates are inclusive."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='owner', password='pass1234!x', role='OWNER')
+        cls.shop = Shop.objects.create(owner=cls.user, name='Shop', slug='window-shop')
+        cls.branch = Branch.objects.create(shop=cls.shop, name='Main', is_main=True)
+        cls.today = datetime.date(2026, 3, 2)
+
+    def add_sale(self, days_ago, time, amount):
+        sale = Sale.objects.create(shop=self.shop, branch=self.branch, cashier=self.user, total_amount=amount)
+        day = self.today - datetime.timedelta(days=days_ago)
+        created_at = timezone.make_aware(datetime.datetime.combine(day, time))
+        Sale.objects.filter(pk=sale.pk).update(created_at=created_at)
+
+    def setUp(self):
+        # On each side of every window's first midnight, plus the last minute of today
+        midnight, last_minute = datetime.time(0, 0), datetime.time(23, 59)
+        self.add_sale(0, last_minute, 256)
+        self.add_sale(0, midnight, 1)
+        self.add_sale(1, last_minute, 2)
+        self.add_sale(7, midnight, 4)
+        self.add_sale(8, last_minute, 8)
+        self.add_sale(30, midnight, 16)
+        self.add_sale(31, last_minute, 32)
+        self.add_sale(365, midnight, 64)
+        self.add_sale(366, last_minute, 128)
+        self.sales = Sale.objects.filter(shop=self.shop)
+
+    def test_day_start(self):
+        self.assertEqual(day_start(self.today), datetime.datetime(2026, 3, 1, 21, tzinfo=datetime.timezone.utc))
+
+    def test_summary_windows(self):
+        data = aggregate_windows(self.sales, summary_windows(self.today), sums={'total': 'total_amount'})
+        self.assertEqual({name: (values['total'], values['count']) for name, values in data.items()}, {
+            'today': (257, 2),
+            'week': (263, 4),
+            'month': (287, 6),
+            'year': (383, 8),
+        })
+
+    def test_end_date_is_inclusive(self):
+        yesterday = self.today - datetime.timedelta(days=1)
+        totals = lambda qs: sorted(qs.values_list('total_amount', flat=True))
+        self.assertEqual(totals(filter_window(self.sales, 'created_at', yesterday, yesterday)), [2])
+        self.assertEqual(totals(filter_window(self.sales, 'created_at', self.today, self.today)), [1, 256])
+        self.assertEqual(totals(filter_window(self.sales, 'created_at', end_date=self.today - datetime.timedelta(days=30))), [16, 32, 64, 128])
+        self.assertEqual(totals(self.sales.filter(window_q('created_at', yesterday, self.today))), [1, 2, 256])
+
+        Expense.objects.create(shop=self.shop, branch=self.branch, category='Rent', description='March', amount=500, date=self.today)
+        expenses = Expense.objects.filter(shop=self.shop)
+        self.assertEqual(filter_window(expenses, 'date', self.today, self.today).count(), 1)
+        self.assertEqual(filter_window(expenses, 'date', end_date=yesterday).count(), 0)
+
+
+class RollupConsistencyTests(TestCase):
+    """DailyShopSummary must match a live aggregate of the source rows after every kind of write."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='owner', password='pass1234!x', role='OWNER')
+        cls.shop = Shop.objects.create(owner=cls.user, name='Shop', slug='rollup-shop')
+        cls.branches = [Branch.objects.create(shop=cls.shop, name='Main', is_main=True), Branch.objects.create(shop=cls.shop, name='Town')]
+        cls.today = timezone.localdate()
+        cls.yesterday = cls.today - datetime.timedelta(days=1)
+
+    def sources(self):
+        return {
+            'sales': (Sale.objects.filter(shop=self.shop), 'total_amount'),
+            'purchases': (PurchaseOrder.objects.filter(shop=self.shop).exclude(status=PurchaseOrder.Status.DRAFT), 'total_cost'),
+        }
+
+    def assertRollupMatches(self):
+        windows = {'today': (self.today, self.today), 'yesterday': (self.yesterday, self.yesterday)}
+        rolled = summary_totals(self.shop, windows, list(self.sources()))
+        for metric, (queryset, field) in self.sources().items():
+            live = aggregate_windows(queryset, windows, sums={'total': field})
+            for window in windows:
+                self.assertEqual(
+                    (rolled[window][metric]['total'], rolled[window][metric]['count']),
+                    (live[window]['total'], live[window]['count']), f"{metric}, {window}"
+                )
+
+            # Per branch and day as well: a moved row must leave its old bucket
+            total_field, count_field = f'{metric}_total', f'{metric}_count'
+            buckets = {
+                (row['branch_id'], row['date']): (row[total_field], row[count_field])
+                for row in DailyShopSummary.objects.filter(shop=self.shop, **{f'{count_field}__gt': 0})
+                .values('branch_id', 'date', total_field, count_field)
+            }
+            expected = {
+                (row['branch_id'], row['day']): (row['total'], row['count'])
+                for row in queryset.values('branch_id', day=TruncDate('created_at'))
+                .annotate(total=Sum(field), count=Count('pk')).order_by()
+            }
+            self.assertEqual(buckets, expected, metric)
+
+    def test_create_edit_move_delete(self):
+        sale = Sale.objects.create(shop=self.shop, branch=self.branches[0], total_amount=100)
+        order = PurchaseOrder.objects.create(shop=self.shop, branch=self.branches[0], total_cost=50)
+        self.assertRollupMatches()
+
+        sale.total_amount = 150
+        sale.save()
+        order.total_cost = 80
+        order.save()
+        self.assertRollupMatches()
+
+        for row in (sale, order):
+            row.branch = self.branches[1]
+            row.save()
+        self.assertRollupMatches()
+
+        for row in (sale, order):
+            row.created_at -= datetime.timedelta(days=1)
+            row.save()
+        self.assertRollupMatches()
+
+        sale.delete()
+        order.delete()
+        self.assertRollupMatches()
+        self.assertFalse(DailyShopSummary.objects.filter(shop=self.shop, sales_count__gt=0).exists())
+
+    def test_disposals_keep_their_recorded_cost(self):
+        product = Product.objects.create(shop=self.shop, name='Milk', selling_price=1500, cost_price=1000)
+        stock = product.stocks.get(branch=self.branches[0])
+        disposal = lambda quantity, movement_type: StockMovement.objects.create(
+            stock=stock, product=product, branch=self.branches[0], quantity_change=-quantity, movement_type=movement_type
+        )
+        disposal_value = lambda: summary_totals(self.shop, {'today': (self.today, self.today)}, ['disposal'])['today']['disposal']['total']
+
+        self.assertEqual(disposal(2, StockMovement.Type.DAMAGED).unit_cost, 1000)
+        self.assertEqual(disposal_value(), 2000)
+
+        # A cost edit only values the disposals recorded after it, in the rebuild as well
+        product.cost_price = 5000
+        product.save()
+        disposal(1, StockMovement.Type.EXPIRED)
+        self.assertEqual(disposal_value(), 7000)
+        rebuild([self.shop.pk])
+        self.assertEqual(disposal_value(), 7000)
+
+
+class ForecastReportTests(TenantAPITestCase):
+    url = '/api/reports/forecasting/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.soda = Product.objects.create(shop=cls.shop, name='Soda', selling_price=1500)
+        cls.bread = Product.objects.create(shop=cls.shop, name='Bread', selling_price=900)
+        Product.objects.create(shop=cls.shop, name='Idle', selling_price=100)
+        # Soda sells 3 a day in the main branch, bread 1 a day but is out of stock
+        today = timezone.localdate()
+        for days_ago in range(1, 29):
+            sale = Sale.objects.create(shop=cls.shop, branch=cls.branches[0], cashier=cls.owner, total_amount=5400)
+            SaleItem.objects.create(sale=sale, product=cls.soda, quantity=3, price=1500)
+            SaleItem.objects.create(sale=sale, product=cls.bread, quantity=1, price=900)
+            created_at = timezone.make_aware(datetime.datetime.combine(today - datetime.timedelta(days=days_ago), datetime.time(12)))
+            Sale.objects.filter(pk=sale.pk).update(created_at=created_at)
+        Stock.objects.filter(branch=cls.branches[0]).update(quantity=30)
+        Stock.objects.filter(branch=cls.branches[0], product=cls.bread).update(quantity=0)
+
+    def test_refresh_stores_what_precomputed_returns(self):
+        forecaster = SalesForecaster()
+        self.assertEqual(forecaster.refresh(self.shop), 2)
+        stored = DemandForecast.objects.get(product=self.soda, branch=self.branches[0])
+        self.assertEqual(stored.window_days, 56)
+        self.assertEqual(len(stored.weekday_factors), 7)
+
+        now = timezone.now()
+        with mock.patch('inventory.forecasting.timezone.now', return_value=now):
+            results = forecaster.precomputed(self.shop)
+        self.assertEqual([(row['product'], row['branch']) for row in results], [(self.soda, self.branches[0])]) # Bread is out
+        soda = results[0]
+        self.assertEqual((soda['daily_usage'], soda['current_stock']), (stored.daily_usage, 30))
+        self.assertEqual(
+            (soda['runout_date'], soda['days_left'], soda['status']),
+            forecaster.runout(30, stored.daily_usage, now, stored.weekday_factors)
+        )
+
+    def test_api_serves_precomputed_forecasts(self):
+        SalesForecaster().refresh(self.shop)
+        stored = DemandForecast.objects.get(product=self.soda, branch=self.branches[0])
+        with mock.patch.object(SalesForecaster, 'forecast') as forecast:
+            response = self.assertWithinBudget(ForecastReportAPIView, 'get', self.url, **self.auth())
+        forecast.assert_not_called()
+        self.assertEqual(response.query_count, 3) # User, shop and the forecasts
+        self.assertEqual(len(response.json()), 1)
+        row = response.json()[0]
+        self.assertEqual((row['product_id'], row['branch_id'], row['current_stock']), (self.soda.pk, self.branches[0].pk, 30))
+        self.assertEqual(row['daily_usage'], round(stored.daily_usage, 2))
+
+    def test_api_falls_back_to_a_live_forecast(self):
+        response = self.assertWithinBudget(ForecastReportAPIView, 'get', self.url, **self.auth())
+        # Over the last 30 days: 28 days of 3 sodas
+        self.assertEqual([(row['product_id'], row['daily_usage']) for row in response.json()], [(self.soda.pk, 2.8)])
@@ -3,7 +3,7 @@ from .api_views import (
     SalesReportAPIView, PurchasesReportAPIView, PricingReportAPIView, DisposalReportAPIView,
     ExpensesReportAPIView, IncomeStatementAPIView, CashflowAPIView, SalesSummaryAPIView,
     PurchasesSummaryAPIView, ExpensesSummaryAPIView, DisposalSummaryAPIView, PricingSummaryAPIView,
-    IncomeSummaryAPIView, CashflowSummaryAPIView
+    IncomeSummaryAPIView, CashflowSummaryAPIView, ForecastReportAPIView
 )
 
 urlpatterns = [
@@ -21,4 +21,5 @@ urlpatterns = [
     path('income-statement/summary/', IncomeSummaryAPIView.as_view(), name='api_report_income_summary'),
     path('cashflow/', CashflowAPIView.as_view(), name='api_report_cashflow'),
     path('cashflow/summary/', CashflowSummaryAPIView.as_view(), name='api_report_cashflow_summary'),
+    path('forecasting/', ForecastReportAPIView.as_view(), name='api_report_forecasting'),
 ]
@@ -9,65 +9,40 @@ from inventory.models import Product, Stock
 import datetime
 from django.utils.dateparse import parse_date
 from inventory.forecasting import SalesForecaster
+from .aggregation import filter_window
+from .rollup import summary_totals
+from shops.mixins import BaseShopView
 
-class ForecastingView(LoginRequiredMixin, TemplateView):
+class ForecastingView(BaseShopView, TemplateView):
     template_name = "reports/forecasting.html"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        if getattr(self.request.user, 'shop', None):
-            shop = self.request.user.shop
-        elif hasattr(self.request.user, 'shops') and self.request.user.shops.exists():
-            shop = self.request.user.shops.first()
-        else:
-            shop = None
-
+        shop = self.get_shop()
         if not shop:
             return context
 
+        # Nightly precomputed forecasts (one query); live forecast until the first refresh
         forecaster = SalesForecaster()
-        predictions = []
-        
-        # Get all stocks for this shop with positive quantity
-        stocks = Stock.objects.filter(branch__shop=shop, quantity__gt=0).select_related('product', 'branch')
-        
-        for stock in stocks:
-            runout_date, days_left, status = forecaster.predict_runout_date(stock)
-            daily_usage = forecaster.predict_daily_usage(stock.product, shop)
-            
-            if daily_usage > 0: # Only show items with usage
-                predictions.append({
-                    'product': stock.product.name,
-                    'branch': stock.branch.name,
-                    'current_stock': stock.quantity,
-                    'daily_usage': round(daily_usage, 2),
-                    'days_left': days_left,
-                    'runout_date': runout_date,
-                    'status': status
-                })
-        
-        # Sort by urgency (days left)
-        predictions.sort(key=lambda x: x['days_left'])
+        forecasts = forecaster.precomputed(shop) or forecaster.forecast(shop)
+
+        # Already sorted by urgency (days left); only show items with usage
+        predictions = [
+            {
+                'product': f['product'].name,
+                'branch': f['branch'].name,
+                'current_stock': f['current_stock'],
+                'daily_usage': round(f['daily_usage'], 2),
+                'days_left': f['days_left'],
+                'runout_date': f['runout_date'],
+                'status': f['status']
+            }
+            for f in forecasts if f['daily_usage'] > 0
+        ]
         
         context['predictions'] = predictions
         return context
 
-class BaseShopView(LoginRequiredMixin):
-    def get_shop(self):
-        # 1. Direct check for Employee's assigned shop
-        if getattr(self.request.user, 'shop', None):
-            return self.request.user.shop
-            
-        # 2. Check for Owner's shops
-        if hasattr(self.request.user, 'shops') and self.request.user.shops.exists():
-            return self.request.user.shops.first()
-            
-        # 3. Legacy fallback
-        if hasattr(self.request.user, 'employee_profile'):
-             return self.request.user.employee_profile.shop
-             
-        return None
-
 class ReportDateFilterMixin:
     def get_date_range(self):
         start_date_str = self.request.GET.get('start_date')
@@ -101,11 +76,7 @@ class SalesReportView(ReportDateFilterMixin, BaseShopView, ListView):
         if shop:
             qs = Sale.objects.filter(shop=shop).select_related('customer').order_by('-created_at')
             start_date, end_date = self.get_date_range()
-            if start_date:
-                qs = qs.filter(created_at__date__gte=start_date)
-            if end_date:
-                qs = qs.filter(created_at__date__lte=end_date)
-            return qs
+            return filter_window(qs, 'created_at', start_date, end_date)
         return Sale.objects.none()
 
     def get_context_data(self, **kwargs):
@@ -113,8 +84,9 @@ class SalesReportView(ReportDateFilterMixin, BaseShopView, ListView):
         shop = self.get_shop()
         if shop:
             qs = self.get_queryset()
-            context['total_sales'] = qs.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-            context['total_count'] = qs.count()
+            totals = qs.aggregate(total=Sum('total_amount'), count=Count('pk'))
+            context['total_sales'] = totals['total'] or 0
+            context['total_count'] = totals['count']
         return context
 
 class PurchasesReportView(ReportDateFilterMixin, BaseShopView, ListView):
@@ -125,13 +97,9 @@ class PurchasesReportView(ReportDateFilterMixin, BaseShopView, ListView):
     def get_queryset(self):
         shop = self.get_shop()
         if shop:
-            qs = PurchaseOrder.objects.filter(shop=shop).select_related('supplier').order_by('-created_at')
+            qs = PurchaseOrder.objects.filter(shop=shop).exclude(status=PurchaseOrder.Status.DRAFT).select_related('supplier').order_by('-created_at')
             start_date, end_date = self.get_date_range()
-            if start_date:
-                qs = qs.filter(created_at__date__gte=start_date)
-            if end_date:
-                qs = qs.filter(created_at__date__lte=end_date)
-            return qs
+            return filter_window(qs, 'created_at', start_date, end_date)
         return PurchaseOrder.objects.none()
 
     def get_context_data(self, **kwargs):
@@ -175,24 +143,12 @@ class IncomeStatementView(ReportDateFilterMixin, BaseShopView, TemplateView):
         shop = self.get_shop()
         if shop:
             start_date, end_date = self.get_date_range()
-            
-            sales_qs = Sale.objects.filter(shop=shop)
-            purchases_qs = PurchaseOrder.objects.filter(shop=shop)
-            expenses_qs = Expense.objects.filter(shop=shop)
-
-            if start_date:
-                sales_qs = sales_qs.filter(created_at__date__gte=start_date)
-                purchases_qs = purchases_qs.filter(created_at__date__gte=start_date)
-                expenses_qs = expenses_qs.filter(date__gte=start_date)
-            
-            if end_date:
-                sales_qs = sales_qs.filter(created_at__date__lte=end_date)
-                purchases_qs = purchases_qs.filter(created_at__date__lte=end_date)
-                expenses_qs = expenses_qs.filter(date__lte=end_date)
 
-            total_sales = sales_qs.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-            total_purchases = purchases_qs.aggregate(Sum('total_cost'))['total_cost__sum'] or 0
-            total_expenses = expenses_qs.aggregate(Sum('amount'))['amount__sum'] or 0
+            # One query against the daily rollup for all three totals
+            stats = summary_totals(shop, {'range': (start_date, end_date)}, ['sales', 'purchases', 'expenses'])['range']
+            total_sales = stats['sales']['total']
+            total_purchases = stats['purchases']['total']
+            total_expenses = stats['expenses']['total']
             
             context['total_income'] = total_sales
             context['total_cogs'] = total_purchases
@@ -242,24 +198,12 @@ class CashflowView(ReportDateFilterMixin, BaseShopView, TemplateView):
         shop = self.get_shop()
         if shop:
             start_date, end_date = self.get_date_range()
-            
-            sales_qs = Sale.objects.filter(shop=shop)
-            purchases_qs = PurchaseOrder.objects.filter(shop=shop)
-            expenses_qs = Expense.objects.filter(shop=shop)
-            
-            if start_date:
-                sales_qs = sales_qs.filter(created_at__date__gte=start_date)
-                purchases_qs = purchases_qs.filter(created_at__date__gte=start_date)
-                expenses_qs = expenses_qs.filter(date__gte=start_date)
-            
-            if end_date:
-                sales_qs = sales_qs.filter(created_at__date__lte=end_date)
-                purchases_qs = purchases_qs.filter(created_at__date__lte=end_date)
-                expenses_qs = expenses_qs.filter(date__lte=end_date)
 
-            total_sales = sales_qs.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-            total_purchases = purchases_qs.aggregate(Sum('total_cost'))['total_cost__sum'] or 0
-            total_expenses = expenses_qs.aggregate(Sum('amount'))['amount__sum'] or 0
+            # One query against the daily rollup for all three totals
+            stats = summary_totals(shop, {'range': (start_date, end_date)}, ['sales', 'purchases', 'expenses'])['range']
+            total_sales = stats['sales']['total']
+            total_purchases = stats['purchases']['total']
+            total_expenses = stats['expenses']['total']
             
             context['inflow'] = total_sales
             context['outflow'] = total_purchases + total_expenses
@@ -278,11 +222,7 @@ class StaffPerformanceView(ReportDateFilterMixin, BaseShopView, ListView):
         start_date, end_date = self.get_date_range()
         
         # Filter Sales
-        sales_qs = Sale.objects.filter(shop=shop).select_related('cashier')
-        if start_date:
-            sales_qs = sales_qs.filter(created_at__date__gte=start_date)
-        if end_date:
-            sales_qs = sales_qs.filter(created_at__date__lte=end_date)
+        sales_qs = filter_window(Sale.objects.filter(shop=shop), 'created_at', start_date, end_date)
             
         from django.db.models import Sum, Count
         
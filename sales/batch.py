@@ -0,0 +1,212 @@
+"""
+Batch upload of the sales the mobile app queued while offline.
+
+Every sale carries a client-generated idempotency key (Sale.client_key, unique
+per shop). Sales are posted CHUNK_SIZE at a time, one transaction per chunk:
+one query finds the keys of the chunk that are already posted (through the
+unique index), and the new sales, their items and the per-branch stock
+deductions go in with bulk inserts, so a chunk costs the same few queries
+however many sales it holds. A replay after a timeout is therefore reported
+as a duplicate instead of posting the sale (and deducting its stock) twice; if
+two uploads of the same keys race, the unique index rejects the loser's chunk,
+which is retried once and then sees the winner's sales as duplicates. A chunk
+that fails again is reported as errors, for the app to upload later.
+
+bulk_create skips the post_save receivers, so the daily rollup and the
+dashboard version are refreshed here, once per chunk.
+"""
+import logging
+from decimal import Decimal, InvalidOperation
+from django.db import IntegrityError, transaction
+from customers.models import Customer
+from dashboard.stats import bump_version
+from inventory.models import Product
+from reports.rollup import local_day, refresh_metric
+from .models import Sale, SaleItem
+from .services import deduct_stock
+
+MAX_SALES = 500
+CHUNK_SIZE = 100
+KEY_LENGTH = Sale._meta.get_field('client_key').max_length
+
+CREATED = 'created'
+DUPLICATE = 'duplicate'
+ERROR = 'error'
+RETRY_LATER = "Not posted, the upload conflicted with another one. Try again."
+
+logger = logging.getLogger(__name__)
+
+
+def to_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Lookups:
+    """The shop's branches, customers and products referenced by a batch, one query each."""
+
+    def __init__(self, shop, entries):
+        branch_ids, customer_ids, product_ids = set(), set(), set()
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            branch_ids.add(to_id(entry.get('branch')))
+            customer_ids.add(to_id(entry.get('customer')))
+            for item in entry.get('items') or []:
+                if isinstance(item, dict):
+                    product_ids.add(to_id(item.get('product')))
+
+        # [SECURITY] IDOR Protection: only rows of this shop
+        self.branches = shop.branches.in_bulk(branch_ids - {None})
+        self.customers = Customer.objects.filter(shop=shop).in_bulk(customer_ids - {None})
+        self.products = Product.objects.filter(shop=shop).in_bulk(product_ids - {None})
+
+
+def parse_entry(entry, lookups, default_branch):
+    """
+    (sale fields, items) of one uploaded sale, or raises ValueError with the reason.
+    `entry` is {'client_key', 'branch'?, 'customer'?, 'payment_method'?, 'items': [{'product', 'quantity', 'price'}]}.
+    """
+    if not isinstance(entry, dict):
+        raise ValueError("Each sale must be an object.")
+    client_key = entry.get('client_key')
+    if not isinstance(client_key, str) or not client_key.strip() or len(client_key) > KEY_LENGTH:
+        raise ValueError(f"client_key must be a non-empty string of at most {KEY_LENGTH} characters.")
+
+    if entry.get('branch') is not None:
+        branch = lookups.branches.get(to_id(entry['branch']))
+        if branch is None:
+            raise ValueError(f"Branch #{entry['branch']} not found.")
+    else:
+        branch = default_branch
+        if branch is None:
+            raise ValueError("No branch found for this shop.")
+
+    customer = None
+    if entry.get('customer') is not None:
+        customer = lookups.customers.get(to_id(entry['customer']))
+        if customer is None:
+            raise ValueError(f"Customer #{entry['customer']} not found.")
+
+    payment_method = str(entry.get('payment_method') or Sale.PaymentMethod.CASH).upper()
+    if payment_method not in Sale.PaymentMethod.values:
+        raise ValueError(f"payment_method must be one of {', '.join(Sale.PaymentMethod.values)}.")
+
+    raw_items = entry.get('items')
+    if not isinstance(raw_items, list) or not raw_items:
+        raise ValueError("A sale needs at least one item.")
+    items = []
+    for item in raw_items:
+        if not isinstance(item, dict):
+            raise ValueError("Each item must be an object.")
+        product = lookups.products.get(to_id(item.get('product')))
+        if product is None:
+            raise ValueError(f"Product #{item.get('product')} not found.")
+        quantity = to_id(item.get('quantity'))
+        if quantity is None or quantity <= 0:
+            raise ValueError(f"Quantity of product #{product.pk} must be a positive integer.")
+        try:
+            price = Decimal(str(item.get('price', product.selling_price)))
+        except InvalidOperation:
+            raise ValueError(f"Price of product #{product.pk} is not a number.")
+        if not price.is_finite() or price < 0:
+            raise ValueError(f"Price of product #{product.pk} must not be negative.")
+        items.append({'product': product, 'quantity': quantity, 'price': price})
+
+    fields = {
+        'client_key': client_key, 'branch': branch, 'customer': customer, 'payment_method': payment_method,
+        'total_amount': sum((item['price'] * item['quantity'] for item in items), Decimal('0.00')),
+    }
+    return fields, items
+
+
+def post_chunk(shop, cashier, chunk):
+    """
+    Posts a chunk of parsed (fields, items) sales in one transaction.
+    Returns client_key -> (status, sale id).
+    """
+    results = {}
+    with transaction.atomic():
+        keys = [fields['client_key'] for fields, _ in chunk]
+        for key, pk in Sale.objects.filter(shop=shop, client_key__in=keys).values_list('client_key', 'pk'):
+            results[key] = (DUPLICATE, pk)
+
+        new = [(fields, items) for fields, items in chunk if fields['client_key'] not in results]
+        if not new:
+            return results
+        sales = Sale.objects.bulk_create([Sale(shop=shop, cashier=cashier, **fields) for fields, _ in new])
+
+        SaleItem.objects.bulk_create([
+            SaleItem(sale=sale, product=item['product'], quantity=item['quantity'], price=item['price'])
+            for sale, (_, items) in zip(sales, new) for item in items
+        ])
+
+        # One deduction per branch for all of the chunk's sales
+        by_branch = {}
+        for sale, (_, items) in zip(sales, new):
+            branch, quantities, sale_ids = by_branch.setdefault(sale.branch_id, (sale.branch, {}, []))
+            sale_ids.append(sale.pk)
+            for item in items:
+                product_id = item['product'].pk
+                quantities[product_id] = quantities.get(product_id, 0) + item['quantity']
+        for branch, quantities, sale_ids in by_branch.values():
+            reason = f"Sale #{sale_ids[0]}" if len(sale_ids) == 1 else f"Sales #{sale_ids[0]}-#{sale_ids[-1]} (batch)"
+            deduct_stock(branch, quantities, user=cashier, reason=reason)
+
+        for branch_id, day in {(sale.branch_id, local_day(sale.created_at)) for sale in sales}:
+            refresh_metric('sales', shop.pk, branch_id, day)
+        # After commit only: nothing reads the dashboard inside this transaction,
+        # and a bump before commit would let other requests cache the old numbers
+        transaction.on_commit(lambda: bump_version(shop.pk))
+
+    for sale in sales:
+        results[sale.client_key] = (CREATED, sale.pk)
+    return results
+
+
+def post_sales(shop, cashier, entries, default_branch=None):
+    """
+    Posts a batch of uploaded sales and returns one result per entry, in order:
+    {'client_key', 'status': 'created' | 'duplicate' | 'error', 'id'} ('errors' instead of 'id' on error).
+    A key repeated within the batch is a duplicate of its first occurrence.
+    """
+    lookups = Lookups(shop, entries)
+    parsed = []
+    seen = set()
+    for entry in entries:
+        try:
+            fields, items = parse_entry(entry, lookups, default_branch)
+        except ValueError as e:
+            parsed.append((ERROR, entry.get('client_key') if isinstance(entry, dict) else None, str(e)))
+            continue
+        key = fields['client_key']
+        parsed.append((DUPLICATE if key in seen else CREATED, key, (fields, items)))
+        seen.add(key)
+
+    pending = [value for status, _, value in parsed if status == CREATED]
+    posted = {}
+    for start in range(0, len(pending), CHUNK_SIZE):
+        chunk = pending[start:start + CHUNK_SIZE]
+        try:
+            posted.update(post_chunk(shop, cashier, chunk))
+        except IntegrityError:
+            # A concurrent upload posted some of these keys first: they now show up as duplicates
+            try:
+                posted.update(post_chunk(shop, cashier, chunk))
+            except IntegrityError:
+                logger.exception("Sales batch chunk of shop %s failed twice", shop.pk)
+                posted.update((fields['client_key'], (ERROR, RETRY_LATER)) for fields, _ in chunk)
+
+    results = []
+    for status, key, value in parsed:
+        if status == ERROR:
+            results.append({'client_key': key, 'status': ERROR, 'errors': [value]})
+            continue
+        posted_status, pk_or_error = posted[key]
+        if posted_status == ERROR:
+            results.append({'client_key': key, 'status': ERROR, 'errors': [pk_or_error]})
+            continue
+        results.append({'client_key': key, 'status': posted_status if status == CREATED else DUPLICATE, 'id': pk_or_error})
+    return results
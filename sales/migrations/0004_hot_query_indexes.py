@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-17 20:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0001_initial'),
+        ('sales', '0003_alter_sale_options'),
+        ('shops', '0003_shop_public_visibility_shop_slug'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['shop', 'created_at'], name='sales_sale_shop_created_idx'),
+        ),
+    ]
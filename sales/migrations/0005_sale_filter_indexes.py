@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-17 22:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0001_initial'),
+        ('sales', '0004_hot_query_indexes'),
+        ('shops', '0004_shop_directory_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['shop', 'payment_method', 'created_at'], name='sales_sale_shop_method_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['branch', 'created_at'], name='sales_sale_branch_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['cashier', 'created_at'], name='sales_sale_cashier_created_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-17 23:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_sync_updated_at'),
+        ('sales', '0005_sale_filter_indexes'),
+        ('shops', '0004_shop_directory_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='client_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='sale',
+            constraint=models.UniqueConstraint(condition=models.Q(('client_key__isnull', False)), fields=('shop', 'client_key'), name='sales_sale_shop_client_key_uniq'),
+        ),
+    ]
@@ -17,10 +17,26 @@ class Sale(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True, related_name='sales_history')
     total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
     payment_method = models.CharField(max_length=10, choices=PaymentMethod.choices, default=PaymentMethod.CASH)
+    # Idempotency key of sales uploaded by the offline app (sales.batch); a replay hits the unique index
+    client_key = models.CharField(max_length=64, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Shop sales lists and date-window reports
+            models.Index(fields=['shop', 'created_at'], name='sales_sale_shop_created_idx'),
+            # SaleViewSet filters, each still ordered by date for the keyset pages
+            models.Index(fields=['shop', 'payment_method', 'created_at'], name='sales_sale_shop_method_idx'),
+            models.Index(fields=['branch', 'created_at'], name='sales_sale_branch_created_idx'),
+            models.Index(fields=['cashier', 'created_at'], name='sales_sale_cashier_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['shop', 'client_key'], condition=models.Q(client_key__isnull=False),
+                name='sales_sale_shop_client_key_uniq'
+            ),
+        ]
 
     def __str__(self):
         return f"Sale #{self.id} - {self.total_amount}"
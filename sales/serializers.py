@@ -1,13 +1,56 @@
 from rest_framework import serializers
+from django.db.models import Prefetch, prefetch_related_objects
+from inventory.models import Product
 from .models import Sale, SaleItem
+from .services import create_sale
+
+def tenant_products(context):
+    """[SECURITY] IDOR Protection: only products of the requesting tenant's shop."""
+    shop = context['request'].tenant.shop
+    return Product.objects.filter(shop=shop) if shop else Product.objects.none()
+
+class CartProductField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves the product from the cart-wide lookup filled by SaleItemListSerializer,
+    so validating N lines doesn't cost N queries.
+    """
+    def get_queryset(self):
+        return tenant_products(self.context)
+
+    def to_internal_value(self, data):
+        products = getattr(self.parent, '_cart_products', None)
+        if products is None:
+            return super().to_internal_value(data)
+        try:
+            product = products.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if product is None:
+            # Unknown, or another shop's product
+            self.fail('does_not_exist', pk_value=data)
+        return product
+
+class SaleItemListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            ids = set()
+            for item in data:
+                try:
+                    ids.add(int(item.get('product')))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+            self.child._cart_products = tenant_products(self.context).in_bulk(ids) if ids else {}
+        return super().to_internal_value(data)
 
 class SaleItemSerializer(serializers.ModelSerializer):
+    product = CartProductField(allow_null=True, required=False)
     product_name = serializers.CharField(source='product.name', read_only=True)
 
     class Meta:
         model = SaleItem
         fields = '__all__'
         read_only_fields = ('sale',)
+        list_serializer_class = SaleItemListSerializer
 
 class SaleSerializer(serializers.ModelSerializer):
     items = SaleItemSerializer(many=True)
@@ -19,36 +62,18 @@ class SaleSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('cashier', 'created_at', 'shop')
 
+    def validate_items(self, items):
+        # A line without a product can't be posted; dropping it would record a different sale than the one sent
+        errors = [{} if item.get('product') else {'product': ["This field is required."]} for item in items]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        sale = Sale.objects.create(**validated_data)
-        total = 0
-        from inventory.models import Stock, StockMovement
-        
-        for item_data in items_data:
-            quantity = item_data['quantity']
-            price = item_data['price']
-            total += price * quantity
-            product_id = item_data['product'].id
-            
-            # Create Sale Item
-            SaleItem.objects.create(sale=sale, **item_data)
-            
-            # Deduct Stock
-            # Find stock for this product at this branch
-            # validated_data has 'branch' which is a Branch instance
-            branch = validated_data['branch']
-            
-            stock_qs = Stock.objects.filter(product_id=product_id, branch=branch)
-            if stock_qs.exists():
-                stock = stock_qs.first()
-                stock.quantity -= quantity
-                stock.save()
-            else:
-                # Optionally create negative stock? Or ignore?
-                # For now, let's create it if missing with negative qty (allow overdraft)
-                Stock.objects.create(product_id=product_id, branch=branch, quantity=-quantity)
-                
-        sale.total_amount = total
-        sale.save()
+        validated_data.pop('total_amount', None) # Always recomputed from the items
+        sale = create_sale(items_data, **validated_data)
+
+        # One query for the items (and their products) used in the response
+        prefetch_related_objects([sale], Prefetch('items', queryset=SaleItem.objects.select_related('product')))
         return sale
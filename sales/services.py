@@ -0,0 +1,120 @@
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import F, Case, When, Value, IntegerField
+from inventory import catalog
+from inventory.models import Product, Stock, StockMovement
+from .models import Sale, SaleItem
+
+
+def build_cart(shop, raw_items):
+    """
+    Turns the POS cart payload ([{'id', 'qty', 'price'}, ...]) into sale lines,
+    fetching every product of the cart in one query scoped to the shop.
+    Raises ValueError if a line references a product outside the shop.
+    """
+    lines = []
+    for item in raw_items:
+        product_id = item.get('id')
+        quantity = int(item.get('qty', 0) or 0)
+        if product_id and quantity > 0:
+            lines.append((int(product_id), quantity, Decimal(str(item.get('price', 0) or 0))))
+
+    # [SECURITY] IDOR Protection: only products of this shop
+    products = Product.objects.filter(shop=shop).in_bulk({product_id for product_id, _, _ in lines})
+    items = []
+    for product_id, quantity, price in lines:
+        product = products.get(product_id)
+        if product is None:
+            raise ValueError(f"Product #{product_id} not found.")
+        items.append({'product': product, 'quantity': quantity, 'price': price})
+    return items
+
+
+def deduct_stock(branch, quantities, user=None, reason=None):
+    """
+    Deducts sold quantities from the branch stock in a fixed number of queries.
+    `quantities` maps product_id -> quantity sold.
+    Stock rows are locked in primary key order so concurrent checkouts of the same
+    SKUs queue up instead of deadlocking, and the deduction is applied with F()
+    so no update is lost. Missing Stock rows are created with negative quantity
+    (overdraft allowed), and one SALE StockMovement is written per product.
+    The bulk writes skip the Stock signals, so the branch's POS catalog version
+    is bumped here. Must be called inside a transaction.
+    """
+    if not quantities:
+        return []
+
+    product_ids = sorted(quantities)
+    stocks = {
+        stock.product_id: stock
+        for stock in Stock.objects.select_for_update().filter(
+            branch=branch, product_id__in=product_ids
+        ).order_by('pk')
+    }
+
+    # Single UPDATE ... SET quantity = quantity - CASE ... for every existing row
+    if stocks:
+        Stock.objects.filter(pk__in=[s.pk for s in stocks.values()]).update(
+            quantity=F('quantity') - Case(
+                *[When(pk=s.pk, then=Value(quantities[pid])) for pid, s in stocks.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+            updated_at=timezone.now(), # update() skips auto_now; the delta sync reads it
+        )
+        for pid, stock in stocks.items():
+            stock.quantity -= quantities[pid]
+
+    missing = [
+        Stock(product_id=pid, branch=branch, quantity=-quantities[pid])
+        for pid in product_ids if pid not in stocks
+    ]
+    if missing:
+        for stock in Stock.objects.bulk_create(missing):
+            stocks[stock.product_id] = stock
+
+    StockMovement.objects.bulk_create([
+        StockMovement(
+            stock=stocks[pid],
+            product_id=pid,
+            branch=branch,
+            quantity_change=-quantities[pid],
+            movement_type=StockMovement.Type.SALE,
+            reason=reason,
+            user=user,
+        )
+        for pid in product_ids
+    ])
+    branch_id = branch.pk
+    catalog.invalidate_stock(branch_id)
+    transaction.on_commit(lambda: catalog.invalidate_stock(branch_id))
+    return [stocks[pid] for pid in product_ids]
+
+
+def create_sale(items, **sale_fields):
+    """
+    Posts a sale with all of its line items in a constant number of queries,
+    regardless of how many lines the cart has.
+    `items` is a list of dicts with 'product' (Product instance), 'quantity' and 'price'.
+    """
+    total = sum((Decimal(str(item['price'])) * item['quantity'] for item in items), Decimal('0.00'))
+    sale_fields['total_amount'] = total
+
+    with transaction.atomic():
+        sale = Sale.objects.create(**sale_fields)
+
+        SaleItem.objects.bulk_create([
+            SaleItem(sale=sale, product=item['product'], quantity=item['quantity'], price=item['price'])
+            for item in items
+        ])
+
+        # Merge duplicate lines of the same product into one deduction
+        quantities = {}
+        for item in items:
+            product_id = item['product'].pk
+            quantities[product_id] = quantities.get(product_id, 0) + item['quantity']
+
+        deduct_stock(sale.branch, quantities, user=sale.cashier, reason=f"Sale #{sale.id}")
+
+    return sale
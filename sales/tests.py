@@ -1,3 +1,336 @@
-from django.test import TestCase
+import gzip
+import json
+import time
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from inventory import catalog
+from inventory.models import Category, Product, Stock, StockMovement
+from shops.models import Shop
+from reports.models import DailyShopSummary
+from shops.tests import TenantAPITestCase
+from .batch import RETRY_LATER, post_chunk
+from .models import Sale
+from .services import create_sale
+from .views import SaleViewSet, SaleBatchAPIView
 
-# Create your tests here.
+
+class SaleQueryBudgetTests(TenantAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        category = Category.objects.create(shop=cls.shop, name='Snacks')
+        cls.products = [
+            Product.objects.create(shop=cls.shop, category=category, name=f'Product {i}', sku=f'SKU-{i}', selling_price=100, cost_price=50)
+            for i in range(3)
+        ]
+        cls.cashier = get_user_model().objects.create_user(
+            username='cashier', password='pass1234!x', role='EMPLOYEE', shop=cls.shop, branch=cls.branches[1]
+        )
+        cls.add_sales(3)
+
+    @classmethod
+    def add_sales(cls, count=25):
+        for i in range(count):
+            items = [{'product': product, 'quantity': 1, 'price': Decimal('100')} for product in cls.products]
+            create_sale(items, shop=cls.shop, branch=cls.branches[i % 2], cashier=cls.cashier if i % 2 else cls.owner)
+
+    def test_sales(self):
+        response = self.assertWithinBudget(SaleViewSet, 'list', '/api/sales/sales/', **self.auth())
+        sale = response.json()['results'][0]
+        self.assertEqual(len(sale['items']), 3)
+        self.assertWithinBudget(SaleViewSet, 'retrieve', f"/api/sales/sales/{sale['id']}/", **self.auth())
+        self.assertConstantQueries('/api/sales/sales/', self.add_sales, **self.auth())
+
+    def test_filtered_sales(self):
+        url = f'/api/sales/sales/?branch={self.branches[1].pk}&cashier={self.cashier.pk}&payment_method=cash&start_date=2000-01-01'
+        response = self.assertWithinBudget(SaleViewSet, 'list', url, **self.auth())
+        self.assertEqual(len(response.json()['results']), 1)
+
+    def test_deep_page(self):
+        self.add_sales()
+        first = self.assertWithinBudget(SaleViewSet, 'list', '/api/sales/sales/', **self.auth())
+        deep = self.assertWithinBudget(SaleViewSet, 'list', first.json()['next'], **self.auth())
+        self.assertEqual(first.query_count, deep.query_count)
+
+
+class SaleCheckoutTests(TenantAPITestCase):
+    """Posting a sale: one deduction and one movement per product, in the same number of queries for any cart."""
+    url = '/api/sales/sales/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.products = [
+            Product.objects.create(shop=cls.shop, name=f'Item {i}', sku=f'ITEM-{i}', selling_price=100, cost_price=60)
+            for i in range(12)
+        ]
+        Stock.objects.filter(branch=cls.branches[0]).update(quantity=50)
+        # Without a stock row the sale creates one, overdrawn
+        Stock.objects.filter(branch=cls.branches[0], product=cls.products[1]).delete()
+
+    def post_sale(self, lines):
+        items = [
+            {'product': product.pk if product else None, 'quantity': quantity, 'price': '100.00'}
+            for product, quantity in lines
+        ]
+        payload = {'branch': self.branches[0].pk, 'payment_method': 'CASH', 'items': items}
+        return self.client.post(self.url, payload, content_type='application/json', **self.auth())
+
+    def stock(self, product, branch=None):
+        return Stock.objects.get(branch=branch or self.branches[0], product=product).quantity
+
+    def sale_movements(self):
+        return sorted(
+            StockMovement.objects.filter(movement_type=StockMovement.Type.SALE).values_list('branch_id', 'product_id', 'quantity_change')
+        )
+
+    def test_api_sale(self):
+        response = self.post_sale([(self.products[0], 2), (self.products[1], 1), (self.products[0], 3)])
+        self.assertEqual(response.status_code, 201, response.content)
+        sale = Sale.objects.get(pk=response.json()['id'])
+        self.assertEqual(sale.total_amount, Decimal('600.00'))
+        self.assertEqual(sale.cashier, self.owner)
+        self.assertEqual(len(response.json()['items']), 3)
+
+        self.assertEqual(self.stock(self.products[0]), 45)
+        self.assertEqual(self.stock(self.products[1]), -1)
+        self.assertEqual(self.stock(self.products[0], self.branches[1]), 0)
+        # The two lines of products[0] make one movement
+        branch = self.branches[0].pk
+        self.assertEqual(self.sale_movements(), [(branch, self.products[0].pk, -5), (branch, self.products[1].pk, -1)])
+
+    def test_line_without_product_is_rejected(self):
+        response = self.post_sale([(self.products[0], 1), (None, 1)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['items'], [{}, {'product': ["This field is required."]}])
+        self.assertFalse(Sale.objects.exists())
+        self.assertEqual(self.stock(self.products[0]), 50)
+
+    def test_other_shops_product_is_rejected(self):
+        rival = get_user_model().objects.create_user(username='rival', password='pass1234!x', role='OWNER')
+        shop = Shop.objects.create(owner=rival, name='Rival Shop', slug='rival-shop')
+        foreign = Product.objects.create(shop=shop, name='Foreign', selling_price=100, cost_price=60)
+        missing = Product(pk=foreign.pk + 1000)
+        for product in (foreign, missing):
+            response = self.post_sale([(self.products[0], 1), (product, 1)])
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['items'], {'1': {'product': [f'Invalid pk "{product.pk}" - object does not exist.']}})
+        self.assertFalse(Sale.objects.exists())
+        self.assertEqual(self.stock(self.products[0]), 50)
+
+    def test_api_constant_queries(self):
+        self.post_sale([(self.products[0], 1)]) # Creates the day's rollup rows
+        small = self.post_sale([(product, 1) for product in self.products[2:4]])
+        large = self.post_sale([(product, 2) for product in self.products[2:]])
+        self.assertEqual(small.status_code, 201)
+        self.assertEqual(small.query_count, large.query_count)
+
+    def post_pos_sale(self, lines):
+        items = [{'id': product.pk, 'qty': quantity, 'price': '100.00'} for product, quantity in lines]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                '/sales/pos/', {'payment_method': 'CASH', 'items_json': json.dumps(items)}, secure=True
+            )
+        self.assertEqual(response.status_code, 302)
+        return len(queries)
+
+    def test_pos_sale(self):
+        self.client.force_login(self.owner)
+        self.post_pos_sale([(self.products[0], 2), (self.products[1], 1), (self.products[0], 3)])
+        sale = Sale.objects.get()
+        self.assertEqual(sale.total_amount, Decimal('600.00'))
+        self.assertEqual((sale.branch, sale.cashier), (self.branches[0], self.owner))
+        self.assertEqual(sale.items.count(), 3)
+
+        self.assertEqual(self.stock(self.products[0]), 45)
+        self.assertEqual(self.stock(self.products[1]), -1)
+        branch = self.branches[0].pk
+        self.assertEqual(self.sale_movements(), [(branch, self.products[0].pk, -5), (branch, self.products[1].pk, -1)])
+
+    def test_pos_constant_queries(self):
+        self.client.force_login(self.owner)
+        self.post_pos_sale([(self.products[0], 1)])
+        small = self.post_pos_sale([(product, 1) for product in self.products[2:4]])
+        large = self.post_pos_sale([(product, 2) for product in self.products[2:]])
+        self.assertEqual(small, large)
+
+
+class SaleBatchTests(TenantAPITestCase):
+    url = '/api/sales/batch/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        category = Category.objects.create(shop=cls.shop, name='Snacks')
+        cls.products = [
+            Product.objects.create(shop=cls.shop, category=category, name=f'Product {i}', sku=f'SKU-{i}', selling_price=100, cost_price=50)
+            for i in range(3)
+        ]
+
+    def entries(self, count, prefix='offline'):
+        return [
+            {
+                'client_key': f'{prefix}-{i}',
+                'branch': self.branches[i % 2].pk,
+                'items': [{'product': product.pk, 'quantity': 2, 'price': '100'} for product in self.products],
+            }
+            for i in range(count)
+        ]
+
+    def upload(self, entries):
+        return self.client.post(self.url, {'sales': entries}, content_type='application/json', **self.auth())
+
+    def test_replay_is_skipped(self):
+        response = self.upload(self.entries(3))
+        self.assertEqual(response.status_code, 200)
+        first = response.json()['results']
+        self.assertEqual([result['status'] for result in first], ['created'] * 3)
+        self.assertEqual(Sale.objects.get(pk=first[0]['id']).total_amount, Decimal('600.00'))
+        self.assertEqual(Stock.objects.get(branch=self.branches[0], product=self.products[0]).quantity, -4)
+
+        # Retried after a timeout, with one new sale queued since
+        replay = self.upload(self.entries(4))
+        statuses = [result['status'] for result in replay.json()['results']]
+        self.assertEqual(statuses, ['duplicate'] * 3 + ['created'])
+        self.assertEqual([result['id'] for result in replay.json()['results'][:3]], [result['id'] for result in first])
+        self.assertEqual(Sale.objects.filter(shop=self.shop).count(), 4)
+        self.assertEqual(Stock.objects.get(branch=self.branches[0], product=self.products[0]).quantity, -4)
+        self.assertEqual(DailyShopSummary.objects.filter(shop=self.shop).aggregate(Sum('sales_count'))['sales_count__sum'], 4)
+
+    def test_per_sale_errors(self):
+        entries = self.entries(2)
+        entries[1]['items'][0]['product'] = 0
+        entries.append(dict(entries[0]))
+        results = self.upload(entries).json()['results']
+        self.assertEqual([result['status'] for result in results], ['created', 'error', 'duplicate'])
+        self.assertEqual(results[2]['id'], results[0]['id'])
+        self.assertIn('Product #0', results[1]['errors'][0])
+
+    def test_constant_queries(self):
+        self.upload(self.entries(2, 'warm')) # Creates the day's rollup rows
+        small = self.upload(self.entries(2, 'small'))
+        large = self.upload(self.entries(20, 'large'))
+        self.assertEqual(small.query_count, large.query_count)
+        self.assertLessEqual(large.query_count, SaleBatchAPIView.query_budget['post'])
+
+    def test_conflicting_chunk_is_retried(self):
+        calls = []
+
+        def conflict_once(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise IntegrityError("UNIQUE constraint failed: sales_sale.shop_id, sales_sale.client_key")
+            return post_chunk(*args)
+
+        with mock.patch('sales.batch.post_chunk', side_effect=conflict_once):
+            results = self.upload(self.entries(2)).json()['results']
+        self.assertEqual(len(calls), 2)
+        self.assertEqual([result['status'] for result in results], ['created', 'created'])
+
+    def test_chunk_failing_twice_is_reported(self):
+        entries = self.entries(2)
+        entries.append(dict(entries[0]))
+        entries.append({'client_key': 'bad', 'items': []})
+        conflict = IntegrityError("UNIQUE constraint failed: sales_sale.shop_id, sales_sale.client_key")
+        with mock.patch('sales.batch.post_chunk', side_effect=conflict), self.assertLogs('sales.batch', 'ERROR'):
+            response = self.upload(entries)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['error'] * 4)
+        self.assertEqual(results[0]['errors'], [RETRY_LATER])
+        self.assertEqual(results[2]['errors'], [RETRY_LATER]) # The repeat of a sale that wasn't posted
+        self.assertIn('at least one item', results[3]['errors'][0])
+        self.assertFalse(Sale.objects.filter(shop=self.shop).exists())
+
+
+class PosCatalogTests(TenantAPITestCase):
+    page_url = '/sales/pos/'
+    url = '/sales/pos/catalog/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.products = [
+            Product.objects.create(shop=cls.shop, name=f'Product {i}', sku=f'SKU-{i}', selling_price=100 + i)
+            for i in range(3)
+        ]
+        Stock.objects.filter(branch=cls.branches[0], product=cls.products[0]).update(quantity=7)
+        Stock.objects.filter(branch=cls.branches[1], product=cls.products[0]).update(quantity=40)
+        cls.cashier = get_user_model().objects.create_user(
+            username='cashier', password='pass1234!x', role='EMPLOYEE', shop=cls.shop, branch=cls.branches[1]
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.owner)
+
+    def get(self, **headers):
+        return self.client.get(self.url, secure=True, headers={'Accept-Encoding': 'gzip', **headers})
+
+    def catalog(self, response):
+        return json.loads(gzip.decompress(response.content))
+
+    def test_branch_stock_only(self):
+        response = self.get()
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = self.catalog(response)
+        self.assertEqual(data['branch'], self.branches[0].pk)
+        self.assertEqual(data['name'], ['Product 0', 'Product 1', 'Product 2'])
+        self.assertEqual(data['price'][2], '102.00')
+        self.assertEqual(data['stock'], [7, 0, 0])
+
+        self.client.force_login(self.cashier)
+        self.assertEqual(self.catalog(self.get())['stock'], [40, 0, 0])
+        plain = self.client.get(self.url, secure=True)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(plain.json()['stock'], [40, 0, 0])
+
+    def test_not_modified_until_a_write(self):
+        etag = self.get()['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([query for query in queries if 'inventory_' in query['sql']])
+
+        # Sales deduct stock with bulk updates, which skip the Stock signals
+        create_sale(
+            [{'product': self.products[0], 'quantity': 2, 'price': Decimal('100')}],
+            shop=self.shop, branch=self.branches[0], cashier=self.owner
+        )
+        response = self.get(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.catalog(response)['stock'][0], 5)
+
+        etag = response['ETag']
+        self.products[1].selling_price = 150
+        self.products[1].save()
+        response = self.get(**{'If-None-Match': etag})
+        self.assertEqual(self.catalog(response)['price'][1], '150.00')
+
+    def test_catalog_expires(self):
+        # A write in another process, whose version bump a per-process cache never sees
+        etag = self.get()['ETag']
+        Product.objects.filter(pk=self.products[1].pk).update(selling_price=150)
+        self.assertEqual(self.get(**{'If-None-Match': etag}).status_code, 304)
+        later = time.time() + catalog.TTL
+        with mock.patch('inventory.catalog.time.time', return_value=later):
+            response = self.get(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.catalog(response)['price'][1], '150.00')
+
+    def test_page_does_not_load_the_catalog(self):
+        def page_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.page_url, secure=True)
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        before = page_queries()
+        for i in range(20):
+            Product.objects.create(shop=self.shop, name=f'Extra {i}', sku=f'EXTRA-{i}', selling_price=10)
+        self.assertEqual(page_queries(), before)
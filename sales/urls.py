@@ -1,7 +1,10 @@
+from django.urls import path
 from rest_framework import routers
-from .views import SaleViewSet
+from .views import SaleViewSet, SaleBatchAPIView
 
 router = routers.SimpleRouter()
 router.register(r'sales', SaleViewSet, basename='sale')
 
-urlpatterns = router.urls
+urlpatterns = [
+    path('batch/', SaleBatchAPIView.as_view(), name='sale-batch'),
+] + router.urls
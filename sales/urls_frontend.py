@@ -1,6 +1,6 @@
 from django.urls import path
 from .views_frontend import (
-    SaleCreateView, SaleListView, SaleCreditView, SaleRecentView,
+    SaleCreateView, PosCatalogView, SaleListView, SaleCreditView, SaleRecentView,
     ReturnInwardsView, ReturnOutwardsView, SaleDetailView, SaleDeleteView
 )
 
@@ -8,6 +8,7 @@ urlpatterns = [
     # Sales
     path('', SaleListView.as_view(), name='sales_index'), # Added default route
     path('pos/', SaleCreateView.as_view(), name='sale_pos'),
+    path('pos/catalog/', PosCatalogView.as_view(), name='sale_pos_catalog'),
     path('list/', SaleListView.as_view(), name='sale_list'),
     path('credit/', SaleCreditView.as_view(), name='sale_credit'),
     path('recent/', SaleRecentView.as_view(), name='sale_recent'),
@@ -1,38 +1,106 @@
 from rest_framework import viewsets, permissions
-from .models import Sale
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.db.models import Prefetch
+from django.utils.dateparse import parse_date
+from .models import Sale, SaleItem
 from .serializers import SaleSerializer
+from .batch import MAX_SALES, post_sales
+from users.role_permissions import HasModulePermission
+from shops.pagination import KeysetPagination
+from shops.query_budget import QueryBudgetMixin
+from reports.aggregation import filter_window
 
-class SaleViewSet(viewsets.ModelViewSet):
-    permission_classes = [permissions.IsAuthenticated]
+class SaleViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
+    """
+    Sales, newest first in keyset pages (?cursor=). Optional filters, each backed by a
+    (..., created_at) index: ?start_date=&end_date= (YYYY-MM-DD, inclusive), ?branch=,
+    ?cashier= and ?payment_method=.
+    """
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    permission_module = 'sales'
     serializer_class = SaleSerializer
+    pagination_class = KeysetPagination
+    query_budget = {'list': 4, 'retrieve': 4}
 
     def get_queryset(self):
         user = self.request.user
         if getattr(user, 'role', None) == 'SUPER_ADMIN' or user.is_superuser:
-            return Sale.objects.all()
-        
-        # Check User's Shop (Owner or Employee)
-        if hasattr(user, 'shops') and user.shops.exists():
-            return Sale.objects.filter(shop=user.shops.first())
-        elif hasattr(user, 'shop') and user.shop: # Direct FK if model differs, or property 
-             # Based on user model analysis, employee has user.shop_id or user.employee_profile.shop
-             # Let's check how other views do it. Dashboard used user.shop_id.
-             if user.role == 'EMPLOYEE' and user.shop_id:
-                 return Sale.objects.filter(shop_id=user.shop_id)
-
-        # Fallback for Owner logic if 'shops' rel is standard
-        return Sale.objects.filter(shop__owner=user).order_by('-created_at')
+            queryset = Sale.objects.all()
+        else:
+            # Check User's Shop (Owner or Employee)
+            shop = self.request.tenant.shop
+            if not shop:
+                return Sale.objects.none()
+            queryset = Sale.objects.filter(shop=shop)
+
+        # Everything SaleSerializer reads, in two queries per page
+        queryset = queryset.select_related('branch', 'cashier').prefetch_related(
+            Prefetch('items', queryset=SaleItem.objects.select_related('product'))
+        )
+        if self.action == 'list':
+            queryset = self.filter_list(queryset)
+        return queryset
+
+    def filter_list(self, queryset):
+        params = self.request.query_params
+        dates = {}
+        for name in ('start_date', 'end_date'):
+            if params.get(name):
+                try:
+                    dates[name] = parse_date(params[name])
+                except ValueError:
+                    dates[name] = None
+                if dates[name] is None:
+                    raise ValidationError({name: "Use the YYYY-MM-DD format."})
+        if dates:
+            queryset = filter_window(queryset, 'created_at', dates.get('start_date'), dates.get('end_date'))
+
+        for name in ('branch', 'cashier'):
+            if params.get(name):
+                try:
+                    queryset = queryset.filter(**{f'{name}_id': int(params[name])})
+                except ValueError:
+                    raise ValidationError({name: "Must be an id."})
+
+        payment_method = params.get('payment_method')
+        if payment_method:
+            if payment_method.upper() not in Sale.PaymentMethod.values:
+                raise ValidationError({'payment_method': f"One of {', '.join(Sale.PaymentMethod.values)}."})
+            queryset = queryset.filter(payment_method=payment_method.upper())
+        return queryset
 
     def perform_create(self, serializer):
         user = self.request.user
-        shop = None
-        if hasattr(user, 'shops') and user.shops.exists():
-            shop = user.shops.first()
-        elif hasattr(user, 'shop') and user.shop:
-            shop = user.shop
-        
+        shop = self.request.tenant.shop
         if shop:
             serializer.save(shop=shop, cashier=user)
         else:
-            from rest_framework.exceptions import ValidationError
             raise ValidationError({"shop": "No shop found."})
+
+
+class SaleBatchAPIView(QueryBudgetMixin, APIView):
+    """
+    POST {'sales': [{'client_key', 'branch'?, 'customer'?, 'payment_method'?, 'items': [{'product', 'quantity', 'price'}]}]}
+    with up to MAX_SALES sales queued offline. Returns {'results': [...]}, one per sale in order,
+    each 'created' or 'duplicate' (already posted, with its id) or 'error'; the upload can be
+    retried as a whole. Sales without a branch go to the employee's branch, else the shop's first.
+    """
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    permission_module = 'sales'
+    query_budget = {'post': 30} # A chunk of sales for two branches
+
+    def post(self, request):
+        shop = request.tenant.shop
+        if not shop:
+            raise ValidationError({"shop": "No shop found."})
+        entries = request.data.get('sales') if isinstance(request.data, dict) else None
+        if not isinstance(entries, list) or not entries:
+            raise ValidationError({"sales": "A non-empty list of sales is required."})
+        if len(entries) > MAX_SALES:
+            raise ValidationError({"sales": f"At most {MAX_SALES} sales per upload."})
+
+        user = request.user
+        default_branch = user.branch if getattr(user, 'branch_id', None) else shop.branches.first()
+        return Response({'results': post_sales(shop, user, entries, default_branch)})
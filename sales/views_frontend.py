@@ -1,40 +1,44 @@
-from django.views.generic import ListView, CreateView, TemplateView, DeleteView
+import gzip
+from django.views.generic import ListView, CreateView, TemplateView, DeleteView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import redirect, get_object_or_404
 from django.urls import reverse_lazy
 from django.contrib import messages
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.middleware.gzip import re_accepts_gzip
 from .models import Sale, SaleItem
 from .forms import SaleForm
-from inventory.models import Product
+from inventory import catalog
 from django.db import transaction
-
-class BaseShopView(LoginRequiredMixin):
-    def get_shop(self):
-        # 1. Check Owner Config
-        if hasattr(self.request.user, 'shops') and self.request.user.shops.exists():
-            return self.request.user.shops.first()
-        
-        # 2. Check Employee Config (Direct FK)
-        if getattr(self.request.user, 'shop', None):
-             return self.request.user.shop
-             
-        # 3. Fallback (Legacy)
-        if hasattr(self.request.user, 'employee_profile'):
-             return self.request.user.employee_profile.shop
-             
-        return None
+from .services import build_cart, create_sale
+from shops.mixins import BaseShopView
+from shops.pagination import PAGE_SIZE, keyset_page, page_links
 
 class SaleListView(BaseShopView, ListView):
     model = Sale
     template_name = 'sales/sale_list.html'
     context_object_name = 'sales'
+    page_size = PAGE_SIZE
 
     def get_queryset(self):
         shop = self.get_shop()
         if shop:
-            return Sale.objects.filter(shop=shop).order_by('-created_at')
+            return self.with_related(Sale.objects.filter(shop=shop))
         return Sale.objects.none()
 
+    def with_related(self, queryset):
+        # Customer, cashier and item counts for the whole page in two queries
+        return queryset.select_related('customer', 'cashier').prefetch_related('items')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Keyset pages on (created_at, id): deep pages cost the same as the first
+        page = keyset_page(self.object_list, self.request.GET.get('cursor'), self.page_size)
+        context['sales'] = page
+        context.update(page_links(self.request, page))
+        return context
+
 class SaleCreateView(BaseShopView, CreateView):
     model = Sale
     form_class = SaleForm
@@ -48,16 +52,8 @@ class SaleCreateView(BaseShopView, CreateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        shop = self.get_shop()
-        if shop:
-            from django.db.models import Sum, F
-            # Get products with available stock
-            # For simplicity, we sum stock across all branches for now, 
-            # OR we should ideally filter by the logged-in user's branch if "Cashier" model had branch.
-            # Assuming shop wide visibility for owner/admin.
-            context['products'] = Product.objects.filter(shop=shop).annotate(
-                stock_qty=Sum('stocks__quantity')
-            )
+        # The catalog is not rendered here: the page loads it from PosCatalogView
+        context['branch'] = self.request.tenant.branch
         return context
 
     def form_valid(self, form):
@@ -65,75 +61,71 @@ class SaleCreateView(BaseShopView, CreateView):
         if not shop:
              messages.error(self.request, "No shop associated.")
              return self.form_invalid(form)
-        
-        # In a real POS, we'd handle items here. 
-        # For this phase, we are just saving the 'header' or would need JS to submit items.
-        # To make it functional simple: We will assume some items are passed or just save the header for now.
-        # ideally we catch the JSON payload or POST data for items.
-        
+
+        # Cart lines come from the hidden JSON input filled by the POS page
+        import json
+        try:
+            items_data = json.loads(self.request.POST.get('items_json') or '[]')
+            items = build_cart(shop, items_data)
+        except (json.JSONDecodeError, TypeError, ValueError, AttributeError) as e:
+            messages.error(self.request, f"Error processing sale items: {e}")
+            return self.form_invalid(form)
+
+        # The branch whose catalog and stock the page showed
+        branch = self.request.tenant.branch
+        if not branch:
+            messages.error(self.request, "No branch found for this shop.")
+            return self.form_invalid(form)
+
+        # Same posting path as the REST API (SaleSerializer.create):
+        # row-locked, F() stock deductions and an in-memory total.
         with transaction.atomic():
-            form.instance.shop = shop
-            if hasattr(shop, 'branches') and shop.branches.exists():
-                form.instance.branch = shop.branches.first()
-            
-            self.object = form.save()
-            
-            # Process SaleItems from hidden JSON input
-            import json
-            items_json = self.request.POST.get('items_json')
-            if items_json:
-                try:
-                    items_data = json.loads(items_json)
-                    for item in items_data:
-                        product_id = item.get('id')
-                        quantity = int(item.get('qty', 0))
-                        price = float(item.get('price', 0))
-                        
-                        if product_id and quantity > 0:
-                            # [SECURITY] IDOR Protection: filter by shop
-                            product = Product.objects.get(id=product_id, shop=shop)
-                            
-                            SaleItem.objects.create(
-                                sale=self.object,
-                                product=product,
-                                quantity=quantity,
-                                price=price
-                            )
-                            
-                            # SYNC: Deduct Stock
-                            # Assuming Main Branch for simple setups or the branch selected on the form
-                            branch = self.object.branch
-                            if branch:
-                                from inventory.models import Stock
-                                stock_record = Stock.objects.filter(branch=branch, product=product).first()
-                                if stock_record:
-                                    stock_record.quantity -= quantity
-                                    stock_record.save()
-                                else:
-                                    # Create negative stock record if not exists? Or just Log.
-                                    # For robustness, we assume stock exists if it appeared in POS.
-                                    pass
-                            # Update total amount if handled here or trust frontend total passed? 
-                            # Better: Calculate total from items to be safe
-                    
-                    # Recalculate sales total from items to ensure accuracy
-                    self.object.total_amount = sum(item.price * item.quantity for item in self.object.items.all())
-                    self.object.save()
-                    
-                    # SYNC: Create Notification
-                    from dashboard.models import Notification
-                    Notification.objects.create(
-                        recipient=self.request.user, # Or Notify Admin?
-                        verb="New Sale",
-                        message=f"Sale #{self.object.id} completed. Total: {self.object.total_amount}",
-                        link=f"/sales/" # Link to sale list
-                    )
-                    
-                except json.JSONDecodeError:
-                    messages.warning(self.request, "Error processing sale items.")
-            
+            self.object = create_sale(
+                items,
+                shop=shop,
+                branch=branch,
+                cashier=self.request.user,
+                customer=form.cleaned_data.get('customer'),
+                payment_method=form.cleaned_data.get('payment_method') or Sale.PaymentMethod.CASH,
+            )
+
+            # SYNC: Create Notification
+            from dashboard.models import Notification
+            Notification.objects.create(
+                recipient=self.request.user, # Or Notify Admin?
+                verb="New Sale",
+                message=f"Sale #{self.object.id} completed. Total: {self.object.total_amount}",
+                link=f"/sales/" # Link to sale list
+            )
+
         messages.success(self.request, "Sale recorded successfully!")
-        return super().form_valid(form)
+        return redirect(self.get_success_url())
+
+
+class PosCatalogView(BaseShopView, View):
+    """
+    The POS catalog of the user's branch (inventory.catalog): gzip-compressed
+    columnar JSON with an ETag, answered 304 while the catalog is unchanged.
+    """
+    def get(self, request):
+        shop = self.get_shop()
+        branch = request.tenant.branch
+        if not shop or not branch:
+            return JsonResponse({'error': 'No branch associated'}, status=400)
+
+        versions = catalog.get_versions(shop.pk, branch.pk)
+        accepts_gzip = bool(re_accepts_gzip.search(request.headers.get('Accept-Encoding', '')))
+        etag = catalog.get_etag(shop.pk, branch.pk, versions + (accepts_gzip,))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            data = catalog.get_compressed(shop.pk, branch.pk, versions)
+            response = HttpResponse(data if accepts_gzip else gzip.decompress(data), content_type='application/json')
+            if accepts_gzip:
+                response.headers['Content-Encoding'] = 'gzip'
+        response.headers['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Accept-Encoding', 'Cookie'))
+        return response
 
 
 class PlaceholderView(LoginRequiredMixin, TemplateView):
@@ -148,16 +140,17 @@ class SaleCreditView(SaleListView):
     def get_queryset(self):
         shop = self.get_shop()
         if shop:
-            return Sale.objects.filter(shop=shop, payment_method='CREDIT').order_by('-created_at')
+            return self.with_related(Sale.objects.filter(shop=shop, payment_method='CREDIT'))
         return Sale.objects.none()
 
 class SaleRecentView(SaleListView):
     """Latest 10 sales"""
-    def get_queryset(self):
-        shop = self.get_shop()
-        if shop:
-            return Sale.objects.filter(shop=shop).order_by('-created_at')[:10]
-        return Sale.objects.none()
+    page_size = 10
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['next_url'] = context['previous_url'] = None
+        return context
 
 from django.views.generic import DetailView
 class SaleDetailView(BaseShopView, DetailView):
@@ -0,0 +1,117 @@
+"""
+Conditional GET for the API views whose data rarely changes between loads.
+
+A view with ConditionalGetMixin computes a cheap validator of its data before
+the handler runs: by default the latest updated_at and the row count of
+get_queryset() (one aggregate on the (shop, updated_at) indexes), or a version
+counter bumped on writes (get_version / bump_version) for small global tables.
+The ETag hashes the validator with the view, the user and the full URL, so a
+request whose If-None-Match (or, for single objects, If-Modified-Since) still
+matches is answered 304 right after authentication, without querying or
+serializing the rows. Other responses carry the ETag and Cache-Control.
+
+Collections send no Last-Modified: deleting a row lowers the count but not the
+latest updated_at, so only the ETag is a safe validator for them.
+"""
+import hashlib
+import time
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+VERSION_PREFIX = 'conditional:version:'
+
+
+def get_version(name):
+    key = VERSION_PREFIX + name
+    version = cache.get(key)
+    if version is None:
+        # Time based, so an evicted counter never comes back with a number clients already hold
+        cache.add(key, time.time_ns() // 1000, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    key = VERSION_PREFIX + name
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns() // 1000, None)
+
+
+def collection_state(queryset, field='updated_at'):
+    """(latest `field`, row count) of a queryset, in one aggregate query."""
+    state = queryset.order_by().aggregate(latest=Max(field), count=Count('pk'))
+    return state['latest'], state['count']
+
+
+def make_etag(*parts):
+    return '"%s"' % hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+class NotModified(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Answers conditional GETs of `conditional_actions` (viewset actions, or 'get'
+    for plain API views). Override get_validators() for data that isn't a
+    queryset of rows with an updated_at.
+    """
+    conditional_actions = ('list', 'retrieve', 'get')
+    cache_control = {'private': True, 'no_cache': True}
+    vary_on = ()
+    per_user = True # False for data that is the same for every user of the URL
+
+    def get_validators(self):
+        """
+        (etag parts, last modified datetime or None) for the current request, or None
+        to answer it normally. On retrieve the validator covers just that object.
+        """
+        queryset = self.get_queryset()
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        if lookup in self.kwargs:
+            latest, count = collection_state(queryset.filter(**{self.lookup_field: self.kwargs[lookup]}))
+            return (latest, count), latest
+        return collection_state(queryset), None
+
+    def get_cache_control(self):
+        return self.cache_control
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.last_modified = None
+        action = getattr(self, 'action', None) or request.method.lower()
+        if request.method not in ('GET', 'HEAD') or action not in self.conditional_actions:
+            return
+        validators = self.get_validators()
+        if validators is None:
+            return
+
+        parts, last_modified = validators
+        user = request.user.pk if self.per_user else None
+        self.etag = make_etag(type(self).__name__, user, request.get_full_path(), *parts)
+        self.last_modified = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) and response.status_code in (200, 304):
+            response.headers['ETag'] = self.etag
+            if self.last_modified:
+                response.headers['Last-Modified'] = http_date(self.last_modified)
+            patch_cache_control(response, **self.get_cache_control())
+            if self.vary_on:
+                patch_vary_headers(response, self.vary_on)
+        return response
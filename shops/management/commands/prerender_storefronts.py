@@ -0,0 +1,31 @@
+from pathlib import Path
+from django.core.management.base import BaseCommand
+from shops.models import Shop
+from shops.storefront import prerender
+
+class Command(BaseCommand):
+    help = 'Renders the public storefronts into the page cache, and optionally to static HTML files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, action='append', dest='shops', help='Only render this shop id (repeatable)')
+        parser.add_argument(
+            '--output', help='Also write single-page storefronts to <output>/store/<slug>/index.html (WHITENOISE_ROOT)'
+        )
+
+    def handle(self, *args, **options):
+        shops = Shop.objects.filter(public_visibility=True).exclude(slug__isnull=True).exclude(slug='').order_by('pk')
+        if options.get('shops'):
+            shops = shops.filter(pk__in=options['shops'])
+
+        rendered = written = 0
+        for shop in shops:
+            html, pages = prerender(shop)
+            rendered += 1
+            # WhiteNoise ignores the query string, so only a storefront without ?page=2 can be served as a file
+            if options.get('output') and pages == 1:
+                path = Path(options['output']) / 'store' / shop.slug / 'index.html'
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(html)
+                written += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} storefront(s), wrote {written} static page(s).'))
@@ -0,0 +1,10 @@
+from .tenant import LazyTenant
+
+class TenantMiddleware:
+    """Attaches request.tenant (shop, branch, role and subscription of request.user, see shops.tenant)."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.tenant = LazyTenant(request)
+        return self.get_response(request)
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-17 22:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0003_shop_public_visibility_shop_slug'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shop',
+            index=models.Index(fields=['created_at', 'id'], name='shops_shop_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shop',
+            index=models.Index(fields=['name'], name='shops_shop_name_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-17 23:40
+
+from django.db import migrations
+
+
+def create_name_index(apps, schema_editor):
+    # Directory name search (dashboard.crm.prefix_filter). PostgreSQL matches
+    # with UPPER(name) LIKE, which needs text_pattern_ops; SQLite with a range.
+    vendor = schema_editor.connection.vendor
+    if vendor not in ('sqlite', 'postgresql'):
+        return
+    opclass = ' text_pattern_ops' if vendor == 'postgresql' else ''
+    schema_editor.execute(f'CREATE INDEX IF NOT EXISTS shops_shop_name_upper_idx ON shops_shop (UPPER(name){opclass})')
+
+
+def drop_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP INDEX IF EXISTS shops_shop_name_upper_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0004_shop_directory_indexes'),
+    ]
+
+    operations = [
+        # Case-insensitive prefix search can't use a plain index on name
+        migrations.RemoveIndex(
+            model_name='shop',
+            name='shops_shop_name_idx',
+        ),
+        migrations.RunPython(create_name_index, drop_name_index),
+    ]
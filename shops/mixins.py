@@ -0,0 +1,8 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+
+class BaseShopView(LoginRequiredMixin):
+    """Base view to handle shop context and security"""
+
+    def get_shop(self):
+        # Resolved once per request by shops.middleware.TenantMiddleware
+        return self.request.tenant.shop
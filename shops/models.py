@@ -15,6 +15,13 @@ class Shop(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Superuser directory keyset pages (dashboard.crm). Its name search
+            # index is on UPPER(name), created by migration 0005.
+            models.Index(fields=['created_at', 'id'], name='shops_shop_created_idx'),
+        ]
+
     def clean(self):
         from django.core.exceptions import ValidationError
         reserved_slugs = ['admin', 'dashboard', 'login', 'logout', 'register', 'api', 'static', 'media', 'public', 'store']
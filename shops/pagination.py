@@ -0,0 +1,164 @@
+"""
+Keyset (seek) pagination for the long tenant-wide lists.
+
+Rows are ordered newest first on (created_at, pk) and a page starts right after
+the last row of the previous one (WHERE created_at < x OR (created_at = x AND pk < y)),
+so with an index on those columns every page costs the same however deep it is,
+and no COUNT(*) is needed. Cursors are opaque tokens for ?cursor=.
+KeysetPagination does the same for DRF list views.
+"""
+import base64
+import json
+from django.db.models import Q
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+PAGE_SIZE = 20
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.object_list = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_value(value):
+    # Full microseconds: DjangoJSONEncoder rounds datetimes to milliseconds, which breaks the seek
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def encode_cursor(direction, values):
+    raw = json.dumps([direction, values], default=encode_value)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, size):
+    """(direction, values) of a token, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        direction, values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+    if direction not in ('next', 'previous') or not isinstance(values, list) or len(values) != size:
+        return None
+    return direction, values
+
+
+def seek(fields, values, lookup):
+    """fields > values (lookup='gt') or < values (lookup='lt'), compared as a tuple."""
+    condition = Q()
+    for i, field in enumerate(fields):
+        step = Q(**{f'{field}__{lookup}': values[i]})
+        for previous, value in zip(fields[:i], values[:i]):
+            step &= Q(**{previous: value})
+        condition |= step
+    return condition
+
+
+def keyset_page(queryset, cursor=None, size=PAGE_SIZE, fields=('created_at', 'pk')):
+    """
+    One page of `queryset`, newest first on `fields` (the last one must be unique).
+    Fetches size + 1 rows to know whether there is a further page.
+    """
+    decoded = decode_cursor(cursor, len(fields))
+    backwards = decoded is not None and decoded[0] == 'previous'
+
+    if decoded is not None:
+        queryset = queryset.filter(seek(fields, decoded[1], 'gt' if backwards else 'lt'))
+    ordering = list(fields) if backwards else [f'-{field}' for field in fields]
+    rows = list(queryset.order_by(*ordering)[:size + 1])
+
+    more = len(rows) > size
+    rows = rows[:size]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return KeysetPage(rows)
+
+    def key(row):
+        return [getattr(row, field) for field in fields]
+
+    has_next = True if backwards else more
+    has_previous = more if backwards else decoded is not None
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor('next', key(rows[-1])) if has_next else None,
+        previous_cursor=encode_cursor('previous', key(rows[0])) if has_previous else None,
+    )
+
+
+def page_links(request, page):
+    """?cursor= URLs of the neighbouring pages, keeping the other GET parameters (search, filters)."""
+    def link(cursor):
+        if cursor is None:
+            return None
+        params = request.GET.copy()
+        params['cursor'] = cursor
+        return '?' + params.urlencode()
+    return {'next_url': link(page.next_cursor), 'previous_url': link(page.previous_cursor)}
+
+
+class KeysetPagination(BasePagination):
+    """
+    DRF pagination over keyset_page(): {'next', 'previous', 'results'} with
+    cursor links, like CursorPagination but seeking on the whole (created_at, pk) key.
+    """
+    page_size = PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    fields = ('created_at', 'pk')
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page = keyset_page(
+            queryset, request.query_params.get(self.cursor_query_param), self.get_page_size(request), self.fields
+        )
+        return list(self.page)
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.page.next_cursor),
+            'previous': self.get_link(self.page.previous_cursor),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
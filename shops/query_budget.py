@@ -0,0 +1,77 @@
+"""
+Query budgets for the API views.
+
+A view declares the most SQL queries each of its actions may run (viewset
+actions, or lowercase HTTP methods for plain API views):
+
+    class StockViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
+        query_budget = {'list': 4, 'retrieve': 3}
+
+QueryBudgetMixin counts the queries of every request it dispatches
+(authentication and tenant resolution included, middleware excluded), exposes
+the count as response.query_count and logs a warning when an action goes over
+budget. With settings.QUERY_BUDGET_STRICT (DEBUG and test runs) it raises
+QueryBudgetExceeded instead, so every test that calls an API view enforces its
+budget. The apps' tests.py also assert the budgets with QueryBudgetTestMixin,
+and that a page costs the same number of queries however many rows there are.
+"""
+import logging
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """An action ran more queries than its budget, with QUERY_BUDGET_STRICT on."""
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMixin:
+    query_budget = {}
+
+    def get_budget_action(self):
+        return getattr(self, 'action', None) or self.request.method.lower()
+
+    def dispatch(self, request, *args, **kwargs):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = super().dispatch(request, *args, **kwargs)
+        response.query_count = counter.count
+
+        budget = self.query_budget.get(self.get_budget_action())
+        if budget is not None and counter.count > budget:
+            args = (type(self).__name__, self.get_budget_action(), counter.count, budget)
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded("%s.%s ran %d queries (budget %d)" % args)
+            logger.warning("%s.%s ran %d queries (budget %d)", *args)
+        return response
+
+
+class QueryBudgetTestMixin:
+    """Assertions for TestCase classes that exercise QueryBudgetMixin views."""
+
+    def assertWithinBudget(self, view_class, action, url, status=200, **extra):
+        response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, status, f"GET {url}: {response.status_code}")
+        budget = view_class.query_budget[action]
+        self.assertLessEqual(
+            response.query_count, budget,
+            f"{view_class.__name__}.{action} ran {response.query_count} queries (budget {budget})"
+        )
+        return response
+
+    def assertConstantQueries(self, url, add_rows, **extra):
+        """The query count of GET url must not change after add_rows() seeds more data."""
+        before = self.client.get(url, **extra).query_count
+        add_rows()
+        after = self.client.get(url, **extra).query_count
+        self.assertEqual(before, after, f"GET {url}: {before} queries, then {after} with more rows")
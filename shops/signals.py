@@ -0,0 +1,38 @@
+"""
+Drops the cached storefront pages (shops.storefront) when what they show changes:
+the shop's own fields (name, logo, description, slug, visibility) or its currency.
+Public product writes are handled in inventory.signals.
+"""
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Shop, ShopSettings
+from . import storefront
+
+def invalidate_slugs(slugs):
+    for slug in slugs:
+        storefront.invalidate(slug)
+
+@receiver(pre_save, sender=Shop)
+def remember_slug(sender, instance, **kwargs):
+    # A renamed slug leaves pages cached under the old one
+    if instance.pk:
+        instance._previous_slug = sender.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+
+@receiver(post_save, sender=Shop)
+@receiver(post_delete, sender=Shop)
+def invalidate_storefront(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Again after commit: a hit in between may have re-cached the old page
+    slugs = {instance.slug, getattr(instance, '_previous_slug', None)} - {None, ''}
+    invalidate_slugs(slugs)
+    transaction.on_commit(lambda: invalidate_slugs(slugs))
+
+@receiver(post_save, sender=ShopSettings)
+def invalidate_storefront_settings(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    shop_id = instance.shop_id
+    storefront.invalidate_shop(shop_id)
+    transaction.on_commit(lambda: storefront.invalidate_shop(shop_id))
@@ -0,0 +1,113 @@
+"""
+Full-page cache of the public storefronts (PublicShopView).
+
+Rendered pages are cached per (slug, page, filters) along with the
+storefront's version at render time. Everything a storefront shows bumps that
+version when it changes: the shop's name, logo, description and visibility,
+its currency, and its public products (shops.signals, inventory.signals and
+the product importer). The next hit then re-renders, so a change is visible
+right away; a cache hit costs no query at all.
+
+Pages are fresh for FRESH_SECONDS. Past that, or after a bump, the first
+request re-renders while concurrent ones keep getting the stale copy (for up
+to STALE_SECONDS), so a shared link that brings thousands of visitors costs one
+render at a time instead of one per visitor. Browsers and CDNs get the same
+policy through Cache-Control.
+
+prerender_storefronts renders every visible storefront ahead of time and can
+also write single-page storefronts out as static HTML for WhiteNoise.
+"""
+import hashlib
+import math
+import time
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import urlencode
+from .conditional import bump_version, get_version
+
+PAGE_PREFIX = 'storefront:page:'
+LOCK_PREFIX = 'storefront:lock:'
+FRESH_SECONDS = 60
+STALE_SECONDS = 60 * 60
+LOCK_SECONDS = 30
+# The query parameters that change a storefront page; others (utm_source, ...) share its entry
+CACHE_PARAMS = ('page',)
+
+
+def version_name(slug):
+    return f'storefront:{slug}'
+
+
+def invalidate(slug):
+    if slug:
+        bump_version(version_name(slug))
+
+
+def invalidate_shop(shop_id):
+    from .models import Shop
+    invalidate(Shop.objects.filter(pk=shop_id).values_list('slug', flat=True).first())
+
+
+def page_key(slug, params):
+    filters = urlencode(sorted((name, params[name]) for name in CACHE_PARAMS if params.get(name)))
+    # Slugs can be 255 characters, more than some backends allow in a key
+    return hashlib.md5(f'{slug}?{filters}'.encode()).hexdigest()
+
+
+def add_cache_headers(response):
+    patch_cache_control(response, public=True, max_age=FRESH_SECONDS, stale_while_revalidate=STALE_SECONDS)
+    return response
+
+
+def cached_page(slug, params, render):
+    """
+    The storefront page for these GET params, from the cache or from render()
+    (a view callable returning an unrendered TemplateResponse). Only 200
+    responses are cached; a 404 (unknown or hidden shop) is always rendered.
+    """
+    key = page_key(slug, params)
+    version = get_version(version_name(slug))
+    entry = cache.get(PAGE_PREFIX + key) # (version, fresh until, content type, content)
+    if entry is not None:
+        current = entry[0] == version and entry[1] > time.time()
+        # Stale: one request re-renders, the others keep serving the old copy meanwhile
+        if current or not cache.add(LOCK_PREFIX + key, 1, LOCK_SECONDS):
+            return add_cache_headers(HttpResponse(entry[3], content_type=entry[2]))
+
+    try:
+        response = render()
+        response.render()
+    finally:
+        if entry is not None:
+            cache.delete(LOCK_PREFIX + key)
+    if response.status_code == 200:
+        cache.set(
+            PAGE_PREFIX + key, (version, time.time() + FRESH_SECONDS, response['Content-Type'], response.content),
+            STALE_SECONDS
+        )
+        add_cache_headers(response)
+    return response
+
+
+def prerender(shop):
+    """
+    Renders every page of a visible storefront into the cache (pages already
+    fresh are kept). Returns (HTML of the first page, number of pages).
+    """
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+    from inventory.models import Product
+    from .views_public import PublicShopView
+
+    count = Product.objects.filter(shop=shop, is_public=True).count()
+    pages = max(1, math.ceil(count / PublicShopView.paginate_by))
+    view = PublicShopView.as_view()
+    first = None
+    for page in range(1, pages + 1):
+        request = RequestFactory().get(f'/store/{shop.slug}/', {'page': page} if page > 1 else {})
+        request.user = AnonymousUser()
+        response = view(request, slug=shop.slug)
+        if first is None:
+            first = response.content
+    return first, pages
@@ -0,0 +1,111 @@
+"""
+Request-scoped tenant context.
+
+TenantMiddleware sets `request.tenant`, which resolves the user's shop together
+with its settings in one joined query, the first time it is used in a request.
+Views, viewsets, middleware and context processors all read the shop, branch,
+role and subscription state from it. The subscription gate itself is answered
+from the cached per-shop state in subscriptions.state, so the subscription and
+plan rows are only loaded by the pages that display them.
+"""
+from django.utils.functional import cached_property
+from subscriptions import state as subscription_state
+from subscriptions.models import ShopSubscription
+from users.role_permissions import user_permissions
+from .models import Shop, Branch
+
+
+class Tenant:
+    def __init__(self, user):
+        self.user = user
+        self.user_id = user.pk if user.is_authenticated else None
+
+    @cached_property
+    def shop(self):
+        """The employee's assigned shop, else the owner's first shop."""
+        if not self.user_id:
+            return None
+        shops = Shop.objects.select_related('settings')
+        if self.user.shop_id:
+            return shops.filter(pk=self.user.shop_id).first()
+        return shops.filter(owner_id=self.user_id).order_by('pk').first()
+
+    @property
+    def shop_id(self):
+        """The shop's id, without a query for employees until the shop itself is needed."""
+        if 'shop' not in self.__dict__ and self.user_id and self.user.shop_id:
+            return self.user.shop_id
+        shop = self.shop
+        return shop.pk if shop else None
+
+    @property
+    def owned_shop(self):
+        """The shop, only if the user owns it (owner-only pages and actions)."""
+        shop = self.shop
+        return shop if shop and shop.owner_id == self.user_id else None
+
+    @cached_property
+    def branch(self):
+        """The employee's branch, else the shop's main (or first) branch."""
+        if self.user_id and self.user.branch_id:
+            return Branch.objects.filter(pk=self.user.branch_id).first()
+        if not self.shop:
+            return None
+        return Branch.objects.filter(shop=self.shop).order_by('-is_main', 'pk').first()
+
+    @property
+    def role(self):
+        return getattr(self.user, 'role', None)
+
+    @property
+    def permissions(self):
+        """Compiled (module, action) pairs of the user's role (see users.role_permissions)."""
+        return user_permissions(self.user)
+
+    @property
+    def is_super_admin(self):
+        return bool(self.user_id) and (self.user.is_superuser or self.role == 'SUPER_ADMIN')
+
+    @cached_property
+    def subscription(self):
+        shop = self.shop
+        if not shop:
+            return None
+        return ShopSubscription.objects.select_related('plan').filter(shop=shop).first()
+
+    @property
+    def plan(self):
+        subscription = self.subscription
+        return subscription.plan if subscription else None
+
+    @property
+    def has_access(self):
+        """Valid subscription, or still inside the registration trial (cached, see subscriptions.state)."""
+        shop_id = self.shop_id
+        if not shop_id:
+            return False
+        state = subscription_state.get_state(shop_id)
+        return bool(state) and state.is_valid()
+
+
+def get_tenant(request):
+    """
+    The Tenant of request.user, built once per request. Rebuilt if the user changes
+    (DRF authenticates token requests after the middleware has run).
+    """
+    user = request.user
+    tenant = getattr(request, '_tenant', None)
+    if tenant is None or tenant.user_id != (user.pk if user.is_authenticated else None):
+        tenant = request._tenant = Tenant(user)
+    return tenant
+
+
+class LazyTenant:
+    """What request.tenant holds: forwards to get_tenant(request), so nothing is queried until used."""
+    __slots__ = ('_request',)
+
+    def __init__(self, request):
+        self._request = request
+
+    def __getattr__(self, name):
+        return getattr(get_tenant(self._request), name)
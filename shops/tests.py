@@ -1,3 +1,160 @@
-from django.test import TestCase
+import io
+import tempfile
+from pathlib import Path
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+from inventory.models import Product
+from . import storefront
+from .models import Shop, Branch, ShopSettings
+from .query_budget import QueryBudgetExceeded, QueryBudgetTestMixin
+from .tenant import get_tenant
+from .views import ShopViewSet, BranchViewSet, ShopSettingsViewSet
 
-# Create your tests here.
+
+class TenantAPITestCase(QueryBudgetTestMixin, TestCase):
+    """
+    An owner with a shop and two branches, calling the API with a JWT (the mobile
+    app's path, where authentication and tenant resolution happen inside the view).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = get_user_model().objects.create_user(username='owner', password='pass1234!x', role='OWNER')
+        cls.shop = Shop.objects.create(owner=cls.owner, name='Budget Shop', slug='budget-shop')
+        ShopSettings.objects.get_or_create(shop=cls.shop)
+        cls.branches = [
+            Branch.objects.create(shop=cls.shop, name='Main', is_main=True),
+            Branch.objects.create(shop=cls.shop, name='Town'),
+        ]
+
+    def auth(self, user=None):
+        token = RefreshToken.for_user(user or self.owner).access_token
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}', 'secure': True}
+
+
+class ShopQueryBudgetTests(TenantAPITestCase):
+    def add_branches(self, count=12):
+        for i in range(count):
+            Branch.objects.create(shop=self.shop, name=f'Branch {i}')
+
+    def test_shops(self):
+        response = self.assertWithinBudget(ShopViewSet, 'list', '/api/shops/shops/', **self.auth())
+        self.assertEqual(len(response.json()['results'][0]['branches']), 2)
+        self.assertWithinBudget(ShopViewSet, 'retrieve', f'/api/shops/shops/{self.shop.pk}/', **self.auth())
+        self.assertConstantQueries('/api/shops/shops/', self.add_branches, **self.auth())
+
+    def test_branches(self):
+        self.assertWithinBudget(BranchViewSet, 'list', '/api/shops/branches/', **self.auth())
+        self.assertWithinBudget(BranchViewSet, 'retrieve', f'/api/shops/branches/{self.branches[0].pk}/', **self.auth())
+        self.assertConstantQueries('/api/shops/branches/', self.add_branches, **self.auth())
+
+    def test_settings(self):
+        self.assertWithinBudget(ShopSettingsViewSet, 'list', '/api/shops/settings/', **self.auth())
+        self.assertWithinBudget(
+            ShopSettingsViewSet, 'retrieve', f'/api/shops/settings/{self.shop.settings.pk}/', **self.auth()
+        )
+
+    def test_over_budget(self):
+        url = '/api/shops/branches/'
+        with mock.patch.dict(BranchViewSet.query_budget, {'list': 1}):
+            with override_settings(QUERY_BUDGET_STRICT=True), self.assertRaises(QueryBudgetExceeded):
+                self.client.get(url, **self.auth())
+            with override_settings(QUERY_BUDGET_STRICT=False), self.assertLogs('shops.query_budget', 'WARNING'):
+                self.assertEqual(self.client.get(url, **self.auth()).status_code, 200)
+
+
+class TenantTests(TenantAPITestCase):
+    def shop_queries(self, queries):
+        """Loads of the shop row (a subscription state miss and owner dashboards also read shops_shop)."""
+        return [q for q in queries if q['sql'].startswith('SELECT "shops_shop"."id", "shops_shop"."owner_id"')]
+
+    def test_shop_resolved_once_per_request(self):
+        # The subscription gate, the view and the context processors all read request.tenant
+        self.client.force_login(self.owner)
+        for url in ('/sales/list/', '/sales/pos/', '/dashboard/'):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, secure=True)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(len(self.shop_queries(queries)), 1, url)
+
+    def test_shop_resolved_once_per_api_request(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/sales/sales/', **self.auth())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.shop_queries(queries)), 1)
+
+    def test_tenant_follows_the_user(self):
+        # DRF authenticates token requests after TenantMiddleware has run
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        self.assertIsNone(get_tenant(request).shop)
+        request.user = self.owner
+        tenant = get_tenant(request)
+        self.assertEqual(tenant.shop, self.shop)
+        self.assertIs(get_tenant(request), tenant)
+        self.assertEqual(tenant.branch, self.branches[0])
+
+
+class StorefrontCacheTests(TestCase):
+    url = '/store/corner-shop/'
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = get_user_model().objects.create_user(username='owner', password='pass1234!x', role='OWNER')
+        cls.shop = Shop.objects.create(owner=owner, name='Corner Shop', slug='corner-shop', public_visibility=True)
+        cls.product = Product.objects.create(shop=cls.shop, name='Soda', selling_price=1500)
+        cls.hidden = Product.objects.create(shop=cls.shop, name='Wholesale Soda', selling_price=900, is_public=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url=None):
+        return self.client.get(url or self.url, secure=True)
+
+    def test_hits_are_served_from_the_cache(self):
+        self.assertContains(self.get(), '1500')
+        with self.assertNumQueries(0):
+            response = self.get(self.url + '?utm_source=whatsapp')
+        self.assertContains(response, '1500')
+        self.assertIn('stale-while-revalidate', response['Cache-Control'])
+
+    def test_public_changes_invalidate(self):
+        self.get()
+        self.product.selling_price = 1800
+        self.product.save()
+        self.assertContains(self.get(), '1800')
+
+        self.shop.public_visibility = False
+        self.shop.save()
+        self.assertEqual(self.get().status_code, 404)
+
+    def test_private_changes_keep_the_cache(self):
+        self.get()
+        self.hidden.selling_price = 950
+        self.hidden.save()
+        with self.assertNumQueries(0):
+            self.get()
+
+    def test_stale_page_while_another_request_renders(self):
+        self.get()
+        self.product.selling_price = 1800
+        self.product.save()
+        cache.add(storefront.LOCK_PREFIX + storefront.page_key('corner-shop', {}), 1)
+        with self.assertNumQueries(0):
+            self.assertContains(self.get(), '1500')
+
+    def test_prerender(self):
+        with tempfile.TemporaryDirectory() as output:
+            call_command('prerender_storefronts', output=output, stdout=io.StringIO())
+            html = (Path(output) / 'store' / 'corner-shop' / 'index.html').read_text()
+        self.assertIn('1500', html)
+        self.assertNotIn('Wholesale', html)
+        with self.assertNumQueries(0):
+            self.get()
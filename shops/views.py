@@ -1,22 +1,29 @@
 from rest_framework import viewsets, permissions
 from .models import Shop, Branch, ShopSettings
 from .serializers import ShopSerializer, BranchSerializer, ShopSettingsSerializer
+from users.role_permissions import HasModulePermission
+from .query_budget import QueryBudgetMixin
 
-class ShopViewSet(viewsets.ModelViewSet):
+class ShopViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 4, 'retrieve': 3}
     serializer_class = ShopSerializer
 
     def get_queryset(self):
         user = self.request.user
+        # Nested settings and branches
+        shops = Shop.objects.select_related('settings').prefetch_related('branches')
         if getattr(user, 'role', None) == 'SUPER_ADMIN' or user.is_superuser:
-            return Shop.objects.all()
-        return Shop.objects.filter(owner=user)
+            return shops.all()
+        return shops.filter(owner=user)
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
-class BranchViewSet(viewsets.ModelViewSet):
-    permission_classes = [permissions.IsAuthenticated]
+class BranchViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    permission_module = 'branches'
+    query_budget = {'list': 3, 'retrieve': 2}
     serializer_class = BranchSerializer
 
     def get_queryset(self):
@@ -25,8 +32,10 @@ class BranchViewSet(viewsets.ModelViewSet):
             return Branch.objects.all()
         return Branch.objects.filter(shop__owner=user)
 
-class ShopSettingsViewSet(viewsets.ModelViewSet):
-    permission_classes = [permissions.IsAuthenticated]
+class ShopSettingsViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    permission_module = 'settings'
+    query_budget = {'list': 3, 'retrieve': 2}
     serializer_class = ShopSettingsSerializer
 
     def get_queryset(self):
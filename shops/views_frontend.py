@@ -36,14 +36,7 @@ class ShopCreateView(LoginRequiredMixin, View):
         return render(request, 'shops/create.html', {'form': form})
 class BranchListView(LoginRequiredMixin, View):
     def get(self, request):
-        shop = None
-        if getattr(request.user, 'shop', None):
-            shop = request.user.shop
-        elif hasattr(request.user, 'shops') and request.user.shops.exists():
-            shop = request.user.shops.first()
-        elif hasattr(request.user, 'employee_profile'):
-            shop = request.user.employee_profile.shop
-            
+        shop = request.tenant.shop
         if not shop:
              # Redirect to shop creation if no shop exists
              return redirect('shop_create')
@@ -53,12 +46,7 @@ class BranchListView(LoginRequiredMixin, View):
         return render(request, 'shops/branch_list.html', {'branches': branches, 'form': form, 'shop': shop})
 
     def post(self, request):
-        shop = None
-        if hasattr(request.user, 'shops') and request.user.shops.exists():
-            shop = request.user.shops.first()
-        elif hasattr(request.user, 'employee_profile'):
-            shop = request.user.employee_profile.shop
-
+        shop = request.tenant.owned_shop # Only owners add branches
         if not shop:
              messages.error(request, "No shop found.")
              return redirect('dashboard')
@@ -69,17 +57,7 @@ class BranchListView(LoginRequiredMixin, View):
             branch.shop = shop
             # Handle Single Main Branch logic optional: if new one is main, demote others?
             # For simplicity, we just save.
-            branch.save()
-            
-            # AUTOMATICALLY INIT STOCK FOR THIS NEW BRANCH?
-            # If we want products to be available here, we should create 0 stock entries for all existing products.
-            from inventory.models import Product, Stock
-            products = Product.objects.filter(shop=shop)
-            stock_objects = [
-                Stock(product=p, branch=branch, quantity=0) 
-                for p in products
-            ]
-            Stock.objects.bulk_create(stock_objects)
+            branch.save() # 0 stock entries for all existing products are created by inventory.signals
 
             messages.success(request, "Branch created successfully!")
             return redirect('branch_list')
@@ -93,13 +71,7 @@ class ShopSettingsView(LoginRequiredMixin, View):
     template_name = 'shops/settings.html'
 
     def get_shop(self, request):
-        if getattr(request.user, 'shop', None):
-            return request.user.shop
-        elif hasattr(request.user, 'shops') and request.user.shops.exists():
-            return request.user.shops.first()
-        elif hasattr(request.user, 'employee_profile'):
-            return request.user.employee_profile.shop
-        return None
+        return request.tenant.shop
 
     def get(self, request):
         shop = self.get_shop(request)
@@ -1,17 +1,26 @@
 from django.views.generic import ListView
 from django.shortcuts import get_object_or_404
 from .models import Shop
-from inventory.models import Product, Stock
+from . import storefront
+from inventory.models import Product
 
 class PublicShopView(ListView):
+    """Public storefront, served from the full-page cache (shops.storefront)."""
     model = Product
     template_name = 'shops/public_store.html'
     context_object_name = 'products'
     paginate_by = 20
 
+    def get(self, request, *args, **kwargs):
+        def render():
+            return super(PublicShopView, self).get(request, *args, **kwargs)
+        return storefront.cached_page(self.kwargs['slug'], request.GET, render)
+
     def get_queryset(self):
-        self.shop = get_object_or_404(Shop, slug=self.kwargs['slug'], public_visibility=True)
-        return Product.objects.filter(shop=self.shop, is_public=True)
+        self.shop = get_object_or_404(
+            Shop.objects.select_related('settings'), slug=self.kwargs['slug'], public_visibility=True
+        )
+        return Product.objects.filter(shop=self.shop, is_public=True).order_by('pk')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
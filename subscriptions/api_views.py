@@ -1,5 +1,6 @@
 from rest_framework import views, permissions, response, serializers
-from .models import SubscriptionPlan
+from shops.conditional import ConditionalGetMixin, get_version
+from .models import SubscriptionPlan, PLANS_VERSION
 
 class SubscriptionPlanSerializer(serializers.ModelSerializer):
     price_display = serializers.SerializerMethodField()
@@ -47,8 +48,13 @@ class SubscriptionPlanSerializer(serializers.ModelSerializer):
         cycle_label = cycle_labels.get(cycle, cycle.title())
         return f"{price:,.0f} / {cycle_label}"
 
-class SubscriptionPlanListView(views.APIView):
+class SubscriptionPlanListView(ConditionalGetMixin, views.APIView):
     permission_classes = [permissions.AllowAny] # Publicly accessible for landing page 
+    cache_control = {'public': True, 'max_age': 60}
+    per_user = False
+
+    def get_validators(self):
+        return (get_version(PLANS_VERSION),), None
 
     def get(self, request):
         # Exclude Free Trial (case insensitive)
@@ -77,12 +83,7 @@ class SubscriptionStatusAPIView(views.APIView):
 
     def get(self, request):
         # Determine Shop
-        shop = None
-        if hasattr(request.user, 'shops') and request.user.shops.exists():
-            shop = request.user.shops.first()
-        elif hasattr(request.user, 'shop') and request.user.shop:
-            shop = request.user.shop
-            
+        shop = request.tenant.shop
         if not shop:
              return response.Response({'error': 'No shop associated'}, status=404)
         
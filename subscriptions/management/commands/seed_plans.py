@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
-from subscriptions.models import SubscriptionPlan
+from shops.conditional import bump_version
+from subscriptions.models import SubscriptionPlan, PLANS_VERSION
 
 class Command(BaseCommand):
     help = 'Seeds default subscription plans'
@@ -55,6 +56,7 @@ class Command(BaseCommand):
             self.stdout.write("Plans already exist. Checking active status...")
             updated = SubscriptionPlan.objects.filter(is_active=False).update(is_active=True)
             if updated > 0:
+                 bump_version(PLANS_VERSION) # update() skips the plan signals
                  self.stdout.write(self.style.SUCCESS(f'Activated {updated} existing plans.'))
             else:
                  self.stdout.write(self.style.SUCCESS('Plans are already set up.'))
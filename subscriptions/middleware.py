@@ -1,12 +1,38 @@
+import re
 from django.shortcuts import redirect
-from django.urls import reverse
-from django.utils import timezone
-from shops.models import Shop
-from .models import ShopSubscription
+from django.urls import reverse, NoReverseMatch
+
+# Explicitly Allowed Paths (Whitelist)
+ALLOWED_URL_NAMES = [
+    'dashboard',        # Main Dashboard
+    'shop_pricing',     # Pricing Page
+]
+ALLOWED_PREFIXES = [
+    '/subscriptions/',           # Payment processing
+    '/admin/',                   # Admin panel
+    '/static/',                  # Assets
+    '/media/',                   # Media
+    '/accounts/',                # Auth
+    '/api/auth/',                # Public APIs
+    '/api/pricing/',
+    '/api/donations/',
+]
+
+def compile_allowed_paths():
+    """One regex matching any path that starts with an allowed prefix."""
+    prefixes = [reverse(name) for name in ALLOWED_URL_NAMES] + ALLOWED_PREFIXES
+    return re.compile('|'.join(re.escape(prefix) for prefix in prefixes))
 
 class SubscriptionMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        # Compiled once at startup instead of reversing URLs on every request
+        try:
+            self.allowed_paths = compile_allowed_paths()
+        except NoReverseMatch:
+            # If reverse() fails we might be in trouble, but crashing the whole site
+            # is worse: fail open (allow access) to prevent a 500 loop.
+            self.allowed_paths = None
 
     def __call__(self, request):
         if not request.user.is_authenticated:
@@ -16,54 +42,21 @@ class SubscriptionMiddleware:
         if request.user.is_superuser:
             return self.get_response(request)
 
-        # Explicitly Allowed Paths (Whitelist)
-        try:
-            allowed_paths = [
-                reverse('dashboard'),        # Main Dashboard
-                reverse('shop_pricing'),     # Pricing Page
-                '/subscriptions/',           # Payment processing
-                '/admin/',                   # Admin panel
-                '/static/',                  # Assets
-                '/media/',                   # Media
-                '/accounts/',                # Auth
-                '/api/auth/',                # Public APIs
-                '/api/pricing/',             
-                '/api/donations/',           
-            ]
-            
-            # Check if current path is allowed
-            if any(request.path.startswith(path) for path in allowed_paths):
-                return self.get_response(request)
-        except Exception:
-            # Fallback: if reverse() fails, we might be in trouble, 
-            # but crashing the whole site is worse. 
-            # We could return get_response(request) to fail open, or log it.
-            # Let's fail open (allow access) to prevent 500 loop.
+        # Check if current path is allowed
+        if self.allowed_paths is None or self.allowed_paths.match(request.path):
             return self.get_response(request)
 
-        # Check User's Shop Subscription
+        # Check User's Shop Subscription (cached per shop, see subscriptions.state)
         try:
-            shop = None
-            if getattr(request.user, 'shop', None):
-                shop = request.user.shop
-            elif hasattr(request.user, 'shops') and request.user.shops.exists():
-                shop = request.user.shops.first()
-            elif hasattr(request.user, 'employee_profile'):
-                shop = request.user.employee_profile.shop
-
-            if shop:
-                # 1. Check if DB Subscription exists and is valid
-                if hasattr(shop, 'subscription') and shop.subscription.is_valid():
-                    return self.get_response(request)
-                
-                # 2. Fallback: Registration Date Trial Logic
-                days_since_reg = (timezone.now() - shop.created_at).days
-                if days_since_reg < 7:
+            tenant = request.tenant
+            if tenant.shop_id:
+                # Valid DB subscription, or still in the registration date trial
+                if tenant.has_access:
                     return self.get_response(request)
-                
-                # 3. If neither valid sub nor trial -> BLOCK
+
+                # If neither valid sub nor trial -> BLOCK
                 return redirect('shop_pricing')
-                
+
         except Exception:
             # Safer to allow access if error occurs to avoid total lockout during bugs
             pass
@@ -2,6 +2,8 @@ from django.db import models
 from django.utils import timezone
 from shops.models import Shop
 
+# shops.conditional version of the plan lists, bumped on every plan write (subscriptions.signals)
+PLANS_VERSION = 'subscription-plans'
 
 class SubscriptionPlan(models.Model):
     name = models.CharField(max_length=100) # e.g. Free, Starter, Pro
@@ -48,6 +50,7 @@ class ShopSubscription(models.Model):
         ('CANCELLED', 'Cancelled'),
         ('TRIAL', 'Trial'),
     ]
+    VALID_STATUSES = ('ACTIVE', 'TRIAL')
     
     CYCLE_CHOICES = [
         ('DAILY', 'Daily'),
@@ -73,7 +76,7 @@ class ShopSubscription(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def is_valid(self):
-        return self.status in ['ACTIVE', 'TRIAL'] and self.end_date > timezone.now()
+        return self.status in self.VALID_STATUSES and self.end_date > timezone.now()
 
     def __str__(self):
         return f"{self.shop.name} - {self.plan.name} ({self.status})"
@@ -1,7 +1,10 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from shops.models import Shop
-from .models import ShopSubscription, SubscriptionPlan
+from .models import ShopSubscription, SubscriptionPlan, SubscriptionPayment, PLANS_VERSION
+from shops.conditional import bump_version
+from . import state
 from django.utils import timezone
 from datetime import timedelta
 
@@ -46,3 +49,28 @@ def create_shop_subscription(sender, instance, created, **kwargs):
         settings.plan = 'TRIAL'
         settings.trial_ends_at = subscription.end_date
         settings.save()
+
+@receiver(post_save, sender=ShopSubscription)
+@receiver(post_delete, sender=ShopSubscription)
+def invalidate_subscription_state(sender, instance, **kwargs):
+    """
+    Drop the cached subscription state of the shop, now and again once the
+    transaction commits (a request may re-cache the old row in between).
+    """
+    shop_id = instance.shop_id
+    state.invalidate(shop_id)
+    transaction.on_commit(lambda: state.invalidate(shop_id))
+
+@receiver(post_save, sender=SubscriptionPayment)
+def invalidate_subscription_state_on_payment(sender, instance, **kwargs):
+    shop_id = ShopSubscription.objects.filter(pk=instance.subscription_id).values_list('shop_id', flat=True).first()
+    if shop_id:
+        state.invalidate(shop_id)
+        transaction.on_commit(lambda: state.invalidate(shop_id))
+
+@receiver(post_save, sender=SubscriptionPlan)
+@receiver(post_delete, sender=SubscriptionPlan)
+def bump_plans_version(sender, instance, **kwargs):
+    """Plan lists answer conditional GETs from this version (SubscriptionPlanListView, PricingAPIView)."""
+    bump_version(PLANS_VERSION)
+    transaction.on_commit(lambda: bump_version(PLANS_VERSION))
@@ -0,0 +1,98 @@
+"""
+Cached subscription state, read by SubscriptionMiddleware and the
+subscription_status context processor on every page.
+
+Each shop gets a compact SubscriptionState (subscription expiry and trial end as
+timestamps) held in a small in-process LRU in front of Django's cache. Validity is
+evaluated against the clock on every read, so a cached state turns invalid on its
+own at end_date; entries also drop out of the shared cache at that moment.
+ShopSubscription and SubscriptionPayment saves invalidate the shop's entry
+(see subscriptions.signals). With a shared cache backend other processes pick the
+change up when their local copy expires, after at most LOCAL_TTL seconds;
+with the default per-process cache, after at most CACHE_TTL.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+from django.core.cache import cache
+from shops.models import Shop
+from .models import ShopSubscription
+
+TRIAL_DAYS = 7 # Access from the shop's registration date, with or without a subscription
+CACHE_PREFIX = 'subscriptions:state:'
+CACHE_TTL = 5 * 60 # Upper bound (bounds staleness with a per-process cache); dropped earlier when the state flips
+LOCAL_SIZE = 2048
+LOCAL_TTL = 30
+
+
+class SubscriptionState(namedtuple('SubscriptionState', 'expires_at trial_ends_at')):
+    """Epoch seconds: end of the valid (active/trial) subscription, 0 if none, and end of the registration trial."""
+    __slots__ = ()
+
+    def is_valid(self, now=None):
+        now = time.time() if now is None else now
+        return now < self.expires_at or now < self.trial_ends_at
+
+    def changes_in(self, now=None):
+        """Seconds until is_valid() next changes (None if it never will)."""
+        now = time.time() if now is None else now
+        upcoming = [at - now for at in self if at > now]
+        return min(upcoming) if upcoming else None
+
+
+def build_state(created_at, status=None, end_date=None):
+    valid = status in ShopSubscription.VALID_STATUSES and end_date is not None
+    return SubscriptionState(
+        end_date.timestamp() if valid else 0,
+        (created_at + timedelta(days=TRIAL_DAYS)).timestamp()
+    )
+
+
+_local = OrderedDict() # shop_id -> (state, local expiry)
+_lock = threading.Lock()
+
+
+def _remember(shop_id, state, now):
+    with _lock:
+        _local[shop_id] = (state, now + LOCAL_TTL)
+        _local.move_to_end(shop_id)
+        while len(_local) > LOCAL_SIZE:
+            _local.popitem(last=False)
+
+
+def get_state(shop_id):
+    """
+    SubscriptionState of a shop (None if it doesn't exist): in-process LRU,
+    then Django's cache, then one query.
+    """
+    now = time.time()
+    with _lock:
+        entry = _local.get(shop_id)
+        if entry and entry[1] > now:
+            _local.move_to_end(shop_id)
+            return entry[0]
+
+    key = CACHE_PREFIX + str(shop_id)
+    cached = cache.get(key)
+    if cached is not None:
+        state = SubscriptionState(*cached)
+    else:
+        row = Shop.objects.filter(pk=shop_id).values_list(
+            'created_at', 'subscription__status', 'subscription__end_date'
+        ).first()
+        if row is None:
+            return None
+        state = build_state(*row)
+        timeout = state.changes_in(now)
+        timeout = CACHE_TTL if timeout is None else min(CACHE_TTL, max(1, int(timeout) + 1))
+        cache.set(key, tuple(state), timeout)
+
+    _remember(shop_id, state, now)
+    return state
+
+
+def invalidate(shop_id):
+    with _lock:
+        _local.pop(shop_id, None)
+    cache.delete(CACHE_PREFIX + str(shop_id))
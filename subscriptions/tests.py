@@ -1,3 +1,83 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from shops.models import Shop
+from . import state
+from .models import ShopSubscription, SubscriptionPlan
 
-# Create your tests here.
+
+class PlanConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.plan = SubscriptionPlan.objects.create(name='Pro', slug='pro', price_monthly=10000)
+
+    def test_plan_lists(self):
+        for url in ('/api/subscriptions/plans/', '/api/dashboard/pricing/'):
+            first = self.client.get(url, secure=True)
+            self.assertEqual(first.status_code, 200, url)
+            self.assertIn('public', first['Cache-Control'])
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'], secure=True)
+            self.assertEqual(response.status_code, 304, url)
+
+            # Any plan write invalidates the lists
+            self.plan.save()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'], secure=True)
+            self.assertEqual(response.status_code, 200, url)
+
+
+class SubscriptionGateTests(TestCase):
+    url = '/sales/list/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = get_user_model().objects.create_user(username='owner', password='pass1234!x', role='OWNER')
+        cls.shop = Shop.objects.create(owner=cls.owner, name='Gate Shop', slug='gate-shop')
+        # Past the registration trial: access rests on the subscription alone
+        Shop.objects.filter(pk=cls.shop.pk).update(created_at=timezone.now() - timedelta(days=30))
+        cls.subscription = cls.shop.subscription
+        cls.subscription.status = 'ACTIVE'
+        cls.subscription.end_date = timezone.now() + timedelta(days=30)
+        cls.subscription.save()
+
+    def setUp(self):
+        # Both cache layers outlive a test's transaction, and shop ids are reused
+        cache.clear()
+        state._local.clear()
+        self.client.force_login(self.owner)
+
+    def assertBlocked(self):
+        response = self.client.get(self.url, secure=True)
+        self.assertRedirects(response, reverse('shop_pricing'), fetch_redirect_response=False)
+
+    def test_expired_subscription_is_blocked_right_away(self):
+        self.assertEqual(self.client.get(self.url, secure=True).status_code, 200)
+        # The state is cached now: the gate reads no subscription
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.url, secure=True).status_code, 200)
+        self.assertFalse([q for q in queries if 'subscriptions_shopsubscription' in q['sql']])
+
+        self.subscription.status = 'EXPIRED'
+        self.subscription.save()
+        self.assertBlocked()
+
+        # And renewing lets the shop back in on the next request
+        self.subscription.status = 'ACTIVE'
+        self.subscription.save()
+        self.assertEqual(self.client.get(self.url, secure=True).status_code, 200)
+
+    def test_deleted_subscription_is_blocked(self):
+        self.client.get(self.url, secure=True)
+        ShopSubscription.objects.get(pk=self.subscription.pk).delete()
+        self.assertBlocked()
+
+    def test_state_lapses_at_end_date(self):
+        cached = state.get_state(self.shop.pk)
+        end = self.subscription.end_date.timestamp()
+        self.assertTrue(cached.is_valid(now=end - 1))
+        self.assertFalse(cached.is_valid(now=end))
+        self.assertEqual(cached.changes_in(now=end - 60), 60)
@@ -21,7 +21,7 @@ class InitiatePaymentView(LoginRequiredMixin, View):
         if not plan_id or not phone:
             return JsonResponse({'success': False, 'message': 'Missing data'})
 
-        shop = request.user.shops.first()
+        shop = request.tenant.owned_shop
         if not shop:
             return JsonResponse({'success': False, 'message': 'No shop found'})
             
@@ -175,11 +175,12 @@ class SubscriptionStatusAPIView(APIView):
 
         # Check User's Shop
         try:
-            shop = user.shops.first() # related_name='shops'
+            shop = request.tenant.owned_shop
             if shop:
                 # 1. Check DB Subscription
-                if hasattr(shop, 'subscription') and shop.subscription.is_valid():
-                    return Response({'is_valid': True, 'reason': 'active_subscription', 'status': shop.subscription.status})
+                subscription = request.tenant.subscription
+                if subscription and subscription.is_valid():
+                    return Response({'is_valid': True, 'reason': 'active_subscription', 'status': subscription.status})
                 
                 # 2. Check Trial (7 Days)
                 days_since_reg = (timezone.now() - shop.created_at).days
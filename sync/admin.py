@@ -0,0 +1,7 @@
+from django.contrib import admin
+from .models import Tombstone
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ('id', 'shop_id', 'model', 'object_id', 'deleted_at')
+    list_filter = ('model',)
@@ -0,0 +1,182 @@
+"""
+Delta sync for the mobile app: what changed in a shop's catalog, stock and
+customers since the device last synced.
+
+Every synced model has an updated_at (the queryset.update() write paths set it
+explicitly) and deletes leave a Tombstone (sync.signals). A token records, per
+stream, the (updated_at, id) of the last row the device received; the next call
+seeks past it on the (shop, updated_at) indexes, so a reconnecting device
+downloads only what changed. Rows come back columnar (field names once, then
+value lists) in batches of BATCH_SIZE per stream; has_more asks the device to
+call again with the new token.
+
+Positions are held SKEW behind the clock once a stream is caught up, so a row
+written by a transaction that committed late is still picked up; the device
+may receive a few rows twice, which upserts absorb. A token older than
+TOMBSTONE_DAYS (tombstones are pruned after that) gets a full resync instead,
+flagged with reset so the device clears its local copy first.
+"""
+import base64
+import json
+from collections import namedtuple
+from datetime import timedelta
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from shops.models import Branch
+from shops.pagination import seek
+from inventory.models import Category, Product, Stock
+from customers.models import Customer
+from users.role_permissions import can_view_module
+from .models import Tombstone
+
+BATCH_SIZE = 500
+SKEW = timedelta(minutes=5)
+TOMBSTONE_DAYS = 30
+TOKEN_VERSION = 1
+DELETES = 'deletes'
+
+
+def image_url(name):
+    return default_storage.url(name) if name else None
+
+
+# name: stream key in tokens, responses and Tombstone.model
+# module: Role permission module the user needs to view to receive the stream
+# convert: field -> function applied to the raw column value
+Stream = namedtuple('Stream', 'name model module fields convert')
+
+STREAMS = [
+    Stream('categories', Category, 'products', ('id', 'name', 'description'), {}),
+    Stream('products', Product, 'products', (
+        'id', 'category_id', 'name', 'product_type', 'sku', 'barcode', 'cost_price',
+        'selling_price', 'si_unit', 'image', 'is_public'
+    ), {'image': image_url}),
+    Stream('stocks', Stock, 'inventory', ('id', 'product_id', 'branch_id', 'quantity', 'low_stock_threshold'), {}),
+    Stream('customers', Customer, 'clients', (
+        'id', 'name', 'phone', 'email', 'address', 'loyalty_points', 'debt'
+    ), {}),
+]
+STREAMS_BY_MODEL = {stream.model: stream for stream in STREAMS}
+KEY = ('updated_at', 'id')
+DELETES_KEY = ('deleted_at', 'id')
+
+
+def encode_token(positions):
+    raw = json.dumps({'v': TOKEN_VERSION, 'p': positions}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """{stream: [iso timestamp, id]} of a token, or None if it is missing or unusable."""
+    if not token:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        positions = data['p'] if data.get('v') == TOKEN_VERSION else None
+        for timestamp, pk in positions.values():
+            if parse_datetime(timestamp) is None or not isinstance(pk, int):
+                return None
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+    return positions
+
+
+def is_expired(positions, now):
+    horizon = now - timedelta(days=TOMBSTONE_DAYS)
+    return any(parse_datetime(timestamp) < horizon for timestamp, _ in positions.values())
+
+
+def visible_streams(user):
+    return [stream for stream in STREAMS if can_view_module(user, stream.module)]
+
+
+def stream_queryset(stream, shop, branch_ids):
+    if stream.model is Stock:
+        return Stock.objects.filter(branch_id__in=branch_ids)
+    return stream.model.objects.filter(shop=shop)
+
+
+def read_batch(queryset, key, fields, position, limit):
+    """Up to `limit` rows after `position` in key order, and whether more follow."""
+    if position is not None:
+        queryset = queryset.filter(seek(key, position, 'gt'))
+    rows = list(queryset.order_by(*key).values_list(*key, *fields)[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def next_position(rows, more, position, cutoff):
+    """Position after this batch: the last row's key, held back to the cutoff once caught up."""
+    if rows:
+        last = [rows[-1][0], rows[-1][1]]
+        if not more and last[0] > cutoff:
+            last = [cutoff, 0]
+        return [last[0].isoformat(), last[1]]
+    if position is not None:
+        return position
+    return [cutoff.isoformat(), 0]
+
+
+def changes(shop, user, token=None, limit=BATCH_SIZE):
+    """
+    {'token', 'reset', 'has_more', 'upserts': {stream: {'fields', 'rows'}}, 'deletes': {stream: [ids]}}
+    for the streams the user may view. Employees with a branch only get that branch's stock.
+    """
+    now = timezone.now()
+    cutoff = now - SKEW
+    positions = decode_token(token)
+    reset = positions is None or is_expired(positions, now)
+    if reset:
+        positions = {}
+
+    streams = visible_streams(user)
+    if getattr(user, 'role', None) == 'EMPLOYEE' and user.branch_id:
+        branch_ids = [user.branch_id]
+    else:
+        branch_ids = list(Branch.objects.filter(shop=shop).values_list('pk', flat=True))
+
+    result = {'upserts': {}, 'deletes': {}}
+    has_more = False
+    new_positions = {}
+    for stream in streams:
+        position = positions.get(stream.name)
+        rows, more = read_batch(stream_queryset(stream, shop, branch_ids), KEY, stream.fields, position, limit)
+        has_more |= more
+        new_positions[stream.name] = next_position(rows, more, position, cutoff)
+        if rows:
+            result['upserts'][stream.name] = {
+                'fields': stream.fields,
+                'rows': [encode_row(stream, row[len(KEY):]) for row in rows],
+            }
+
+    # A reset device starts from an empty store, so it only needs deletes from now on
+    position = None if reset else positions.get(DELETES)
+    if reset:
+        rows, more = [], False
+    else:
+        tombstones = Tombstone.objects.filter(shop=shop, model__in=[stream.name for stream in streams])
+        rows, more = read_batch(tombstones, DELETES_KEY, ('model', 'object_id'), position, limit)
+    has_more |= more
+    new_positions[DELETES] = next_position(rows, more, position, cutoff)
+    for _, _, model, object_id in rows:
+        result['deletes'].setdefault(model, []).append(object_id)
+
+    result.update(token=encode_token(new_positions), reset=reset, has_more=has_more)
+    return result
+
+
+def encode_row(stream, values):
+    row = []
+    for field, value in zip(stream.fields, values):
+        if field in stream.convert:
+            value = stream.convert[field](value)
+        elif hasattr(value, 'as_tuple'):
+            value = str(value) # Decimal, kept exact
+        row.append(value)
+    return row
+
+
+def prune_tombstones(days=TOMBSTONE_DAYS):
+    """Deletes tombstones older than `days`; devices that far behind get a full resync anyway."""
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
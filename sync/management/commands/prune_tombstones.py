@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from sync.changes import prune_tombstones, TOMBSTONE_DAYS
+
+class Command(BaseCommand):
+    help = 'Deletes old sync tombstones (run daily); devices that have not synced for longer get a full resync'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=TOMBSTONE_DAYS, help='Keep tombstones of the last N days')
+
+    def handle(self, *args, **options):
+        count = prune_tombstones(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {count} tombstone(s).'))
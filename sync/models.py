@@ -0,0 +1,19 @@
+from django.db import models
+from django.utils import timezone
+from shops.models import Shop
+
+class Tombstone(models.Model):
+    """A deleted synced row, so devices drop it on their next delta sync (see sync.changes)."""
+    # No FK constraint: rows deleted along with their shop still leave a tombstone
+    shop = models.ForeignKey(Shop, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    model = models.CharField(max_length=30) # Stream name: 'products', 'stocks', ...
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['shop', 'deleted_at'], name='sync_tombstone_shop_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,35 @@
+"""
+Tombstones for deleted synced rows (see sync.changes).
+Stock rows are recorded in bulk when their product or branch is about to be
+deleted rather than with a Stock post_delete receiver, which would stop Django
+from fast-deleting them.
+"""
+from django.db.models.signals import pre_delete, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from shops.models import Branch
+from inventory.models import Category, Product, Stock
+from customers.models import Customer
+from .changes import STREAMS_BY_MODEL
+from .models import Tombstone
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Customer)
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(shop_id=instance.shop_id, model=STREAMS_BY_MODEL[sender].name, object_id=instance.pk)
+
+@receiver(pre_delete, sender=Product)
+@receiver(pre_delete, sender=Branch)
+def record_stock_tombstones(sender, instance, **kwargs):
+    field = 'product' if sender is Product else 'branch'
+    now = timezone.now()
+    Tombstone.objects.bulk_create([
+        Tombstone(shop_id=instance.shop_id, model=STREAMS_BY_MODEL[Stock].name, object_id=pk, deleted_at=now)
+        for pk in Stock.objects.filter(**{field: instance}).values_list('pk', flat=True)
+    ])
+
+@receiver(pre_delete, sender=Category)
+def touch_category_products(sender, instance, **kwargs):
+    # Deleting the category nulls Product.category with an UPDATE that skips auto_now
+    Product.objects.filter(category=instance).update(updated_at=timezone.now())
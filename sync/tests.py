@@ -0,0 +1,44 @@
+from datetime import timedelta
+from django.utils import timezone
+from inventory.models import Category, Product, Stock
+from shops.tests import TenantAPITestCase
+from .views import SyncChangesAPIView
+
+
+class SyncChangesTests(TenantAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        category = Category.objects.create(shop=cls.shop, name='Drinks')
+        cls.products = [
+            Product.objects.create(shop=cls.shop, category=category, name=f'Product {i}', sku=f'SKU-{i}', selling_price=100, cost_price=50)
+            for i in range(3)
+        ]
+
+    def settle(self):
+        # Move every row out of the SKEW window, as if the last writes were a while ago
+        earlier = timezone.now() - timedelta(minutes=10)
+        for model in (Category, Product, Stock):
+            model.objects.update(updated_at=earlier)
+
+    def test_full_then_delta(self):
+        self.settle()
+        full = self.assertWithinBudget(SyncChangesAPIView, 'get', '/api/sync/changes/', **self.auth()).json()
+        self.assertTrue(full['reset'])
+        self.assertEqual(len(full['upserts']['products']['rows']), 3)
+        self.assertEqual(len(full['upserts']['stocks']['rows']), 6)
+
+        quiet = self.client.get(f"/api/sync/changes/?since={full['token']}", **self.auth()).json()
+        self.assertEqual((quiet['reset'], quiet['upserts'], quiet['deletes']), (False, {}, {}))
+
+        product = self.products[0]
+        product.selling_price = 120
+        product.save()
+        deleted_pk = self.products[1].pk
+        self.products[1].delete()
+        delta = self.assertWithinBudget(
+            SyncChangesAPIView, 'get', f"/api/sync/changes/?since={quiet['token']}", **self.auth()
+        ).json()
+        self.assertEqual([row[0] for row in delta['upserts']['products']['rows']], [product.pk])
+        self.assertEqual(delta['deletes']['products'], [deleted_pk])
+        self.assertEqual(len(delta['deletes']['stocks']), 2)
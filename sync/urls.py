@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import SyncChangesAPIView
+
+urlpatterns = [
+    path('changes/', SyncChangesAPIView.as_view(), name='api_sync_changes'),
+]
@@ -0,0 +1,22 @@
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from shops.query_budget import QueryBudgetMixin
+from .changes import changes
+
+@method_decorator(gzip_page, name='dispatch')
+class SyncChangesAPIView(QueryBudgetMixin, APIView):
+    """
+    GET ?since=<token>: upserts and deletes since the token (no token: everything).
+    Call again with the returned token while has_more is true.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'get': 8}
+
+    def get(self, request):
+        shop = request.tenant.shop
+        if not shop:
+            return Response({'error': 'No shop associated'}, status=400)
+        return Response(changes(shop, request.user, request.query_params.get('since')))
@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-17 23:40
+
+from django.db import migrations, models
+
+UPPER_INDEXES = {
+    'users_user_username_upper_idx': 'username',
+    'users_user_email_upper_idx': 'email',
+}
+
+
+def create_upper_indexes(apps, schema_editor):
+    # Owner search of the superuser directory (dashboard.crm.prefix_filter), see shops 0005
+    vendor = schema_editor.connection.vendor
+    if vendor not in ('sqlite', 'postgresql'):
+        return
+    opclass = ' text_pattern_ops' if vendor == 'postgresql' else ''
+    for name, column in UPPER_INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON users_customuser (UPPER({column}){opclass})')
+
+
+def drop_upper_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        for name in UPPER_INDEXES:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_remove_role_description_role_shop_alter_role_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['phone'], name='users_user_phone_idx'),
+        ),
+        migrations.RunPython(create_upper_indexes, drop_upper_indexes),
+    ]
@@ -17,6 +17,13 @@ class CustomUser(AbstractUser):
     branch = models.ForeignKey('shops.Branch', on_delete=models.SET_NULL, null=True, blank=True, related_name='employees')
     commission_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0.00, help_text="Commission percentage (e.g. 5.00 for 5%)")
     
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Owner search of the superuser directory (dashboard.crm). The username
+            # and email prefix indexes are on UPPER(), created by migration 0009.
+            models.Index(fields=['phone'], name='users_user_phone_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if self.is_superuser:
             self.role = self.Role.SUPER_ADMIN
@@ -0,0 +1,134 @@
+"""
+Role permission engine.
+
+Role.permissions ({'sales': ['view', 'create'], ...}) is compiled once into a
+frozen set of (module, action) pairs and cached by role id, tagged with the
+role's updated_at: a small in-process LRU in front of Django's cache. Saving or
+deleting a role drops only that role's entry (see users.signals). Owners and
+superusers get ALL.
+
+The sidebar tags (users.templatetags.permission_tags) and the DRF permission
+class HasModulePermission both read these sets, so a permission check is a set
+lookup with no queries on a cache hit.
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import cache
+from rest_framework import permissions
+from .models import Role
+
+CACHE_PREFIX = 'users:role-permissions:'
+CACHE_TTL = 5 * 60 # Upper bound on staleness with a per-process cache backend
+LOCAL_SIZE = 1024
+LOCAL_TTL = 30
+
+EMPTY = frozenset()
+
+
+class AllPermissions:
+    """Owners and superusers: every (module, action) pair."""
+    def __contains__(self, item):
+        return True
+
+    def __bool__(self):
+        return True
+
+ALL = AllPermissions()
+
+
+def compile_permissions(permissions_json):
+    """{'Sales': ['view', 'edit']} -> frozenset({('sales', 'view'), ('sales', 'edit')})"""
+    if not isinstance(permissions_json, dict):
+        return EMPTY
+    return frozenset(
+        (str(module).lower(), str(action).lower())
+        for module, actions in permissions_json.items()
+        if isinstance(actions, (list, tuple))
+        for action in actions
+    )
+
+
+_local = OrderedDict() # role_id -> (updated_at timestamp, compiled set, local expiry)
+_lock = threading.Lock()
+
+
+def role_permissions(role_id, role=None):
+    """
+    Compiled permission set of a role: in-process LRU, then Django's cache, then
+    one query. With a loaded `role`, cached entries of another updated_at are ignored.
+    """
+    now = time.time()
+    version = role.updated_at.timestamp() if role is not None else None
+    with _lock:
+        entry = _local.get(role_id)
+        if entry and entry[2] > now and version in (None, entry[0]):
+            _local.move_to_end(role_id)
+            return entry[1]
+
+    key = CACHE_PREFIX + str(role_id)
+    cached = cache.get(key)
+    if cached is not None and version in (None, cached[0]):
+        version, compiled = cached[0], frozenset(cached[1])
+    else:
+        if role is None:
+            row = Role.objects.filter(pk=role_id).values_list('updated_at', 'permissions').first()
+            if row is None:
+                return EMPTY
+            updated_at, permissions_json = row
+        else:
+            updated_at, permissions_json = role.updated_at, role.permissions
+        version, compiled = updated_at.timestamp(), compile_permissions(permissions_json)
+        cache.set(key, (version, tuple(compiled)), CACHE_TTL)
+
+    with _lock:
+        _local[role_id] = (version, compiled, now + LOCAL_TTL)
+        _local.move_to_end(role_id)
+        while len(_local) > LOCAL_SIZE:
+            _local.popitem(last=False)
+    return compiled
+
+
+def invalidate_role(role_id):
+    with _lock:
+        _local.pop(role_id, None)
+    cache.delete(CACHE_PREFIX + str(role_id))
+
+
+def user_permissions(user):
+    """ALL for superusers and owners, the assigned role's set for employees, else EMPTY."""
+    if not user.is_authenticated:
+        return EMPTY
+    if user.is_superuser or user.role == 'OWNER':
+        return ALL
+    if user.role == 'EMPLOYEE' and user.assigned_role_id:
+        return role_permissions(user.assigned_role_id)
+    return EMPTY
+
+
+def has_module_permission(user, module, action='view'):
+    return (module.lower(), action) in user_permissions(user)
+
+
+def can_view_module(user, module):
+    """Any action at all on the module (what the sidebar checks)."""
+    perms = user_permissions(user)
+    if perms is ALL:
+        return True
+    module = module.lower()
+    return any(granted == module for granted, _ in perms)
+
+
+class HasModulePermission(permissions.BasePermission):
+    """
+    Enforces Role permissions on API views that set `permission_module`:
+    reads need 'view', POST 'create', PUT/PATCH 'edit' and DELETE 'delete'.
+    """
+    actions = {'POST': 'create', 'PUT': 'edit', 'PATCH': 'edit', 'DELETE': 'delete'}
+
+    def has_permission(self, request, view):
+        module = getattr(view, 'permission_module', None)
+        if module is None:
+            return True
+        action = self.actions.get(request.method, 'view')
+        return has_module_permission(request.user, module, action)
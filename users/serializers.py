@@ -38,9 +38,10 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
     def get_shop_name(self, obj):
-        # Owner -> Shop relationship
-        if hasattr(obj, 'shops') and obj.shops.exists():
-            return [shop.name for shop in obj.shops.all()]
+        # Owner -> Shop relationship (iterated rather than .exists(), so a prefetch is used)
+        shops = [shop.name for shop in obj.shops.all()]
+        if shops:
+            return shops
         # Employee -> Shop relationship
         if hasattr(obj, 'shop') and obj.shop:
              return [obj.shop.name]
@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Role
+from .role_permissions import invalidate_role
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_role_permissions(sender, instance, **kwargs):
+    """
+    Drop the compiled permissions of this role only (RoleUpdateView, the API and
+    the admin all save through here), now and again once the transaction commits.
+    """
+    role_id = instance.pk
+    invalidate_role(role_id)
+    transaction.on_commit(lambda: invalidate_role(role_id))
@@ -1,3 +1,94 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from shops.tests import TenantAPITestCase
+from . import role_permissions
+from .models import Role
+from .views import (
+    RoleListCreateAPIView, RoleDetailAPIView, EmployeeListCreateAPIView, EmployeeDetailAPIView,
+    UserManagementAPIView
+)
 
-# Create your tests here.
+
+class UserQueryBudgetTests(TenantAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.role = Role.objects.create(shop=cls.shop, name='Cashier', permissions={'sales': ['view', 'create']})
+        cls.add_employees(3)
+
+    @classmethod
+    def add_employees(cls, count=12):
+        start = get_user_model().objects.filter(shop=cls.shop).count()
+        for i in range(start, start + count):
+            get_user_model().objects.create_user(
+                username=f'employee{i}', password='pass1234!x', role='EMPLOYEE',
+                shop=cls.shop, branch=cls.branches[i % 2], assigned_role=cls.role
+            )
+
+    def add_roles(self, count=12):
+        Role.objects.bulk_create(Role(shop=self.shop, name=f'Role {i}', permissions={'sales': ['view']}) for i in range(count))
+
+    def test_roles(self):
+        self.assertWithinBudget(RoleListCreateAPIView, 'get', '/api/auth/roles/', **self.auth())
+        self.assertWithinBudget(RoleDetailAPIView, 'get', f'/api/auth/roles/{self.role.pk}/', **self.auth())
+        self.assertConstantQueries('/api/auth/roles/', self.add_roles, **self.auth())
+
+    def test_employees(self):
+        employee = get_user_model().objects.filter(shop=self.shop).first()
+        self.assertWithinBudget(EmployeeListCreateAPIView, 'get', '/api/auth/employees/', **self.auth())
+        self.assertWithinBudget(EmployeeDetailAPIView, 'get', f'/api/auth/employees/{employee.pk}/', **self.auth())
+        self.assertConstantQueries('/api/auth/employees/', self.add_employees, **self.auth())
+
+    def test_user_management(self):
+        admin = get_user_model().objects.create_superuser(username='root', password='pass1234!x', email='root@example.com')
+        response = self.assertWithinBudget(UserManagementAPIView, 'get', '/api/auth/manage/', **self.auth(admin))
+        owner = next(user for user in response.json() if user['username'] == 'owner')
+        self.assertEqual(owner['shop_name'], ['Budget Shop'])
+
+
+class RolePermissionTests(TenantAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.role = Role.objects.create(shop=cls.shop, name='Cashier', permissions={'sales': ['view']})
+        cls.employee = get_user_model().objects.create_user(
+            username='cashier', password='pass1234!x', role='EMPLOYEE',
+            shop=cls.shop, branch=cls.branches[0], assigned_role=cls.role
+        )
+
+    def setUp(self):
+        # Both cache layers outlive a test's transaction, and role ids are reused
+        cache.clear()
+        role_permissions._local.clear()
+
+    def get(self, url):
+        return self.client.get(url, **self.auth(self.employee)).status_code
+
+    def test_employee_without_module_is_forbidden(self):
+        self.assertEqual(self.get('/api/sales/sales/'), 200)
+        self.assertEqual(self.get('/api/inventory/products/'), 403)
+        self.assertEqual(self.get('/api/inventory/stocks/'), 403)
+        # 'view' on sales does not grant 'create'
+        response = self.client.post('/api/sales/sales/', {}, content_type='application/json', **self.auth(self.employee))
+        self.assertEqual(response.status_code, 403)
+
+    def test_role_edit_applies_on_next_request(self):
+        self.assertEqual(self.get('/api/sales/sales/'), 200)
+        self.assertEqual(self.get('/api/inventory/products/'), 403)
+
+        self.role.permissions = {'products': ['view']}
+        self.role.save()
+        self.assertEqual(self.get('/api/sales/sales/'), 403)
+        self.assertEqual(self.get('/api/inventory/products/'), 200)
+
+        self.role.delete()
+        self.assertEqual(self.get('/api/inventory/products/'), 403)
+
+    def test_all_permissions(self):
+        User = get_user_model()
+        self.assertIs(role_permissions.user_permissions(self.owner), role_permissions.ALL)
+        superuser = User.objects.create_superuser(username='root', password='pass1234!x')
+        self.assertIs(role_permissions.user_permissions(superuser), role_permissions.ALL)
+        # The role alone grants nothing, as in the sidebar tags before the engine
+        admin = User.objects.create_user(username='admin', password='pass1234!x', role='SUPER_ADMIN')
+        self.assertIs(role_permissions.user_permissions(admin), role_permissions.EMPTY)
@@ -6,6 +6,8 @@ from rest_framework import status
 from django.db.models import Q
 from rest_framework_simplejwt.views import TokenObtainPairView
 from .models import CustomUser
+from .role_permissions import HasModulePermission
+from shops.query_budget import QueryBudgetMixin
 
 class RegisterView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
@@ -22,8 +24,9 @@ class MeAPIView(APIView):
         serializer = UserSerializer(request.user)
         return Response(serializer.data)
 
-class UserManagementAPIView(APIView):
+class UserManagementAPIView(QueryBudgetMixin, APIView):
     permission_classes = [permissions.IsAdminUser]
+    query_budget = {'get': 3}
 
     def get(self, request):
         if not request.user.is_superuser:
@@ -79,9 +82,11 @@ class UserActionAPIView(APIView):
 from .models import Role
 from .serializers import RoleSerializer, EmployeeSerializer
 
-class RoleListCreateAPIView(generics.ListCreateAPIView):
+class RoleListCreateAPIView(QueryBudgetMixin, generics.ListCreateAPIView):
     serializer_class = RoleSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    permission_module = 'users'
+    query_budget = {'get': 4}
 
     def get_queryset(self):
         user = self.request.user
@@ -91,34 +96,27 @@ class RoleListCreateAPIView(generics.ListCreateAPIView):
         if user.is_superuser:
              return Role.objects.all()
         
-        # Owner
-        if hasattr(user, 'shops') and user.shops.exists():
-            return Role.objects.filter(shop=user.shops.first())
-            
-        # Employee
-        if hasattr(user, 'shop') and user.shop:
-            return Role.objects.filter(shop=user.shop)
+        # Owner's or Employee's shop
+        shop = self.request.tenant.shop
+        if shop:
+            return Role.objects.filter(shop=shop)
             
         return Role.objects.none()
 
     def perform_create(self, serializer):
         user = self.request.user
-        shop = None
-        
-        if hasattr(user, 'shops') and user.shops.exists():
-            shop = user.shops.first()
-        elif hasattr(user, 'shop') and user.shop:
-            shop = user.shop
-            
+        shop = self.request.tenant.shop
         if not shop and not user.is_superuser:
             from rest_framework.exceptions import ValidationError
             raise ValidationError({"shop": "You must be associated with a shop to create a role."})
             
         serializer.save(shop=shop)
 
-class RoleDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class RoleDetailAPIView(QueryBudgetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = RoleSerializer
-    permission_classes = [permissions.IsAuthenticated] # Changed from Admin to Authenticated (Owner)
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission] # Changed from Admin to Authenticated (Owner)
+    permission_module = 'users'
+    query_budget = {'get': 3}
 
     def get_queryset(self):
         user = self.request.user
@@ -128,19 +126,18 @@ class RoleDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
         if user.is_superuser:
             return Role.objects.all()
 
-        # Owner
-        if hasattr(user, 'shops') and user.shops.exists():
-            return Role.objects.filter(shop=user.shops.first())
-            
-        # Employee
-        if hasattr(user, 'shop') and user.shop:
-            return Role.objects.filter(shop=user.shop)
+        # Owner's or Employee's shop
+        shop = self.request.tenant.shop
+        if shop:
+            return Role.objects.filter(shop=shop)
             
         return Role.objects.none()
 
-class EmployeeListCreateAPIView(generics.ListCreateAPIView):
+class EmployeeListCreateAPIView(QueryBudgetMixin, generics.ListCreateAPIView):
     serializer_class = EmployeeSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    permission_module = 'users'
+    query_budget = {'get': 4}
 
     def get_queryset(self):
         user = self.request.user
@@ -148,29 +145,29 @@ class EmployeeListCreateAPIView(generics.ListCreateAPIView):
             return CustomUser.objects.none()
             
         # If Owner, return their employees
-        if hasattr(user, 'shops') and user.shops.exists():
-            shop = user.shops.first()
+        shop = self.request.tenant.owned_shop
+        if shop:
             return CustomUser.objects.filter(shop=shop, role='EMPLOYEE')
             
         return CustomUser.objects.none()
 
     def perform_create(self, serializer):
-        user = self.request.user
-        if hasattr(user, 'shops') and user.shops.exists():
-            shop = user.shops.first()
+        shop = self.request.tenant.owned_shop
+        if shop:
             serializer.save(shop=shop, role='EMPLOYEE')
         else:
             # Fallback or error?
             serializer.save(role='EMPLOYEE')
 
-class EmployeeDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class EmployeeDetailAPIView(QueryBudgetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = EmployeeSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    permission_module = 'users'
+    query_budget = {'get': 3}
 
     def get_queryset(self):
         # Ensure owners can only edit their own employees
-        user = self.request.user
-        if hasattr(user, 'shops') and user.shops.exists():
-            shop = user.shops.first()
+        shop = self.request.tenant.owned_shop
+        if shop:
             return CustomUser.objects.filter(shop=shop, role='EMPLOYEE')
         return CustomUser.objects.none()
@@ -56,20 +56,14 @@ def custom_logout_view(request):
 
 class RoleListView(LoginRequiredMixin, View):
     def get(self, request):
-        if hasattr(request.user, 'shops') and request.user.shops.exists():
-            shop = request.user.shops.first()
-        elif hasattr(request.user, 'shop') and request.user.shop:
-            shop = request.user.shop
-        else:
-            shop = None
-            
+        shop = request.tenant.shop
         roles = Role.objects.filter(shop=shop).order_by('-created_at') if shop else Role.objects.none()
         form = RoleForm()
         return render(request, 'users/role_list.html', {'roles': roles, 'form': form})
 
     def post(self, request):
         form = RoleForm(request.POST)
-        shop = request.user.shops.first()
+        shop = request.tenant.owned_shop
         if form.is_valid() and shop:
             role = form.save(commit=False)
             role.shop = shop
@@ -94,12 +88,7 @@ class RoleCreateView(LoginRequiredMixin, View):
         form = RoleForm(request.POST)
         
         # Determine Shop (Owner or Employee)
-        shop = None
-        if hasattr(request.user, 'shops') and request.user.shops.exists():
-            shop = request.user.shops.first()
-        elif hasattr(request.user, 'shop') and request.user.shop:
-            shop = request.user.shop
-            
+        shop = request.tenant.shop
         if form.is_valid():
             role = form.save(commit=False)
             role.shop = shop # Assign the shop!
@@ -180,7 +169,7 @@ class RoleUpdateView(LoginRequiredMixin, View):
 class EmployeeListView(LoginRequiredMixin, View):
     def get(self, request):
         # Filter users who are marked as employees and belong to the current user's shop
-        shop = request.user.shops.first() # Assuming one shop per owner for now
+        shop = request.tenant.owned_shop # Owners only
         if shop:
             employees = User.objects.filter(role='EMPLOYEE', shop=shop).order_by('-date_joined')
         else:
@@ -189,12 +178,12 @@ class EmployeeListView(LoginRequiredMixin, View):
 
 class EmployeeCreateView(LoginRequiredMixin, View):
     def get(self, request):
-        shop = request.user.shops.first()
+        shop = request.tenant.owned_shop
         form = EmployeeForm(shop=shop)
         return render(request, 'users/employee_create.html', {'form': form})
 
     def post(self, request):
-        shop = request.user.shops.first()
+        shop = request.tenant.owned_shop
         form = EmployeeForm(request.POST, shop=shop)
         if form.is_valid():
             employee = form.save(commit=False)
@@ -208,14 +197,14 @@ class EmployeeCreateView(LoginRequiredMixin, View):
 
 class EmployeeUpdateView(LoginRequiredMixin, View):
     def get(self, request, pk):
-        employee = get_object_or_404(User, pk=pk, shop=request.user.shops.first())
-        shop = request.user.shops.first()
+        shop = request.tenant.owned_shop
+        employee = get_object_or_404(User, pk=pk, shop=shop)
         form = EmployeeEditForm(instance=employee, shop=shop)
         return render(request, 'users/employee_edit.html', {'form': form, 'employee': employee})
 
     def post(self, request, pk):
-        employee = get_object_or_404(User, pk=pk, shop=request.user.shops.first())
-        shop = request.user.shops.first()
+        shop = request.tenant.owned_shop
+        employee = get_object_or_404(User, pk=pk, shop=shop)
         form = EmployeeEditForm(request.POST, instance=employee, shop=shop)
         if form.is_valid():
             form.save()
@@ -225,7 +214,7 @@ class EmployeeUpdateView(LoginRequiredMixin, View):
 
 class EmployeeSuspendView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        employee = get_object_or_404(User, pk=pk, shop=request.user.shops.first())
+        employee = get_object_or_404(User, pk=pk, shop=request.tenant.owned_shop)
         if employee.is_active:
             employee.is_active = False
             messages.warning(request, f'Employee {employee.username} has been suspended.')
@@ -237,7 +226,7 @@ class EmployeeSuspendView(LoginRequiredMixin, View):
 
 class EmployeeDeleteView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        employee = get_object_or_404(User, pk=pk, shop=request.user.shops.first())
+        employee = get_object_or_404(User, pk=pk, shop=request.tenant.owned_shop)
         employee.delete()
         messages.error(request, 'Employee has been permanently deleted.')
         return redirect('employee_list')